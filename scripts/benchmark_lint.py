@@ -0,0 +1,468 @@
+#!/usr/bin/env python
+
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Measures the throughput of check_lint.py over synthetic source trees.
+
+Generates trees of C++, Objective-C, and Python sources laid out like this
+repo, then lints each tree with every backend, reporting files linted per
+second, the peak resident set size of check_lint.py and all of its worker and
+linter processes combined, and the 95th percentile latency of linting a single
+file.
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from lib import command_trace
+
+_logger = logging.getLogger('benchmark')
+
+_SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# The ways check_lint.py can run its linters, and the options that select
+# each one.
+_BACKENDS = [
+    ('subprocess', ['--backend', 'threads']),
+    ('in-process', ['--in-process', '--backend', 'threads']),
+    ('process-pool', ['--in-process', '--backend', 'processes']),
+]
+
+# Where each kind of source is generated, matching the directories in which
+# check_lint.py looks for it.
+_ROOTS = {
+    'cc': 'Firestore/core/src/bench',
+    'objc': 'Firestore/Source/Bench',
+    'py': 'scripts/bench',
+}
+
+# The share of generated files of each kind.
+_MIX = [('cc', 0.5), ('objc', 0.3), ('py', 0.2)]
+
+_WORDS = [
+    'async', 'batch', 'bundle', 'cache', 'document', 'field', 'filter',
+    'index', 'local', 'model', 'mutation', 'path', 'query', 'remote', 'stream',
+    'target', 'transaction', 'value', 'view', 'watch', 'write',
+]
+
+# How often (in seconds) to sample the memory used by check_lint.py's processes.
+# Processes that live for less than this may be missed.
+_RSS_SAMPLE_INTERVAL = 0.05
+
+_LICENSE = """\
+Copyright 2026 Google LLC
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+"""
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+  parser.add_argument('--files', type=int, nargs='+', default=[1000],
+                      metavar='N',
+                      help='the number of files in each generated tree, for '
+                           'example 1000 10000 50000. Defaults to 1000')
+  parser.add_argument('--backends', nargs='+',
+                      choices=[name for name, _ in _BACKENDS],
+                      default=[name for name, _ in _BACKENDS],
+                      help='the check_lint.py backends to measure')
+  parser.add_argument('--latency-samples', type=int, default=20, metavar='N',
+                      help='the number of files to lint one at a time when '
+                           'measuring per-file latency')
+  parser.add_argument('--seed', type=int, default=0,
+                      help='seed for generating the trees, so that runs are '
+                           'comparable')
+  parser.add_argument('--corpus-dir',
+                      help='directory in which to keep generated trees, '
+                           'reusing any already there. By default trees are '
+                           'generated in a temporary directory and removed')
+  parser.add_argument('--json', metavar='FILE',
+                      help='also write the results to FILE as JSON')
+  args = command_trace.parse_args(parser)
+
+  corpus_dir = args.corpus_dir or tempfile.mkdtemp(prefix='benchmark_lint.')
+  results = []
+  try:
+    for num_files in args.files:
+      name = '%d-files-seed-%d' % (num_files, args.seed)
+      tree = os.path.join(corpus_dir, name)
+      if not os.path.isdir(tree):
+        _logger.warning('Generating %d files in %s', num_files, tree)
+        generate_tree(tree, num_files, random.Random(args.seed))
+
+      for name, options in _BACKENDS:
+        if name in args.backends:
+          result = measure(tree, name, options, args.latency_samples,
+                           random.Random(args.seed))
+          result['files'] = num_files
+          results.append(result)
+          _print_result(result)
+  finally:
+    if not args.corpus_dir:
+      shutil.rmtree(corpus_dir, ignore_errors=True)
+
+  if args.json:
+    with open(args.json, 'w') as fd:
+      json.dump(results, fd, indent=2, sort_keys=True)
+      fd.write('\n')
+
+
+def measure(tree, backend, options, latency_samples, rng):
+  """Lints the tree with check_lint.py using the given backend.
+
+  Args:
+    tree: The root of a tree created by generate_tree.
+    backend: The name of the backend, for reporting.
+    options: The check_lint.py options that select the backend.
+    latency_samples: The number of files to lint individually to measure
+      per-file latency.
+    rng: A random.Random used to choose those files.
+
+  Returns:
+    A dict of measurements.
+  """
+  _logger.warning('Linting %s with the %s backend', tree, backend)
+  options = ['--no-cache'] + options
+
+  elapsed, peak_rss, linted = _run_check_lint(
+      tree, options + ['--all'], sample_rss=True)
+
+  files = _list_files(tree)
+  sample = rng.sample(files, min(latency_samples, len(files)))
+  latencies = sorted(_run_check_lint(tree, options + [f])[0] for f in sample)
+
+  return {
+      'backend': backend,
+      'files_per_second': linted / elapsed,
+      'peak_total_rss_mb': peak_rss / (1024.0 * 1024.0),
+      'p95_latency_ms': _percentile(latencies, 95) * 1000,
+      'seconds': elapsed,
+  }
+
+
+def _run_check_lint(tree, options, sample_rss=False):
+  """Runs check_lint.py within the tree.
+
+  Args:
+    tree: The root of a tree created by generate_tree.
+    options: The options to pass to check_lint.py.
+    sample_rss: Whether to measure the memory check_lint.py uses.
+
+  Returns:
+    A tuple of the elapsed seconds, the peak resident set size in bytes of
+    check_lint.py and all its descendants combined (or None if not sampled),
+    and the number of files it was asked to lint.
+  """
+  command = [sys.executable, os.path.join(_SCRIPTS_DIR, 'check_lint.py')]
+  command.extend(options)
+
+  with command_trace.span(command) as span:
+    start = time.time()
+    proc = subprocess.Popen(command, cwd=tree, stdout=subprocess.DEVNULL,
+                            stderr=subprocess.DEVNULL)
+
+    sampler = None
+    if sample_rss:
+      sampler = _RssSampler(proc.pid)
+      sampler.start()
+
+    proc.wait()
+    elapsed = time.time() - start
+    span.set_result(proc.returncode)
+
+    if sampler:
+      sampler.join()
+
+  # check_lint.py exits with 1 when it finds errors, which it always will.
+  if proc.returncode not in (0, 1):
+    raise subprocess.CalledProcessError(proc.returncode, command)
+
+  linted = len(_list_files(tree)) if '--all' in options else 1
+  return elapsed, sampler.peak if sampler else None, linted
+
+
+class _RssSampler(threading.Thread):
+  """Tracks the peak memory used by a process and all of its descendants.
+
+  The resident set sizes of the whole process tree are summed, so the peak
+  covers a pool of worker processes as well as the process that started it.
+  """
+
+  def __init__(self, pid):
+    super(_RssSampler, self).__init__()
+    self.daemon = True
+    self.peak = 0
+    self._pid = pid
+
+  def run(self):
+    while True:
+      processes = _list_processes()
+      if self._pid not in processes:
+        return
+
+      self.peak = max(self.peak, _tree_rss(self._pid, processes))
+      time.sleep(_RSS_SAMPLE_INTERVAL)
+
+
+def _tree_rss(pid, processes):
+  """Returns the combined resident set size of pid and its descendants."""
+  children = {}
+  for child, (ppid, _) in processes.items():
+    children.setdefault(ppid, []).append(child)
+
+  total = 0
+  pending = [pid]
+  while pending:
+    current = pending.pop()
+    total += processes[current][1]
+    pending.extend(children.get(current, []))
+  return total
+
+
+def _list_processes():
+  """Returns a dict of pid to the process's parent pid and RSS in bytes."""
+  if os.path.isdir('/proc/self'):
+    return _list_processes_from_proc()
+
+  # Elsewhere, ask ps, which reports RSS in kilobytes.
+  result = {}
+  output = subprocess.check_output(['ps', '-A', '-o', 'pid=,ppid=,rss='])
+  for line in output.decode('ascii', 'replace').splitlines():
+    pid, ppid, rss = (int(field) for field in line.split())
+    result[pid] = (ppid, rss * 1024)
+  return result
+
+
+def _list_processes_from_proc():
+  page_size = os.sysconf('SC_PAGE_SIZE')
+  result = {}
+  for name in os.listdir('/proc'):
+    if not name.isdigit():
+      continue
+    try:
+      with open('/proc/%s/stat' % name, 'rb') as fd:
+        stat = fd.read()
+    except (IOError, OSError):
+      continue  # The process has exited.
+
+    # The command name, in parentheses, may itself contain spaces, so fields
+    # are counted from the last parenthesis: state, ppid, ..., with rss 22nd.
+    fields = stat[stat.rfind(b')') + 2:].split()
+    result[int(name)] = (int(fields[1]), int(fields[21]) * page_size)
+  return result
+
+
+def _percentile(values, percent):
+  """Returns the given percentile of a sorted list, by nearest rank."""
+  if not values:
+    return 0.0
+  rank = max(1, int(round(percent / 100.0 * len(values))))
+  return values[rank - 1]
+
+
+def _print_result(result):
+  print('%6d files  %-12s  %8.1f files/s  %7.1f MB peak total RSS  '
+        '%7.1f ms p95 per file' % (
+            result['files'], result['backend'], result['files_per_second'],
+            result['peak_total_rss_mb'], result['p95_latency_ms']))
+  sys.stdout.flush()
+
+
+def _list_files(tree):
+  """Returns the generated source files in the tree, relative to it."""
+  if tree not in _list_files.cache:
+    result = []
+    for root in _ROOTS.values():
+      for dirpath, _, filenames in os.walk(os.path.join(tree, root)):
+        for filename in filenames:
+          result.append(os.path.relpath(os.path.join(dirpath, filename), tree))
+    _list_files.cache[tree] = sorted(result)
+  return _list_files.cache[tree]
+
+
+_list_files.cache = {}
+
+
+def generate_tree(tree, num_files, rng):
+  """Generates a git repository holding num_files synthetic source files.
+
+  Files are spread over directories nested up to five deep, C++ and
+  Objective-C files come in header and implementation pairs, and about one
+  line in twenty is longer than the style guide allows.
+
+  Args:
+    tree: The directory to create.
+    num_files: The number of source files to generate.
+    rng: A random.Random, so that trees are reproducible.
+  """
+  os.makedirs(tree)
+  shutil.copy(os.path.join(_SCRIPTS_DIR, '..', 'tox.ini'), tree)
+
+  dirs = {kind: [root] for kind, root in _ROOTS.items()}
+  kinds = [kind for kind, _ in _MIX]
+  weights = [weight for _, weight in _MIX]
+
+  count = 0
+  while count < num_files:
+    kind = rng.choices(kinds, weights)[0]
+    directory = _choose_directory(dirs[kind], rng)
+    name = '%s_%s_%d' % (rng.choice(_WORDS), rng.choice(_WORDS), count)
+
+    if kind == 'cc':
+      sources = _generate_cc(directory, name, rng)
+    elif kind == 'objc':
+      sources = _generate_objc(directory, name, rng)
+    else:
+      sources = _generate_py(directory, name, rng)
+
+    for filename, text in sources:
+      path = os.path.join(tree, filename)
+      os.makedirs(os.path.dirname(path), exist_ok=True)
+      with open(path, 'w') as fd:
+        fd.write(text)
+      count += 1
+
+  # check_lint.py finds sources with git.
+  for command in (['git', 'init', '-q'], ['git', 'add', '-A']):
+    subprocess.check_call(command, cwd=tree)
+
+
+def _choose_directory(dirs, rng):
+  """Picks a directory for new files, sometimes creating a subdirectory."""
+  directory = rng.choice(dirs)
+  depth = directory.count('/') - dirs[0].count('/')
+  if rng.random() < 0.1 and depth < 5:
+    directory = '%s/%s' % (directory, rng.choice(_WORDS))
+    if directory not in dirs:
+      dirs.append(directory)
+  return directory
+
+
+def _comment(prefix, text):
+  """Returns text as a block of line comments."""
+  return ''.join(prefix + line + '\n' if line else prefix.rstrip() + '\n'
+                 for line in text.split('\n')[:-1])
+
+
+def _comment_text(rng):
+  """Returns the text of a comment, sometimes too long to fit on a line."""
+  words = [rng.choice(_WORDS) for _ in range(rng.randint(2, 6))]
+  if rng.random() < 0.05:
+    words *= 4
+  return ' '.join(words)
+
+
+def _generate_cc(directory, name, rng):
+  class_name = ''.join(w.capitalize() for w in name.split('_'))
+  guard = (directory + '/' + name).upper().replace('/', '_') + '_H_'
+  header = directory + '/' + name + '.h'
+  methods = ['%s%d' % (rng.choice(_WORDS).capitalize(), i)
+             for i in range(rng.randint(2, 20))]
+
+  h = [_comment('// ', _LICENSE),
+       '\n#ifndef %s\n#define %s\n\n' % (guard, guard),
+       '#include <string>\n#include <vector>\n\n',
+       'namespace firebase {\nnamespace firestore {\nnamespace bench {\n\n',
+       'class %s {\n public:\n' % class_name,
+       '  explicit %s(std::string value);\n\n' % class_name]
+  for method in methods:
+    h.append('  int %s(const std::vector<int>& values) const;\n' % method)
+  h.append('\n private:\n  std::string value_;\n};\n\n')
+  h.append('}  // namespace bench\n}  // namespace firestore\n'
+           '}  // namespace firebase\n\n#endif  // %s\n' % guard)
+
+  cc = [_comment('// ', _LICENSE), '\n#include "%s"\n\n' % header,
+        '#include <utility>\n\n',
+        'namespace firebase {\nnamespace firestore {\nnamespace bench {\n\n',
+        '%s::%s(std::string value) : value_(std::move(value)) {\n}\n\n' % (
+            class_name, class_name)]
+  for method in methods:
+    cc.append('int %s::%s(const std::vector<int>& values) const {\n' % (
+        class_name, method))
+    cc.append('  int result = 0;\n  for (int value : values) {\n')
+    for _ in range(rng.randint(1, 12)):
+      cc.append('    if (value > %d) {\n' % rng.randint(0, 100))
+      cc.append('      // %s\n' % _comment_text(rng))
+      cc.append('      result += value * %d;\n    }\n' % rng.randint(1, 9))
+    cc.append('  }\n  return result;\n}\n\n')
+  cc.append('}  // namespace bench\n}  // namespace firestore\n'
+            '}  // namespace firebase\n')
+
+  return [(header, ''.join(h)), (directory + '/' + name + '.cc', ''.join(cc))]
+
+
+def _generate_objc(directory, name, rng):
+  class_name = 'FST' + ''.join(w.capitalize() for w in name.split('_'))
+  header = directory + '/' + class_name + '.h'
+  ext = rng.choice(['.m', '.mm'])
+  methods = ['%sWithValue%d' % (rng.choice(_WORDS), i)
+             for i in range(rng.randint(2, 15))]
+
+  h = ['/*\n', _comment(' * ', _LICENSE), ' */\n\n',
+       '#import <Foundation/Foundation.h>\n\n',
+       'NS_ASSUME_NONNULL_BEGIN\n\n',
+       '@interface %s : NSObject\n\n' % class_name,
+       '@property(nonatomic, copy, readonly) NSString *name;\n\n']
+  for method in methods:
+    h.append('- (NSInteger)%s:(NSInteger)value;\n' % method)
+  h.append('\n@end\n\nNS_ASSUME_NONNULL_END\n')
+
+  m = ['/*\n', _comment(' * ', _LICENSE), ' */\n\n',
+       '#import "%s"\n\n' % header,
+       'NS_ASSUME_NONNULL_BEGIN\n\n',
+       '@implementation %s\n\n' % class_name]
+  for method in methods:
+    m.append('- (NSInteger)%s:(NSInteger)value {\n' % method)
+    m.append('  NSInteger result = 0;\n')
+    for _ in range(rng.randint(1, 12)):
+      m.append('  if (value > %d) {\n' % rng.randint(0, 100))
+      m.append('    // %s\n' % _comment_text(rng))
+      m.append('    result += [self.name length] * %d;\n  }\n' %
+               rng.randint(1, 9))
+    m.append('  return result;\n}\n\n')
+  m.append('@end\n\nNS_ASSUME_NONNULL_END\n')
+
+  return [(header, ''.join(h)),
+          (directory + '/' + class_name + ext, ''.join(m))]
+
+
+def _generate_py(directory, name, rng):
+  lines = [_comment('# ', _LICENSE), '\n"""Synthetic module %s."""\n\n' % name,
+           'import os\n']
+  for i in range(rng.randint(2, 20)):
+    lines.append('\n\ndef %s_%d(values):\n' % (rng.choice(_WORDS), i))
+    lines.append('  """Returns a sum over values."""\n  result = 0\n')
+    lines.append('  for value in values:\n')
+    for _ in range(rng.randint(1, 12)):
+      lines.append('    if value > %d:\n' % rng.randint(0, 100))
+      lines.append('      # %s\n' % _comment_text(rng))
+      lines.append('      result += value * %d\n' % rng.randint(1, 9))
+    lines.append('  return result + len(os.sep)\n')
+
+  return [(directory + '/' + name + '.py', ''.join(lines))]
+
+
+if __name__ == '__main__':
+  main()
@@ -20,6 +20,7 @@ Currently supports linting Objective-C, Objective-C++, C++, and Python source.
 """
 
 import argparse
+import hashlib
 import logging
 import os
 import subprocess
@@ -29,6 +30,7 @@ import textwrap
 from lib import checker
 from lib import command_trace
 from lib import git
+from lib import lint_cache
 from lib import source
 
 _logger = logging.getLogger('lint')
@@ -36,6 +38,25 @@ _logger = logging.getLogger('lint')
 
 _dry_run = False
 
+# Whether to run cpplint within this process rather than as a subprocess.
+_in_process = False
+
+# Whether to lint the contents of files staged in git's index rather than the
+# files in the working tree.
+_staged = False
+
+# The lint_cache.Cache in use, or None if caching is disabled.
+_cache = None
+
+# A dict of filename to the (first, last) ranges of lines on which cpplint
+# should report errors, or None to report errors on every line.
+_line_ranges = None
+
+
+# The files from which cpplint and flake8 read their configuration.
+_CPPLINT_CONFIG_FILE = 'CPPLINT.cfg'
+_FLAKE8_CONFIG_FILES = ('setup.cfg', 'tox.ini', '.flake8')
+
 
 _CPPLINT_OBJC_FILTERS = [
     # Objective-C uses #import and does not use header guards
@@ -72,8 +93,6 @@ _CPPLINT_OBJC_OPTIONS = [
 
 
 def main():
-  global _dry_run
-
   parser = argparse.ArgumentParser(description='Lint source files.')
   parser.add_argument('--dry-run', '-n', action='store_true',
                       help='Show what the linter would do without doing it')
@@ -84,33 +103,299 @@ def main():
                            'from which to look for changes. Defaults to '
                            'origin/master. Alternatively, a list of specific '
                            'files or git pathspecs to lint.')
+  parser.add_argument('--in-process', action='store_true',
+                      help='run cpplint within this process instead of '
+                           'starting a new interpreter for each batch of files')
+  parser.add_argument('--backend', choices=('auto',) + checker.BACKENDS,
+                      default='auto',
+                      help='how to run linters concurrently. The default, '
+                           'auto, uses processes when linting in-process and '
+                           'threads otherwise')
+  parser.add_argument('--fail-fast', action='store_true',
+                      help='stop linting after the first error is reported')
+  parser.add_argument('--max-errors', type=int, metavar='N',
+                      help='stop linting after N errors have been reported')
+  parser.add_argument('--watch', action='store_true',
+                      help='after linting, keep running and re-lint source '
+                           'files as they change')
+  parser.add_argument('--no-cache', action='store_true',
+                      help='lint every file, ignoring any cached results')
+  parser.add_argument('--clear-cache', action='store_true',
+                      help='discard all cached results before linting')
+  parser.add_argument('--cache-dir', default=lint_cache.default_directory(),
+                      help='directory in which to cache lint results')
+  parser.add_argument('--changed-lines', action='store_true',
+                      help='only report C++ and Objective-C errors on lines '
+                           'that have changed since the revision')
+  parser.add_argument('--staged', action='store_true',
+                      help='lint the changes staged for commit, as they are '
+                           'in the index rather than the working tree. '
+                           'Implies --in-process')
   args = command_trace.parse_args(parser)
 
-  if args.dry_run:
-    _dry_run = True
-    command_trace.enable_tracing()
+  if args.changed_lines and (args.all or args.watch):
+    parser.error('--changed-lines cannot be combined with --all or --watch')
+  if args.staged and (args.all or args.watch or args.rev_or_files):
+    parser.error('--staged cannot be combined with --all, --watch, or a '
+                 'revision or files')
+
+  if args.max_errors is not None and args.max_errors < 1:
+    parser.error('--max-errors must be at least 1')
+
+  if args.clear_cache:
+    lint_cache.Cache(args.cache_dir).clear()
 
-  pool = checker.Pool()
+  _configure(args)
 
   sources = _unique(source.CC_DIRS + source.OBJC_DIRS + source.PYTHON_DIRS)
   patterns = git.make_patterns(sources)
 
-  files = git.find_changed_or_files(args.all, args.rev_or_files, patterns)
+  if args.staged:
+    files = git.find_staged(patterns)
+  else:
+    files = git.find_changed_or_files(args.all, args.rev_or_files, patterns)
+
+  if args.changed_lines:
+    global _line_ranges
+    if args.staged:
+      _line_ranges = git.find_staged_lines(patterns)
+    else:
+      revision = args.rev_or_files[0] if args.rev_or_files else 'origin/master'
+      if len(args.rev_or_files) > 1 or not git.is_revision(revision):
+        parser.error('--changed-lines requires a revision, not a list of '
+                     'files')
+      _line_ranges = git.find_changed_lines(revision, patterns)
+    files = [f for f in files if _line_ranges.get(f)]
+
+  max_errors = args.max_errors
+  if max_errors is None and args.fail_fast:
+    max_errors = 1
+
+  backend = args.backend
+  if backend == 'auto':
+    backend = 'processes' if _in_process else 'threads'
+  if backend == 'processes':
+    pool = checker.Pool(backend, initializer=_init_worker,
+                        initargs=(args, _line_ranges), fail_fast=max_errors)
+  else:
+    # Threads share this process's globals, which are already configured.
+    pool = checker.Pool(backend, fail_fast=max_errors)
+
   check(pool, files)
 
-  pool.exit()
+  errors = pool.join()
+  if args.watch:
+    errors = _watch(pool, sources)
+
+  pool.shutdown()
+  if pool.cancelled:
+    _logger.warning('Stopped after %d errors; not all files were linted.',
+                    errors)
+  if _cache is not None:
+    _cache.trim()
+  sys.exit(errors > 0)
+
+
+def _watch(pool, sources):
+  """Re-lints source files whenever they change, until interrupted.
+
+  The pool, and any in-process linters running in it, stay warm between
+  batches, so each save only costs linting the files that changed.
+
+  Returns:
+    The number of errors found in the last batch.
+  """
+  # Imported lazily since only watch mode needs it.
+  from lib import watch
+
+  root = git.get_repo_root()
+  dirs = [os.path.relpath(os.path.join(root, d)) for d in sorted(sources)]
+  extensions = set(
+      source.CC_EXTENSIONS + source.OBJC_EXTENSIONS + source.PYTHON_EXTENSIONS)
+  flake8_configs = [os.path.relpath(os.path.join(root, name))
+                    for name in _FLAKE8_CONFIG_FILES]
+  watcher = watch.create(dirs, extensions, names=[_CPPLINT_CONFIG_FILE],
+                         files=flake8_configs)
+
+  config_names = set(_FLAKE8_CONFIG_FILES + (_CPPLINT_CONFIG_FILE,))
+
+  errors = 0
+  try:
+    while True:
+      _logger.warning('Watching for changes in %s...', ', '.join(dirs))
+      changed = [f for f in watcher.wait() if not _is_third_party(f)]
+
+      configs = [f for f in changed if os.path.basename(f) in config_names]
+      if configs:
+        _logger.warning('Configuration changed in %s', ', '.join(configs))
+        _reset_config()
+
+        # Worker processes hold configuration of their own, so start afresh.
+        if pool.backend == 'processes':
+          pool.restart()
+        changed = [f for f in changed if f not in configs]
+
+      if not changed:
+        continue
+
+      source.invalidate(changed)
+      pool.reset()
+      check(pool, changed)
+      errors = pool.join()
+  except KeyboardInterrupt:
+    return errors
+
+
+def _reset_config():
+  """Discards everything this process remembers about lint configuration."""
+  _flake8_config.value = None
+  if _cache is not None:
+    _cache.invalidate_configs()
+
+  # Only reset the engines that have been loaded; there's nothing to forget in
+  # the others.
+  cpplint_engine = sys.modules.get('lib.cpplint_engine')
+  if cpplint_engine is not None:
+    cpplint_engine.reset()
+  if _flake8_engine.value:
+    _flake8_engine.value.reset()
+
+
+def _is_third_party(filename):
+  return '/third_party/' in '/' + filename
+
+
+def _configure(args):
+  """Sets up this module's global state from parsed arguments."""
+  global _dry_run
+  global _in_process
+  global _staged
+  global _cache
+
+  if args.dry_run:
+    _dry_run = True
+    command_trace.enable_tracing()
+
+  # Staged contents can only be handed to cpplint in-process.
+  _staged = args.staged
+  _in_process = args.in_process or args.staged
+
+  if not args.no_cache and not _dry_run:
+    _cache = lint_cache.Cache(args.cache_dir)
+
+
+def _init_worker(args, line_ranges):
+  """Prepares a worker process, which may have been freshly started."""
+  global _line_ranges
+
+  command_trace.setup(args)
+  _configure(args)
+  _line_ranges = line_ranges
 
 
 def check(pool, files):
   group = source.categorize_files(files)
 
   for kind, files in group.kinds.items():
+    if _cache is not None:
+      files = _replay_cached(pool, kind, files)
+
     for chunk in checker.shard(files):
       if not chunk:
         continue
 
-      linter = _linters[kind]
-      pool.submit(linter, chunk)
+      if _cache is not None:
+        pool.submit(_lint_and_store, kind, chunk)
+      else:
+        pool.submit(_linters[kind], chunk)
+
+
+def _replay_cached(pool, kind, files):
+  """Submits cached results for the given files to the pool.
+
+  Returns:
+    The files that have no cached results and still need to be linted.
+  """
+  identity = _linter_identity(kind)
+
+  cached = []
+  missing = []
+  for filename in files:
+    key = _cache_key(kind, identity, filename)
+    result = _cache.get(key) if key else None
+    if result is None:
+      missing.append(filename)
+    else:
+      cached.append(result)
+
+  if cached:
+    pool.submit(_merge_results, cached)
+  return missing
+
+
+def _lint_and_store(kind, files):
+  """Lints the files and stores the per-file results in the cache."""
+  identity = _linter_identity(kind)
+
+  # Compute keys up front so that edits made while the linter runs can't be
+  # recorded against results for the old contents.
+  keys = {filename: _cache_key(kind, identity, filename) for filename in files}
+
+  result = _linters[kind](files)
+  if result is None:
+    return None
+
+  results, unattributed = lint_cache.split_output(files, result)
+
+  # If the linter crashed, was killed, or complained about something other than
+  # the files themselves, the per-file results don't tell the whole story and
+  # replaying them later would pass off a failed run as a clean one.
+  attributed = sum(r.errors for r in results.values())
+  if unattributed or result.errors > attributed:
+    _logger.warning(
+        'Not caching lint results for %d files: %d errors, of which %d are '
+        'attributed to files, and %d lines of other output',
+        len(files), result.errors, attributed, len(unattributed))
+    for line in unattributed:
+      _logger.debug('Unattributed output: %s', line.rstrip('\n'))
+    return result
+
+  for filename, file_result in results.items():
+    key = keys[filename]
+    if key:
+      _cache.put(key, file_result)
+  return result
+
+
+def _cache_key(kind, identity, filename):
+  """Returns the cache key for linting the file, or None if it can't be read.
+
+  When errors are only reported on changed lines, the lines are part of the
+  key too.
+  """
+  if kind != 'py':
+    identity = identity + _lines_options([filename])
+  contents = git.read_staged(filename) if _staged else None
+  return _cache.key(identity, filename, contents)
+
+
+def _merge_results(results):
+  errors = sum(r.errors for r in results)
+  output = ''.join(r.output for r in results)
+  return checker.Result(errors, output)
+
+
+def _linter_identity(kind):
+  """Returns a list of strings identifying the linter used for kind.
+
+  This includes the linter's version and options so that any change to either
+  invalidates cached results.
+  """
+  if kind == 'py':
+    return [kind, 'flake8', _flake8_version()] + _flake8_config()
+
+  options = _CPPLINT_OBJC_OPTIONS if kind == 'objc' else []
+  return [kind, 'cpplint', _cpplint_digest()] + options
 
 
 def lint_cc(files):
@@ -122,20 +407,110 @@ def lint_objc(files):
 
 
 def _run_cpplint(options, files):
-  scripts_dir = os.path.dirname(os.path.abspath(__file__))
-  cpplint = os.path.join(scripts_dir, 'cpplint.py')
+  options = options + _lines_options(files)
+
+  if _cache is not None:
+    # Let cpplint remember the includes in headers between runs too. This only
+    # saves time, so it isn't part of _linter_identity.
+    options = options + ['--includecache=' + _include_cache_path()]
+
+  if _in_process:
+    return _run_cpplint_in_process(options, files)
 
-  command = [sys.executable, cpplint, '--quiet']
+  # Warnings from the interpreter would be mixed into cpplint's output, where
+  # they belong to no file and keep the results from being cached.
+  command = [sys.executable, '-Wignore::DeprecationWarning', _cpplint_path(),
+             '--quiet']
   command.extend(options)
   command.extend(files)
 
-  return _read_output(command)
+  result = _read_output(command, files)
+  result.output = _strip_error_counts(result.output)
+  return result
+
+
+def _strip_error_counts(output):
+  """Removes cpplint's "Total errors found" summary from its output.
+
+  The summary only counts the errors in one batch of files, and results
+  replayed from the cache can't reproduce it, so it's left out of every run.
+  """
+  return ''.join(line for line in output.splitlines(True)
+                 if not line.startswith(_CPPLINT_ERROR_COUNTS))
+
+
+_CPPLINT_ERROR_COUNTS = 'Total errors found: '
+
+
+def _run_cpplint_in_process(options, files):
+  with command_trace.span(['cpplint'] + options + files) as span:
+    if _dry_run:
+      return checker.Result(0, '')
+
+    contents = _read_staged(files) if _staged else None
+
+    # Imported lazily so that cpplint is only loaded in processes that use it.
+    from lib import cpplint_engine
+    result = cpplint_engine.lint(options, files, contents)
+    span.set_result(int(result.errors > 0), len(result.output))
+    return result
+
+
+def _read_staged(files):
+  """Returns a dict of filename to the file's contents in git's index."""
+  result = {}
+  for filename in files:
+    contents = git.read_staged(filename)
+    if contents is not None:
+      result[filename] = contents
+  return result
+
+
+def _lines_options(files):
+  """Returns the cpplint --lines options for the given files, if any."""
+  if _line_ranges is None:
+    return []
+
+  result = []
+  for filename in files:
+    ranges = _line_ranges.get(filename)
+    if ranges:
+      spec = ','.join('%d-%d' % r for r in ranges)
+      result.append('--lines=%s:%s' % (filename, spec))
+  return result
+
+
+def _include_cache_path():
+  if not os.path.isdir(_cache.directory):
+    os.makedirs(_cache.directory, exist_ok=True)
+  return os.path.join(_cache.directory, 'cpplint-includes.json')
+
+
+def _cpplint_path():
+  scripts_dir = os.path.dirname(os.path.abspath(__file__))
+  return os.path.join(scripts_dir, 'cpplint.py')
+
+
+def _cpplint_digest():
+  """Returns a digest of cpplint.py's source, standing in for its version."""
+  if _cpplint_digest.value is None:
+    with open(_cpplint_path(), 'rb') as fd:
+      _cpplint_digest.value = hashlib.sha256(fd.read()).hexdigest()
+  return _cpplint_digest.value
+
+
+_cpplint_digest.value = None
 
 
 _flake8_warned = False
 
 
 def lint_py(files):
+  # flake8 can only read one file from stdin per process, so staged contents
+  # are always linted by a subprocess.
+  if not _staged and _flake8_engine() is not None:
+    return _run_flake8_in_process(files)
+
   flake8 = which('flake8')
   if flake8 is None:
     global _flake8_warned
@@ -150,24 +525,99 @@ def lint_py(files):
           """))
     return
 
+  if _staged:
+    # flake8 can only read one file from stdin at a time.
+    results = []
+    for filename in files:
+      command = [flake8, '--stdin-display-name=' + filename, '-']
+      results.append(_read_output(
+          command, [filename], git.read_staged(filename) or b''))
+    return _merge_results(results)
+
   command = [flake8]
   command.extend(files)
 
-  return _read_output(command)
+  return _read_output(command, files)
+
+
+def _run_flake8_in_process(files):
+  with command_trace.span(['flake8'] + files) as span:
+    if _dry_run:
+      return checker.Result(0, '')
+
+    result = _flake8_engine().lint(files)
+    span.set_result(int(result.errors > 0), len(result.output))
+    return result
+
+
+def _flake8_engine():
+  """Returns the flake8_engine module, or None if flake8 can't be imported.
+
+  flake8 is imported lazily, and at most once, so that processes that only
+  lint C++ don't pay for loading it.
+  """
+  if _flake8_engine.value is None:
+    try:
+      from lib import flake8_engine
+      _flake8_engine.value = flake8_engine
+    except ImportError:
+      _flake8_engine.value = False
+  return _flake8_engine.value or None
+
+
+_flake8_engine.value = None
+
 
+def _flake8_version():
+  """Returns a string identifying the flake8 that lint_py will run."""
+  if not _staged and _flake8_engine() is not None:
+    return _flake8_engine().identity()
+  return which('flake8') or ''
 
-def _read_output(command):
-  command_trace.log(command)
 
-  if _dry_run:
-    return checker.Result(0, '')
+def _flake8_config():
+  """Returns digests of the files from which flake8 reads its options."""
+  if _flake8_config.value is None:
+    root = git.get_repo_root()
+    result = []
+    for name in _FLAKE8_CONFIG_FILES:
+      path = os.path.join(root, name)
+      if os.path.isfile(path):
+        with open(path, 'rb') as fd:
+          result.append(name + ':' + hashlib.sha256(fd.read()).hexdigest())
+    _flake8_config.value = result
+  return _flake8_config.value
 
-  proc = subprocess.Popen(
-      command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
-  output = proc.communicate('')[0]
-  sc = proc.wait()
 
-  return checker.Result(sc, output)
+_flake8_config.value = None
+
+
+def _read_output(command, files, stdin=None):
+  """Runs a linter over the given files and counts the errors it reports.
+
+  Returns:
+    A checker.Result whose errors are the lines of output attributed to files,
+    like those of the in-process linters and of cached results.
+  """
+  with command_trace.span(command) as span:
+    if _dry_run:
+      return checker.Result(0, '')
+
+    proc = subprocess.Popen(
+        command, stdin=subprocess.PIPE if stdin is not None else None,
+        stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    output = proc.communicate(stdin)[0]
+    sc = proc.wait()
+    span.set_result(sc, len(output))
+
+  result = checker.Result(0, output)
+  results, _ = lint_cache.split_output(files, result)
+  result.errors = sum(r.errors for r in results.values())
+  if sc != 0 and result.errors == 0:
+    # The linter failed without reporting any errors in the files, e.g.
+    # because it crashed. Count that as an error so that the run still fails.
+    result.errors = 1
+  return result
 
 
 _linters = {
@@ -191,6 +641,18 @@ def which(executable):
   if executable.startswith('/'):
     return executable
 
+  # Searching $PATH means a stat for every entry, so remember the answer for as
+  # long as $PATH stays the same.
+  key = (executable, os.environ['PATH'], os.environ.get('PATHEXT'))
+  if key not in which.cache:
+    which.cache[key] = _search_path(executable)
+  return which.cache[key]
+
+
+which.cache = {}
+
+
+def _search_path(executable):
   path = os.environ['PATH'].split(os.pathsep)
 
   for executable_with_ext in _executable_names(executable):
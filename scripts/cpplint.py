@@ -32,15 +32,27 @@ import copy
 import getopt
 import glob
 import itertools
+import json
 import math  # for log
+import mmap
+import multiprocessing
 import os
 import re
+import shutil
 import sre_compile
 import string
 import sys
 import sysconfig
+import tempfile
+import time
 import unicodedata
 import xml.etree.ElementTree
+import xml.sax.saxutils
+
+try:
+  import fcntl  # Not available on Windows
+except ImportError:
+  fcntl = None
 
 # if empty, use defaults
 _valid_extensions = set([])
@@ -55,7 +67,8 @@ except NameError:
 
 
 _USAGE = """
-Syntax: cpplint.py [--verbose=#] [--output=emacs|eclipse|vs7|junit|sed|gsed]
+Syntax: cpplint.py [--verbose=#]
+                   [--output=emacs|eclipse|vs7|junit|sarif|sed|gsed]
                    [--filter=-x,+y,...]
                    [--counting=total|toplevel|detailed] [--root=subdir]
                    [--repository=path]
@@ -64,6 +77,10 @@ Syntax: cpplint.py [--verbose=#] [--output=emacs|eclipse|vs7|junit|sed|gsed]
                    [--exclude=path]
                    [--extensions=hpp,cpp,...]
                    [--includeorder=default|standardcfirst]
+                   [--profile=file.json]
+                   [--includecache=file.json]
+                   [--jobs=N]
+                   [--lines=file:ranges]
                    [--quiet]
                    [--version]
         <file> [file] ...
@@ -89,11 +106,13 @@ Syntax: cpplint.py [--verbose=#] [--output=emacs|eclipse|vs7|junit|sed|gsed]
 
   Flags:
 
-    output=emacs|eclipse|vs7|junit|sed|gsed
+    output=emacs|eclipse|vs7|junit|sarif|sed|gsed
       By default, the output is formatted to ease emacs parsing.  Visual Studio
       compatible output (vs7) may also be used.  Further support exists for
       eclipse (eclipse), and JUnit (junit). XML parsers such as those used
       in Jenkins and Bamboo may also be used.
+      The sarif format writes a SARIF 2.1.0 log, as read by code scanning
+      tools, to stderr. Each result is written as soon as it is found.
       The sed format outputs sed commands that should fix some of the errors.
       Note that this requires gnu sed. If that is installed as gsed on your
       system (common e.g. on macOS with homebrew) you can use the gsed output
@@ -210,6 +229,39 @@ Syntax: cpplint.py [--verbose=#] [--output=emacs|eclipse|vs7|junit|sed|gsed]
       treat all others as separate group of "other system headers". The C headers
       included are those of the C-standard lib and closely related ones.
 
+    profile=file.json
+      Record the wall time spent on each file and in each check function, and
+      write a JSON report to the given file when done. Times for checks that
+      call other checks (like CheckStyle) include the time of their callees.
+
+      Examples:
+        --profile=cpplint-profile.json
+
+    includecache=file.json
+      Save the #include lines found in headers to the given file, and reuse
+      them in later runs for headers that haven't been modified since.  This
+      saves rereading the header that goes with each source file.
+
+      Examples:
+        --includecache=.cpplint-includes.json
+
+    jobs=N
+      Lint files in N worker processes.  The output is the same as when linting
+      one file at a time.  Cannot be combined with --profile.
+
+      Examples:
+        --jobs=8
+
+    lines=file:ranges
+      Only report errors on the given lines of the given file.  ranges is a
+      comma-separated list of line numbers and inclusive ranges of line
+      numbers.  Per-line checks are skipped on lines that can't affect those
+      errors, which makes linting a small change to a big file much quicker.
+      May be given once for each file.
+
+      Examples:
+        --lines=foo/bar.cc:10-12,40
+
     headers=x,y,...
       The header extensions that cpplint will treat as .h in checks. Values are
       automatically added to --extensions list.
@@ -343,6 +395,7 @@ _ERROR_CATEGORIES = [
 # keywords to use with --outputs which generate stdout for machine processing
 _MACHINE_OUTPUTS = [
   'junit',
+  'sarif',
   'sed',
   'gsed'
 ]
@@ -854,6 +907,19 @@ _root_debug = False
 # This is set by the --repository flag.
 _repository = None
 
+# {(str, str): (str, int)}: a map from a directory and the --repository flag
+# to the root of the checkout containing that directory, as returned by
+# _FindRepositoryRoot.
+_repository_roots = {}
+
+# {str: tuple}: a map from a directory to the CPPLINT.cfg files that apply to
+# files in it, as returned by _FindConfigFiles.
+_config_chains = {}
+
+# {str: (float, list)}: a map from a CPPLINT.cfg file name to its modification
+# time and its settings, as returned by _ReadConfigFile.
+_config_files = {}
+
 # Files to exclude from linting. This is set by the --exclude flag.
 _excludes = None
 
@@ -867,6 +933,37 @@ _line_length = 80
 # This allows to use different include order rule than default
 _include_order = "default"
 
+# The _Profiler collecting timings, if any. This is set by --profile flag.
+_profiler = None
+
+# {str: (float, int, list)}: a map from the absolute name of a header read by
+# UpdateIncludeState to its modification time, its size, and the
+# (include, linenum) pairs found in it.  Headers are only reread when they
+# change.
+_include_index = {}
+
+# The file in which _include_index is saved between runs, if any.
+# This is set by --includecache flag.
+_include_cache_file = None
+
+# The include cache files already loaded into _include_index by this process.
+_loaded_include_caches = set()
+
+# Whether _include_index has entries that _SaveIncludeIndex hasn't saved yet.
+_include_index_changed = False
+
+# The number of processes in which to lint files. This is set by --jobs flag.
+_jobs = 1
+
+# {str: list}: a map from a file name to the sorted (first, last) ranges of
+# lines on which to report errors.  Files that aren't in the map have errors
+# reported on every line.  This is set by --lines flag.
+_line_ranges = None
+
+# The set of line numbers in the file being processed on which errors are
+# reported, or None to report errors on every line.
+_selected_lines = None
+
 try:
   unicode
 except NameError:
@@ -948,6 +1045,9 @@ def ProcessExtensionsOption(val):
 def GetNonHeaderExtensions():
   return GetAllExtensions().difference(GetHeaderExtensions())
 
+_RE_PATTERN_NOLINT = re.compile(r'\bNOLINT(NEXTLINE)?\b(\([^)]+\))?')
+
+
 def ParseNolintSuppressions(filename, raw_line, linenum, error):
   """Updates the global list of line error-suppressions.
 
@@ -961,7 +1061,8 @@ def ParseNolintSuppressions(filename, raw_line, linenum, error):
     linenum: int, the number of the current line.
     error: function, an error handler.
   """
-  matched = Search(r'\bNOLINT(NEXTLINE)?\b(\([^)]+\))?', raw_line)
+  matched = ('NOLINT' in raw_line and
+             _RE_PATTERN_NOLINT.search(raw_line))
   if matched:
     if matched.group(1):
       suppressed_line = linenum + 1
@@ -1018,8 +1119,8 @@ def IsErrorSuppressedByNolint(category, linenum):
     global suppression.
   """
   return (_global_error_suppressions.get(category, False) or
-          linenum in _error_suppressions.get(category, set()) or
-          linenum in _error_suppressions.get(None, set()))
+          linenum in _error_suppressions.get(category, ()) or
+          linenum in _error_suppressions.get(None, ()))
 
 
 def Match(pattern, s):
@@ -1027,9 +1128,10 @@ def Match(pattern, s):
   # The regexp compilation caching is inlined in both Match and Search for
   # performance reasons; factoring it out into a separate function turns out
   # to be noticeably expensive.
-  if pattern not in _regexp_compile_cache:
-    _regexp_compile_cache[pattern] = sre_compile.compile(pattern)
-  return _regexp_compile_cache[pattern].match(s)
+  compiled = _regexp_compile_cache.get(pattern)
+  if compiled is None:
+    compiled = _regexp_compile_cache[pattern] = sre_compile.compile(pattern)
+  return compiled.match(s)
 
 
 def ReplaceAll(pattern, rep, s):
@@ -1045,16 +1147,18 @@ def ReplaceAll(pattern, rep, s):
   Returns:
     string with replacements made (or original string if no replacements)
   """
-  if pattern not in _regexp_compile_cache:
-    _regexp_compile_cache[pattern] = sre_compile.compile(pattern)
-  return _regexp_compile_cache[pattern].sub(rep, s)
+  compiled = _regexp_compile_cache.get(pattern)
+  if compiled is None:
+    compiled = _regexp_compile_cache[pattern] = sre_compile.compile(pattern)
+  return compiled.sub(rep, s)
 
 
 def Search(pattern, s):
   """Searches the string for the pattern, caching the compiled regexp."""
-  if pattern not in _regexp_compile_cache:
-    _regexp_compile_cache[pattern] = sre_compile.compile(pattern)
-  return _regexp_compile_cache[pattern].search(s)
+  compiled = _regexp_compile_cache.get(pattern)
+  if compiled is None:
+    compiled = _regexp_compile_cache[pattern] = sre_compile.compile(pattern)
+  return compiled.search(s)
 
 
 def _IsSourceExtension(s):
@@ -1244,6 +1348,215 @@ class _IncludeState(object):
     return ''
 
 
+class ErrorSink(object):
+  """Receives the errors and messages produced while linting.
+
+  The default implementation writes everything to stdout and stderr in the
+  configured output format. Programs that embed cpplint can install their own
+  sink with _SetErrorSink() to capture output instead.
+  """
+
+  def Error(self, filename, linenum, category, confidence, message):
+    """Reports a lint error that has passed filtering.
+
+    Args:
+      filename: The name of the file containing the error.
+      linenum: The number of the line containing the error.
+      category: A string used to describe the "category" this bug
+        falls under.
+      confidence: A number from 1-5 representing a confidence score for
+        the error.
+      message: The error message.
+    """
+    if _cpplint_state.output_format == 'vs7':
+      _cpplint_state.PrintError('%s(%s): error cpplint: [%s] %s [%d]\n' % (
+          filename, linenum, category, message, confidence))
+    elif _cpplint_state.output_format == 'eclipse':
+      self.PrintError('%s:%s: warning: %s  [%s] [%d]\n' % (
+          filename, linenum, message, category, confidence))
+    elif _cpplint_state.report is not None:
+      _cpplint_state.report.AddFailure(filename, linenum, message, category,
+                                       confidence)
+    elif _cpplint_state.output_format in ['sed', 'gsed']:
+      if message in _SED_FIXUPS:
+        self.PrintInfo(_cpplint_state.output_format + " -i '%s%s' %s # %s  [%s] [%d]\n" % (
+            linenum, _SED_FIXUPS[message], filename, message, category, confidence))
+      else:
+        self.PrintError('# %s:%s:  "%s"  [%s] [%d]\n' % (
+            filename, linenum, message, category, confidence))
+    else:
+      final_message = '%s:%s:  %s  [%s] [%d]\n' % (
+          filename, linenum, message, category, confidence)
+      self.PrintError(final_message)
+
+  def PrintInfo(self, message):
+    """Writes a message meant for standard output."""
+    sys.stdout.write(message)
+
+  def PrintError(self, message):
+    """Writes a message meant for standard error."""
+    sys.stderr.write(message)
+
+
+class _JUnitReport(object):
+  """Writes the JUnit XML for --output=junit as errors are reported.
+
+  The testsuite's counts come first in the document, so it can only be
+  completed once linting is done. Until then, each file's failures are
+  serialized as soon as errors for another file arrive and are kept in a
+  temporary file, so memory use doesn't grow with the number of errors.
+  """
+
+  def __init__(self):
+    self._num_errors = 0
+    self._num_failures = 0
+    self._errors = tempfile.TemporaryFile('w+', encoding='utf-8')
+    self._testcases = tempfile.TemporaryFile('w+', encoding='utf-8')
+    self._filename = None
+    self._failures = []
+
+  def AddError(self, message):
+    """Records a message about a problem other than a lint error."""
+    if self._num_errors:
+      self._errors.write('\n')
+    self._errors.write(xml.sax.saxutils.escape(message))
+    self._num_errors += 1
+
+  def AddFailure(self, filename, linenum, message, category, confidence):
+    """Records a lint error."""
+    if filename != self._filename:
+      self._FlushFailures()
+      self._filename = filename
+    self._failures.append('{0}: {1} [{2}] [{3}]'.format(
+        linenum, message, category, confidence))
+    self._num_failures += 1
+
+  def _FlushFailures(self):
+    """Writes the failures for the current file as a testcase."""
+    if not self._failures:
+      return
+    testcase = xml.etree.ElementTree.Element('testcase')
+    testcase.attrib['name'] = self._filename
+    failure = xml.etree.ElementTree.SubElement(testcase, 'failure')
+    failure.text = '\n'.join(self._failures)
+    self._testcases.write(
+        xml.etree.ElementTree.tostring(testcase, encoding='unicode'))
+    self._failures = []
+
+  def Finish(self):
+    """Writes the complete document to stderr."""
+    self._FlushFailures()
+    sys.stderr.write('<?xml version="1.0" encoding="UTF-8" ?>\n')
+
+    num_errors = self._num_errors
+    num_failures = self._num_failures
+    if num_errors == 0 and num_failures == 0:
+      sys.stderr.write('<testsuite errors="0" failures="0" name="cpplint" '
+                       'tests="1"><testcase name="passed" /></testsuite>')
+      return
+
+    sys.stderr.write(
+        '<testsuite errors="%d" failures="%d" name="cpplint" tests="%d">' % (
+            num_errors, num_failures, num_errors + num_failures))
+    if num_errors > 0:
+      sys.stderr.write('<testcase name="errors"><error>')
+      self._errors.seek(0)
+      shutil.copyfileobj(self._errors, sys.stderr)
+      sys.stderr.write('</error></testcase>')
+    self._testcases.seek(0)
+    shutil.copyfileobj(self._testcases, sys.stderr)
+    sys.stderr.write('</testsuite>')
+
+
+_SARIF_SCHEMA = 'https://json.schemastore.org/sarif-2.1.0.json'
+
+
+class _SarifReport(object):
+  """Writes a SARIF log for --output=sarif as errors are reported.
+
+  Each result is written to stderr as soon as it is found, so consumers can
+  start on the log before linting finishes. Messages about problems other than
+  lint errors, like unreadable files, are written as tool notifications at
+  the end.
+  """
+
+  def __init__(self):
+    self._num_results = 0
+    self._notifications = []
+
+  def AddError(self, message):
+    """Records a message about a problem other than a lint error."""
+    self._notifications.append(message.rstrip('\n'))
+
+  def AddFailure(self, filename, linenum, message, category, confidence):
+    """Writes a lint error as a result."""
+    location = {'artifactLocation': {'uri': filename.replace('\\', '/')}}
+    if linenum > 0:
+      location['region'] = {'startLine': linenum}
+    result = {
+        'ruleId': category,
+        'level': 'warning',
+        'message': {'text': message},
+        'locations': [{'physicalLocation': location}],
+        'properties': {'confidence': confidence},
+    }
+
+    if self._num_results == 0:
+      self._WriteHeader()
+    else:
+      sys.stderr.write(',')
+    sys.stderr.write('\n' + json.dumps(result))
+    self._num_results += 1
+
+  def _WriteHeader(self):
+    tool = {'driver': {
+        'name': 'cpplint',
+        'version': __VERSION__,
+        'informationUri': 'https://github.com/cpplint/cpplint',
+    }}
+    sys.stderr.write('{"$schema": %s, "version": "2.1.0", '
+                     '"runs": [{"tool": %s, "results": [' % (
+                         json.dumps(_SARIF_SCHEMA), json.dumps(tool)))
+
+  def Finish(self):
+    """Completes the log."""
+    if self._num_results == 0:
+      self._WriteHeader()
+    invocation = {
+        'executionSuccessful': True,
+        'toolExecutionNotifications': [
+            {'level': 'error', 'message': {'text': text}}
+            for text in self._notifications],
+    }
+    sys.stderr.write('\n], "invocations": [%s]}]}\n' % json.dumps(invocation))
+
+
+class _RecordingReport(object):
+  """A report that records what it's given so it can be replayed later."""
+
+  def __init__(self):
+    self.records = []
+
+  def AddError(self, message):
+    self.records.append(('AddError', (message,)))
+
+  def AddFailure(self, filename, linenum, message, category, confidence):
+    self.records.append(
+        ('AddFailure', (filename, linenum, message, category, confidence)))
+
+
+# The reports written for machine-readable output formats.
+_REPORTS = {
+    'junit': _JUnitReport,
+    'sarif': _SarifReport,
+}
+
+
+# A dict of each list of filters, as a tuple, to a dict of category to whether
+# those filters filter the category out. See _CppLintState.IsFiltered.
+_filter_verdicts = {}
+
+
 class _CppLintState(object):
   """Maintains module-wide state.."""
 
@@ -1254,6 +1567,9 @@ class _CppLintState(object):
     self.filters = _DEFAULT_FILTERS[:]
     # backup of filter list. Used to restore the state after each file.
     self._filters_backup = self.filters[:]
+    # dict of category to whether the filters filter it out, or None until
+    # it's needed. See IsFiltered.
+    self._filter_verdicts = None
     self.counting = 'total'  # In what way are we counting errors?
     self.errors_by_category = {}  # string to int dict storing error counts
     self.quiet = False  # Suppress non-error messagess?
@@ -1263,18 +1579,35 @@ class _CppLintState(object):
     # "eclipse" - format that eclipse can parse
     # "vs7" - format that Microsoft Visual Studio 7 can parse
     # "junit" - format that Jenkins, Bamboo, etc can parse
+    # "sarif" - format that code scanning tools, like GitHub's, can parse
     # "sed" - returns a gnu sed command to fix the problem
     # "gsed" - like sed, but names the command gsed, e.g. for macOS homebrew users
     self.output_format = 'emacs'
 
-    # For JUnit output, save errors and failures until the end so that they
-    # can be written into the XML
-    self._junit_errors = []
-    self._junit_failures = []
+    # For JUnit and SARIF output, the report to which errors are written as
+    # they're found.
+    self.report = None
+
+    # Where errors and messages are sent.
+    self.sink = ErrorSink()
+
+  def SetErrorSink(self, sink):
+    """Sets the ErrorSink that receives output, and returns the previous one."""
+    last_sink = self.sink
+    self.sink = sink
+    return last_sink
+
+  def SetReport(self, report):
+    """Sets the report that receives errors, and returns the previous one."""
+    last_report = self.report
+    self.report = report
+    return last_report
 
   def SetOutputFormat(self, output_format):
     """Sets the output format for errors."""
     self.output_format = output_format
+    report_class = _REPORTS.get(output_format)
+    self.report = report_class() if report_class else None
 
   def SetQuiet(self, quiet):
     """Sets the module's quiet settings, and returns the previous setting."""
@@ -1316,6 +1649,7 @@ class _CppLintState(object):
       clean_filt = filt.strip()
       if clean_filt:
         self.filters.append(clean_filt)
+    self._filter_verdicts = None
     for filt in self.filters:
       if not (filt.startswith('+') or filt.startswith('-')):
         raise ValueError('Every filter in --filters must start with + or -'
@@ -1328,6 +1662,35 @@ class _CppLintState(object):
   def RestoreFilters(self):
     """ Restores filters previously backed up."""
     self.filters = self._filters_backup[:]
+    self._filter_verdicts = None
+
+  def IsFiltered(self, category):
+    """Returns whether the filters keep errors in category from printing.
+
+    Filters are evaluated left to right, which is too slow to repeat for every
+    error, so verdicts are remembered for each distinct list of filters. The
+    same lists recur as CPPLINT.cfg files apply filters to each file and they
+    are restored afterwards, so their verdicts are shared across instances.
+    """
+    verdicts = self._filter_verdicts
+    if verdicts is None:
+      verdicts = _filter_verdicts.setdefault(tuple(self.filters), {})
+      self._filter_verdicts = verdicts
+
+    is_filtered = verdicts.get(category)
+    if is_filtered is None:
+      is_filtered = False
+      for one_filter in self.filters:
+        if one_filter.startswith('-'):
+          if category.startswith(one_filter[1:]):
+            is_filtered = True
+        elif one_filter.startswith('+'):
+          if category.startswith(one_filter[1:]):
+            is_filtered = False
+        else:
+          assert False  # should have been checked for in SetFilter.
+      verdicts[category] = is_filtered
+    return is_filtered
 
   def ResetErrorCounts(self):
     """Sets the module's error statistic back to zero."""
@@ -1356,60 +1719,18 @@ class _CppLintState(object):
     # _quiet does not represent --quiet flag.
     # Hide infos from stdout to keep stdout pure for machine consumption
     if not _quiet and self.output_format not in _MACHINE_OUTPUTS:
-      sys.stdout.write(message)
+      self.sink.PrintInfo(message)
 
   def PrintError(self, message):
-    if self.output_format == 'junit':
-      self._junit_errors.append(message)
+    if self.report is not None:
+      self.report.AddError(message)
     else:
-      sys.stderr.write(message)
-
-  def AddJUnitFailure(self, filename, linenum, message, category, confidence):
-    self._junit_failures.append((filename, linenum, message, category,
-        confidence))
-
-  def FormatJUnitXML(self):
-    num_errors = len(self._junit_errors)
-    num_failures = len(self._junit_failures)
-
-    testsuite = xml.etree.ElementTree.Element('testsuite')
-    testsuite.attrib['errors'] = str(num_errors)
-    testsuite.attrib['failures'] = str(num_failures)
-    testsuite.attrib['name'] = 'cpplint'
-
-    if num_errors == 0 and num_failures == 0:
-      testsuite.attrib['tests'] = str(1)
-      xml.etree.ElementTree.SubElement(testsuite, 'testcase', name='passed')
+      self.sink.PrintError(message)
 
-    else:
-      testsuite.attrib['tests'] = str(num_errors + num_failures)
-      if num_errors > 0:
-        testcase = xml.etree.ElementTree.SubElement(testsuite, 'testcase')
-        testcase.attrib['name'] = 'errors'
-        error = xml.etree.ElementTree.SubElement(testcase, 'error')
-        error.text = '\n'.join(self._junit_errors)
-      if num_failures > 0:
-        # Group failures by file
-        failed_file_order = []
-        failures_by_file = {}
-        for failure in self._junit_failures:
-          failed_file = failure[0]
-          if failed_file not in failed_file_order:
-            failed_file_order.append(failed_file)
-            failures_by_file[failed_file] = []
-          failures_by_file[failed_file].append(failure)
-        # Create a testcase for each file
-        for failed_file in failed_file_order:
-          failures = failures_by_file[failed_file]
-          testcase = xml.etree.ElementTree.SubElement(testsuite, 'testcase')
-          testcase.attrib['name'] = failed_file
-          failure = xml.etree.ElementTree.SubElement(testcase, 'failure')
-          template = '{0}: {1} [{2}] [{3}]'
-          texts = [template.format(f[1], f[2], f[3], f[4]) for f in failures]
-          failure.text = '\n'.join(texts)
-
-    xml_decl = '<?xml version="1.0" encoding="UTF-8" ?>\n'
-    return xml_decl + xml.etree.ElementTree.tostring(testsuite, 'utf-8').decode('utf-8')
+  def FinishReport(self):
+    """Completes the report for a machine-readable output format, if any."""
+    if self.report is not None:
+      self.report.Finish()
 
 
 _cpplint_state = _CppLintState()
@@ -1433,6 +1754,11 @@ def _SetQuiet(quiet):
   return _cpplint_state.SetQuiet(quiet)
 
 
+def _SetErrorSink(sink):
+  """Sets the module's ErrorSink, and returns the previous one."""
+  return _cpplint_state.SetErrorSink(sink)
+
+
 def _VerboseLevel():
   """Returns the module's verbosity setting."""
   return _cpplint_state.verbose_level
@@ -1549,6 +1875,66 @@ class _IncludeError(Exception):
   pass
 
 
+def _FindRepositoryRoot(project_dir):
+  """Finds the root of the checkout that contains project_dir.
+
+  The answer depends only on the directory, so FileInfo.RepositoryName caches
+  it in _repository_roots instead of probing the file system for every file.
+
+  Args:
+    project_dir: The absolute path of the directory containing a file.
+
+  Returns:
+    A tuple of (repository_dir, prefix_length).  If repository_dir is set, file
+    names are made relative to that --repository directory.  Otherwise, if
+    prefix_length is set, that many leading characters are dropped from file
+    names.  If neither is set, file names are used in full.
+  """
+  # If the user specified a repository path, it exists, and the file is
+  # contained in it, use the specified repository path
+  if _repository:
+    repo = FileInfo(_repository).FullName()
+    root_dir = project_dir
+    while os.path.exists(root_dir):
+      # allow case insensitive compare on Windows
+      if os.path.normcase(root_dir) == os.path.normcase(repo):
+        return (root_dir, None)
+      one_up_dir = os.path.dirname(root_dir)
+      if one_up_dir == root_dir:
+        break
+      root_dir = one_up_dir
+
+  if os.path.exists(os.path.join(project_dir, ".svn")):
+    # If there's a .svn file in the current directory, we recursively look
+    # up the directory tree for the top of the SVN checkout
+    root_dir = project_dir
+    one_up_dir = os.path.dirname(root_dir)
+    while os.path.exists(os.path.join(one_up_dir, ".svn")):
+      root_dir = os.path.dirname(root_dir)
+      one_up_dir = os.path.dirname(one_up_dir)
+
+    prefix = os.path.commonprefix([root_dir, project_dir])
+    return (None, len(prefix) + 1)
+
+  # Not SVN <= 1.6? Try to find a git, hg, or svn top level directory by
+  # searching up from the current path.
+  root_dir = current_dir = project_dir
+  while current_dir != os.path.dirname(current_dir):
+    if (os.path.exists(os.path.join(current_dir, ".git")) or
+        os.path.exists(os.path.join(current_dir, ".hg")) or
+        os.path.exists(os.path.join(current_dir, ".svn"))):
+      root_dir = current_dir
+    current_dir = os.path.dirname(current_dir)
+
+  if (os.path.exists(os.path.join(root_dir, ".git")) or
+      os.path.exists(os.path.join(root_dir, ".hg")) or
+      os.path.exists(os.path.join(root_dir, ".svn"))):
+    prefix = os.path.commonprefix([root_dir, project_dir])
+    return (None, len(prefix) + 1)
+
+  return (None, None)
+
+
 class FileInfo(object):
   """Provides utility functions for filenames.
 
@@ -1577,48 +1963,16 @@ class FileInfo(object):
 
     if os.path.exists(fullname):
       project_dir = os.path.dirname(fullname)
+      key = (project_dir, _repository)
+      root = _repository_roots.get(key)
+      if root is None:
+        root = _repository_roots[key] = _FindRepositoryRoot(project_dir)
 
-      # If the user specified a repository path, it exists, and the file is
-      # contained in it, use the specified repository path
-      if _repository:
-        repo = FileInfo(_repository).FullName()
-        root_dir = project_dir
-        while os.path.exists(root_dir):
-          # allow case insensitive compare on Windows
-          if os.path.normcase(root_dir) == os.path.normcase(repo):
-            return os.path.relpath(fullname, root_dir).replace('\\', '/')
-          one_up_dir = os.path.dirname(root_dir)
-          if one_up_dir == root_dir:
-            break
-          root_dir = one_up_dir
-
-      if os.path.exists(os.path.join(project_dir, ".svn")):
-        # If there's a .svn file in the current directory, we recursively look
-        # up the directory tree for the top of the SVN checkout
-        root_dir = project_dir
-        one_up_dir = os.path.dirname(root_dir)
-        while os.path.exists(os.path.join(one_up_dir, ".svn")):
-          root_dir = os.path.dirname(root_dir)
-          one_up_dir = os.path.dirname(one_up_dir)
-
-        prefix = os.path.commonprefix([root_dir, project_dir])
-        return fullname[len(prefix) + 1:]
-
-      # Not SVN <= 1.6? Try to find a git, hg, or svn top level directory by
-      # searching up from the current path.
-      root_dir = current_dir = os.path.dirname(fullname)
-      while current_dir != os.path.dirname(current_dir):
-        if (os.path.exists(os.path.join(current_dir, ".git")) or
-            os.path.exists(os.path.join(current_dir, ".hg")) or
-            os.path.exists(os.path.join(current_dir, ".svn"))):
-          root_dir = current_dir
-        current_dir = os.path.dirname(current_dir)
-
-      if (os.path.exists(os.path.join(root_dir, ".git")) or
-          os.path.exists(os.path.join(root_dir, ".hg")) or
-          os.path.exists(os.path.join(root_dir, ".svn"))):
-        prefix = os.path.commonprefix([root_dir, project_dir])
-        return fullname[len(prefix) + 1:]
+      repository_dir, prefix_length = root
+      if repository_dir:
+        return os.path.relpath(fullname, repository_dir).replace('\\', '/')
+      if prefix_length:
+        return fullname[prefix_length:]
 
     # Don't know what to do; header guard warnings may be wrong...
     return fullname
@@ -1660,23 +2014,17 @@ def _ShouldPrintError(category, confidence, linenum):
   # There are three ways we might decide not to print an error message:
   # a "NOLINT(category)" comment appears in the source,
   # the verbosity level isn't high enough, or the filters filter it out.
-  if IsErrorSuppressedByNolint(category, linenum):
+  # The cheapest checks come first.
+  if confidence < _cpplint_state.verbose_level:
     return False
 
-  if confidence < _cpplint_state.verbose_level:
+  if _cpplint_state.IsFiltered(category):
     return False
 
-  is_filtered = False
-  for one_filter in _Filters():
-    if one_filter.startswith('-'):
-      if category.startswith(one_filter[1:]):
-        is_filtered = True
-    elif one_filter.startswith('+'):
-      if category.startswith(one_filter[1:]):
-        is_filtered = False
-    else:
-      assert False  # should have been checked for in SetFilter.
-  if is_filtered:
+  if _selected_lines is not None and linenum not in _selected_lines:
+    return False
+
+  if IsErrorSuppressedByNolint(category, linenum):
     return False
 
   return True
@@ -1706,26 +2054,46 @@ def Error(filename, linenum, category, confidence, message):
   """
   if _ShouldPrintError(category, confidence, linenum):
     _cpplint_state.IncrementErrorCount(category)
-    if _cpplint_state.output_format == 'vs7':
-      _cpplint_state.PrintError('%s(%s): error cpplint: [%s] %s [%d]\n' % (
-          filename, linenum, category, message, confidence))
-    elif _cpplint_state.output_format == 'eclipse':
-      sys.stderr.write('%s:%s: warning: %s  [%s] [%d]\n' % (
-          filename, linenum, message, category, confidence))
-    elif _cpplint_state.output_format == 'junit':
-      _cpplint_state.AddJUnitFailure(filename, linenum, message, category,
-          confidence)
-    elif _cpplint_state.output_format in ['sed', 'gsed']:
-      if message in _SED_FIXUPS:
-        sys.stdout.write(_cpplint_state.output_format + " -i '%s%s' %s # %s  [%s] [%d]\n" % (
-            linenum, _SED_FIXUPS[message], filename, message, category, confidence))
-      else:
-        sys.stderr.write('# %s:%s:  "%s"  [%s] [%d]\n' % (
-            filename, linenum, message, category, confidence))
-    else:
-      final_message = '%s:%s:  %s  [%s] [%d]\n' % (
-          filename, linenum, message, category, confidence)
-      sys.stderr.write(final_message)
+    _cpplint_state.sink.Error(filename, linenum, category, confidence, message)
+
+
+# The categories of error that each check function can report, by the check's
+# name, for the checks that keep no state between lines or files.  These are
+# skipped for files on which every category they report is filtered out.
+_check_categories = {}
+
+# The checks to skip for the file being processed.  See _SkippedChecks.
+_skipped_checks = frozenset()
+
+
+def _ReportsCategories(*categories):
+  """Declares the categories of error that a check function can report.
+
+  Only declare this for checks that keep no state of their own, and so can be
+  skipped without changing what other checks report.
+
+  Args:
+    categories: Every category the check, or any function it calls, reports.
+
+  Returns:
+    A decorator that registers the check.
+  """
+  def Register(check):
+    _check_categories[check.__name__] = categories
+    return check
+  return Register
+
+
+def _SkippedChecks():
+  """Returns the checks that could only report errors that are filtered out.
+
+  The result holds the functions currently bound to the checks' names, so
+  it matches checks that --profile has wrapped too.
+  """
+  module_globals = globals()
+  return frozenset(
+      module_globals[name] for name, categories in iteritems(_check_categories)
+      if all(_cpplint_state.IsFiltered(category) for category in categories))
 
 # Matches standard C++ escape sequences per 2.13.2.3 of the C++ standard.
 _RE_PATTERN_CLEANSE_LINE_ESCAPES = re.compile(
@@ -1787,52 +2155,7 @@ def CleanseRawStrings(raw_lines):
   delimiter = None
   lines_without_raw_strings = []
   for line in raw_lines:
-    if delimiter:
-      # Inside a raw string, look for the end
-      end = line.find(delimiter)
-      if end >= 0:
-        # Found the end of the string, match leading space for this
-        # line and resume copying the original lines, and also insert
-        # a "" on the last line.
-        leading_space = Match(r'^(\s*)\S', line)
-        line = leading_space.group(1) + '""' + line[end + len(delimiter):]
-        delimiter = None
-      else:
-        # Haven't found the end yet, append a blank line.
-        line = '""'
-
-    # Look for beginning of a raw string, and replace them with
-    # empty strings.  This is done in a loop to handle multiple raw
-    # strings on the same line.
-    while delimiter is None:
-      # Look for beginning of a raw string.
-      # See 2.14.15 [lex.string] for syntax.
-      #
-      # Once we have matched a raw string, we check the prefix of the
-      # line to make sure that the line is not part of a single line
-      # comment.  It's done this way because we remove raw strings
-      # before removing comments as opposed to removing comments
-      # before removing raw strings.  This is because there are some
-      # cpplint checks that requires the comments to be preserved, but
-      # we don't want to check comments that are inside raw strings.
-      matched = Match(r'^(.*?)\b(?:R|u8R|uR|UR|LR)"([^\s\\()]*)\((.*)$', line)
-      if (matched and
-          not Match(r'^([^\'"]|\'(\\.|[^\'])*\'|"(\\.|[^"])*")*//',
-                    matched.group(1))):
-        delimiter = ')' + matched.group(2) + '"'
-
-        end = matched.group(3).find(delimiter)
-        if end >= 0:
-          # Raw string ended on same line
-          line = (matched.group(1) + '""' +
-                  matched.group(3)[end + len(delimiter):])
-          delimiter = None
-        else:
-          # Start of a multi-line raw string
-          line = matched.group(1) + '""'
-      else:
-        break
-
+    line, delimiter = _CleanseRawStringsInLine(line, delimiter)
     lines_without_raw_strings.append(line)
 
   # TODO(unknown): if delimiter is not None here, we might want to
@@ -1840,6 +2163,67 @@ def CleanseRawStrings(raw_lines):
   return lines_without_raw_strings
 
 
+def _CleanseRawStringsInLine(line, delimiter):
+  """Removes C++11 raw strings from a single line.
+
+  Args:
+    line: The raw line.
+    delimiter: The delimiter that ends the raw string the line starts in, or
+      None if the line doesn't start inside a raw string.
+
+  Returns:
+    A tuple of the line with raw strings replaced by empty strings, and the
+    delimiter of the raw string the next line starts in (or None).
+  """
+  if delimiter:
+    # Inside a raw string, look for the end
+    end = line.find(delimiter)
+    if end >= 0:
+      # Found the end of the string, match leading space for this
+      # line and resume copying the original lines, and also insert
+      # a "" on the last line.
+      leading_space = Match(r'^(\s*)\S', line)
+      line = leading_space.group(1) + '""' + line[end + len(delimiter):]
+      delimiter = None
+    else:
+      # Haven't found the end yet, append a blank line.
+      line = '""'
+
+  # Look for beginning of a raw string, and replace them with
+  # empty strings.  This is done in a loop to handle multiple raw
+  # strings on the same line.
+  while delimiter is None:
+    # Look for beginning of a raw string.
+    # See 2.14.15 [lex.string] for syntax.
+    #
+    # Once we have matched a raw string, we check the prefix of the
+    # line to make sure that the line is not part of a single line
+    # comment.  It's done this way because we remove raw strings
+    # before removing comments as opposed to removing comments
+    # before removing raw strings.  This is because there are some
+    # cpplint checks that requires the comments to be preserved, but
+    # we don't want to check comments that are inside raw strings.
+    matched = Match(r'^(.*?)\b(?:R|u8R|uR|UR|LR)"([^\s\\()]*)\((.*)$', line)
+    if (matched and
+        not Match(r'^([^\'"]|\'(\\.|[^\'])*\'|"(\\.|[^"])*")*//',
+                  matched.group(1))):
+      delimiter = ')' + matched.group(2) + '"'
+
+      end = matched.group(3).find(delimiter)
+      if end >= 0:
+        # Raw string ended on same line
+        line = (matched.group(1) + '""' +
+                matched.group(3)[end + len(delimiter):])
+        delimiter = None
+      else:
+        # Start of a multi-line raw string
+        line = matched.group(1) + '""'
+    else:
+      break
+
+  return line, delimiter
+
+
 def FindNextMultiLineCommentStart(lines, lineix):
   """Find the beginning marker for a multiline comment."""
   while lineix < len(lines):
@@ -1893,6 +2277,10 @@ def CleanseComments(line):
   Returns:
     The line with single-line comments removed.
   """
+  # Both kinds of comment start with a slash, and most lines have none.
+  if '/' not in line:
+    return line
+
   commentpos = line.find('//')
   if commentpos != -1 and not IsCppString(line[:commentpos]):
     line = line[:commentpos].rstrip()
@@ -1909,6 +2297,10 @@ class CleansedLines(object):
   4) lines_without_raw_strings member is same as raw_lines, but with C++11 raw
      strings removed.
   All these members are of <type 'list'>, and of the same length.
+
+  All four are built in a single pass over the lines. Lines that a step
+  leaves unchanged are shared rather than copied, and when a file has no raw
+  strings, lines_without_raw_strings is raw_lines itself.
   """
 
   def __init__(self, lines):
@@ -1916,12 +2308,30 @@ class CleansedLines(object):
     self.lines = []
     self.raw_lines = lines
     self.num_lines = len(lines)
-    self.lines_without_raw_strings = CleanseRawStrings(lines)
-    for linenum in range(len(self.lines_without_raw_strings)):
-      self.lines.append(CleanseComments(
-          self.lines_without_raw_strings[linenum]))
-      elided = self._CollapseStrings(self.lines_without_raw_strings[linenum])
-      self.elided.append(CleanseComments(elided))
+
+    lines_without_raw_strings = []
+    has_raw_strings = False
+    delimiter = None
+    for raw_line in lines:
+      line = raw_line
+      # All raw string prefixes end in R", so lines without that which don't
+      # start inside a raw string have nothing to remove.
+      if delimiter is not None or 'R"' in line:
+        line, delimiter = _CleanseRawStringsInLine(line, delimiter)
+        has_raw_strings = has_raw_strings or line != raw_line
+      lines_without_raw_strings.append(line)
+
+      without_comments = CleanseComments(line)
+      self.lines.append(without_comments)
+
+      elided = self._CollapseStrings(line)
+      if elided is line:
+        self.elided.append(without_comments)
+      else:
+        self.elided.append(CleanseComments(elided))
+
+    self.lines_without_raw_strings = (
+        lines_without_raw_strings if has_raw_strings else lines)
 
   def NumLines(self):
     """Returns the number of lines represented."""
@@ -1937,8 +2347,16 @@ class CleansedLines(object):
       elided: The line being processed.
 
     Returns:
-      The line with collapsed strings.
+      The line with collapsed strings. This is the same object as the input
+      when there was nothing to collapse.
     """
+    if '"' not in elided and "'" not in elided:
+      # Without quotes, only escaped characters would be removed, and those
+      # need a backslash.
+      if '\\' not in elided or _RE_PATTERN_INCLUDE.match(elided):
+        return elided
+      return _RE_PATTERN_CLEANSE_LINE_ESCAPES.sub('', elided)
+
     if _RE_PATTERN_INCLUDE.match(elided):
       return elided
 
@@ -1949,26 +2367,30 @@ class CleansedLines(object):
 
     # Replace quoted strings and digit separators.  Both single quotes
     # and double quotes are processed in the same loop, otherwise
-    # nested quotes wouldn't work.
-    collapsed = ''
+    # nested quotes wouldn't work.  The line is scanned by position rather
+    # than by repeatedly splitting off the remainder, so each character is
+    # only visited a constant number of times.
+    collapsed = []
+    pos = 0
     while True:
       # Find the first quote character
-      match = Match(r'^([^\'"]*)([\'"])(.*)$', elided)
+      match = _RE_PATTERN_QUOTE.search(elided, pos)
       if not match:
-        collapsed += elided
+        collapsed.append(elided[pos:])
         break
-      head, quote, tail = match.groups()
+      quote = match.start()
+      head = elided[pos:quote]
 
-      if quote == '"':
+      if elided[quote] == '"':
         # Collapse double quoted strings
-        second_quote = tail.find('"')
+        second_quote = elided.find('"', quote + 1)
         if second_quote >= 0:
-          collapsed += head + '""'
-          elided = tail[second_quote + 1:]
+          collapsed.append(head + '""')
+          pos = second_quote + 1
         else:
           # Unmatched double quote, don't bother processing the rest
           # of the line since this is probably a multiline string.
-          collapsed += elided
+          collapsed.append(elided[pos:])
           break
       else:
         # Found single quote, check nearby text to eliminate digit separators.
@@ -1978,21 +2400,28 @@ class CleansedLines(object):
         # correctly as long as there are digits on both sides of the
         # separator.  So we are fine as long as we don't see something
         # like "0.'3" (gcc 4.9.0 will not allow this literal).
-        if Search(r'\b(?:0[bBxX]?|[1-9])[0-9a-fA-F]*$', head):
-          match_literal = Match(r'^((?:\'?[0-9a-zA-Z_])*)(.*)$', "'" + tail)
-          collapsed += head + match_literal.group(1).replace("'", '')
-          elided = match_literal.group(2)
+        if _RE_PATTERN_DIGIT_SEPARATOR_PREFIX.search(head):
+          literal_end = _RE_PATTERN_DIGIT_SEPARATED.match(elided, quote).end()
+          collapsed.append(head + elided[quote:literal_end].replace("'", ''))
+          pos = literal_end
         else:
-          second_quote = tail.find('\'')
+          second_quote = elided.find('\'', quote + 1)
           if second_quote >= 0:
-            collapsed += head + "''"
-            elided = tail[second_quote + 1:]
+            collapsed.append(head + "''")
+            pos = second_quote + 1
           else:
             # Unmatched single quote
-            collapsed += elided
+            collapsed.append(elided[pos:])
             break
 
-    return collapsed
+    return ''.join(collapsed)
+
+
+# Patterns used by CleansedLines._CollapseStrings.
+_RE_PATTERN_QUOTE = re.compile(r'[\'"]')
+_RE_PATTERN_DIGIT_SEPARATOR_PREFIX = re.compile(
+    r'\b(?:0[bBxX]?|[1-9])[0-9a-fA-F]*$')
+_RE_PATTERN_DIGIT_SEPARATED = re.compile(r'(?:\'?[0-9a-zA-Z_])*')
 
 
 def FindEndOfExpressionInLine(line, startpos, stack):
@@ -2232,6 +2661,7 @@ def ReverseCloseExpression(clean_lines, linenum, pos):
   return (line, 0, -1)
 
 
+@_ReportsCategories('legal/copyright')
 def CheckForCopyright(filename, lines, error):
   """Logs an error if no Copyright message appears at the top of the file."""
 
@@ -2381,12 +2811,12 @@ def CheckForHeaderGuard(filename, clean_lines, error):
   # and not the general NOLINT or NOLINT(*) syntax.
   raw_lines = clean_lines.lines_without_raw_strings
   for i in raw_lines:
-    if Search(r'//\s*NOLINT\(build/header_guard\)', i):
+    if 'NOLINT' in i and Search(r'//\s*NOLINT\(build/header_guard\)', i):
       return
 
   # Allow pragma once instead of header guards
   for i in raw_lines:
-    if Search(r'^\s*#pragma\s+once', i):
+    if 'pragma' in i and Search(r'^\s*#pragma\s+once', i):
       return
 
   cppvar = GetHeaderGuardCPPVariable(filename)
@@ -2464,6 +2894,7 @@ def CheckForHeaderGuard(filename, clean_lines, error):
         '#endif line should be "#endif  // %s"' % cppvar)
 
 
+@_ReportsCategories('build/include')
 def CheckHeaderFileIncluded(filename, include_state, error):
   """Logs an error if a source file does not include its header."""
 
@@ -2497,6 +2928,7 @@ def CheckHeaderFileIncluded(filename, include_state, error):
     error(filename, first_include, 'build/include', 5, message)
 
 
+@_ReportsCategories('readability/nul', 'readability/utf8')
 def CheckForBadCharacters(filename, lines, error):
   """Logs an error for each line containing bad characters.
 
@@ -2522,6 +2954,7 @@ def CheckForBadCharacters(filename, lines, error):
       error(filename, linenum, 'readability/nul', 5, 'Line contains NUL byte.')
 
 
+@_ReportsCategories('whitespace/ending_newline')
 def CheckForNewlineAtEOF(filename, lines, error):
   """Logs an error if there is no newline char at the end of the file.
 
@@ -2540,6 +2973,8 @@ def CheckForNewlineAtEOF(filename, lines, error):
           'Could not find a newline character at the end of the file.')
 
 
+@_ReportsCategories('readability/multiline_comment',
+                    'readability/multiline_string')
 def CheckForMultilineCommentsAndStrings(filename, clean_lines, linenum, error):
   """Logs an error if we see /* ... */ or "..." that extend past one line.
 
@@ -2607,7 +3042,18 @@ _THREADING_LIST = (
     ('ttyname(', 'ttyname_r(', _UNSAFE_FUNC_PREFIX + r'ttyname\([^)]+\)'),
     )
 
+# Precompiled forms of the patterns above, plus one pattern that finds a call
+# to any of the functions.  Nearly every line calls none of them, so the
+# combined pattern lets most lines skip the individual searches entirely.
+_THREADING_LIST_RE = tuple(
+    (single_thread_func, multithread_safe_func, re.compile(pattern))
+    for single_thread_func, multithread_safe_func, pattern in _THREADING_LIST)
+_RE_PATTERN_THREADING_FUNC = re.compile(
+    _UNSAFE_FUNC_PREFIX + r'(?:%s)\(' %
+    '|'.join(func[:-1] for func, _, _ in _THREADING_LIST))
 
+
+@_ReportsCategories('runtime/threadsafe_fn')
 def CheckPosixThreading(filename, clean_lines, linenum, error):
   """Checks for calls to thread-unsafe functions.
 
@@ -2624,16 +3070,23 @@ def CheckPosixThreading(filename, clean_lines, linenum, error):
     error: The function to call with any errors found.
   """
   line = clean_lines.elided[linenum]
-  for single_thread_func, multithread_safe_func, pattern in _THREADING_LIST:
+  if not _RE_PATTERN_THREADING_FUNC.search(line):
+    return
+  for single_thread_func, multithread_safe_func, pattern in _THREADING_LIST_RE:
     # Additional pattern matching check to confirm that this is the
     # function we are looking for
-    if Search(pattern, line):
+    if pattern.search(line):
       error(filename, linenum, 'runtime/threadsafe_fn', 2,
             'Consider using ' + multithread_safe_func +
             '...) instead of ' + single_thread_func +
             '...) for improved thread safety.')
 
 
+_RE_PATTERN_VLOG_SEVERITY = re.compile(
+    r'\bVLOG\((INFO|ERROR|WARNING|DFATAL|FATAL)\)')
+
+
+@_ReportsCategories('runtime/vlog')
 def CheckVlogArguments(filename, clean_lines, linenum, error):
   """Checks that VLOG() is only used for defining a logging level.
 
@@ -2647,7 +3100,7 @@ def CheckVlogArguments(filename, clean_lines, linenum, error):
     error: The function to call with any errors found.
   """
   line = clean_lines.elided[linenum]
-  if Search(r'\bVLOG\((INFO|ERROR|WARNING|DFATAL|FATAL)\)', line):
+  if _RE_PATTERN_VLOG_SEVERITY.search(line):
     error(filename, linenum, 'runtime/vlog', 5,
           'VLOG() should be used with numeric verbosity level.  '
           'Use LOG() if you want symbolic severity levels.')
@@ -2658,6 +3111,7 @@ _RE_PATTERN_INVALID_INCREMENT = re.compile(
     r'^\s*\*\w+(\+\+|--);')
 
 
+@_ReportsCategories('runtime/invalid_increment')
 def CheckInvalidIncrement(filename, clean_lines, linenum, error):
   """Checks for invalid increment *count++.
 
@@ -2690,8 +3144,12 @@ def IsMacroDefinition(clean_lines, linenum):
   return False
 
 
+_RE_PATTERN_FORWARD_CLASS_DECL = re.compile(
+    r'^\s*(\btemplate\b)*.*class\s+\w+;\s*$')
+
+
 def IsForwardClassDeclaration(clean_lines, linenum):
-  return Match(r'^\s*(\btemplate\b)*.*class\s+\w+;\s*$', clean_lines[linenum])
+  return _RE_PATTERN_FORWARD_CLASS_DECL.match(clean_lines[linenum])
 
 
 class _BlockInfo(object):
@@ -2895,6 +3353,20 @@ class _PreprocessorInfo(object):
     self.seen_else = False
 
 
+# Patterns that NestingState applies to every line.
+_RE_PATTERN_CONDITIONAL_DIRECTIVE = re.compile(
+    r'^\s*#\s*(if|ifdef|ifndef|else|elif|endif)\b')
+_RE_PATTERN_NAMESPACE_DECL = re.compile(r'^\s*namespace\b\s*([:\w]+)?(.*)$')
+_RE_PATTERN_CLASS_DECL = re.compile(
+    r'^(\s*(?:template\s*<[\w\s<>,:=]*>\s*)?'
+    r'(class|struct)\s+(?:[a-zA-Z0-9_]+\s+)*(\w+(?:::\w+)*))'
+    r'(.*)$')
+_RE_PATTERN_ACCESS_SPECIFIER = re.compile(
+    r'^(.*)\b(public|private|protected|signals)(\s+(?:slots\s*)?)?'
+    r':(?:[^:]|$)')
+_RE_PATTERN_BLOCK_TOKEN = re.compile(r'^[^{;)}]*([{;)}])(.*)$')
+
+
 class NestingState(object):
   """Holds states related to parsing braces."""
 
@@ -3035,11 +3507,15 @@ class NestingState(object):
     Args:
       line: current line to check.
     """
-    if Match(r'^\s*#\s*(if|ifdef|ifndef)\b', line):
+    match = _RE_PATTERN_CONDITIONAL_DIRECTIVE.match(line)
+    if not match:
+      return
+    directive = match.group(1)
+    if directive in ('if', 'ifdef', 'ifndef'):
       # Beginning of #if block, save the nesting stack here.  The saved
       # stack will allow us to restore the parsing state in the #else case.
       self.pp_stack.append(_PreprocessorInfo(copy.deepcopy(self.stack)))
-    elif Match(r'^\s*#\s*(else|elif)\b', line):
+    elif directive in ('else', 'elif'):
       # Beginning of #else block
       if self.pp_stack:
         if not self.pp_stack[-1].seen_else:
@@ -3054,7 +3530,7 @@ class NestingState(object):
       else:
         # TODO(unknown): unexpected #else, issue warning?
         pass
-    elif Match(r'^\s*#\s*endif\b', line):
+    else:
       # End of #if or #else blocks.
       if self.pp_stack:
         # If we saw an #else, we will need to restore the nesting
@@ -3126,7 +3602,7 @@ class NestingState(object):
       # declarations even if it weren't followed by a whitespace, this
       # is so that we don't confuse our namespace checker.  The
       # missing spaces will be flagged by CheckSpacing.
-      namespace_decl_match = Match(r'^\s*namespace\b\s*([:\w]+)?(.*)$', line)
+      namespace_decl_match = _RE_PATTERN_NAMESPACE_DECL.match(line)
       if not namespace_decl_match:
         break
 
@@ -3143,10 +3619,7 @@ class NestingState(object):
     # such as in:
     #   class LOCKABLE API Object {
     #   };
-    class_decl_match = Match(
-        r'^(\s*(?:template\s*<[\w\s<>,:=]*>\s*)?'
-        r'(class|struct)\s+(?:[a-zA-Z0-9_]+\s+)*(\w+(?:::\w+)*))'
-        r'(.*)$', line)
+    class_decl_match = _RE_PATTERN_CLASS_DECL.match(line)
     if (class_decl_match and
         (not self.stack or self.stack[-1].open_parentheses == 0)):
       # We do not want to accept classes that are actually template arguments:
@@ -3173,10 +3646,7 @@ class NestingState(object):
     # Update access control if we are inside a class/struct
     if self.stack and isinstance(self.stack[-1], _ClassInfo):
       classinfo = self.stack[-1]
-      access_match = Match(
-          r'^(.*)\b(public|private|protected|signals)(\s+(?:slots\s*)?)?'
-          r':(?:[^:]|$)',
-          line)
+      access_match = _RE_PATTERN_ACCESS_SPECIFIER.match(line)
       if access_match:
         classinfo.access = access_match.group(2)
 
@@ -3199,7 +3669,7 @@ class NestingState(object):
     # Consume braces or semicolons from what's left of the line
     while True:
       # Match first brace, semicolon, or closed parenthesis.
-      matched = Match(r'^[^{;)}]*([{;)}])(.*)$', line)
+      matched = _RE_PATTERN_BLOCK_TOKEN.match(line)
       if not matched:
         break
 
@@ -3269,6 +3739,28 @@ class NestingState(object):
               obj.name)
 
 
+# Patterns for CheckForNonStandardConstructs.
+_RE_PATTERN_PRINTF_Q = re.compile(r'printf\s*\(.*".*%[-+ ]?\d*q')
+_RE_PATTERN_PRINTF_POSITIONAL = re.compile(r'printf\s*\(.*".*%\d+\$')
+_RE_PATTERN_UNDEFINED_ESCAPE = re.compile(r'("|\').*\\(%|\[|\(|{)')
+_RE_PATTERN_LATE_STORAGE_CLASS = re.compile(
+    r'\b(const|volatile|void|char|short|int|long'
+    r'|float|double|signed|unsigned'
+    r'|schar|u?int8|u?int16|u?int32|u?int64)'
+    r'\s+(register|static|extern|typedef)\b')
+_RE_PATTERN_ENDIF_TEXT = re.compile(r'\s*#\s*endif\s*[^/\s]+')
+_RE_PATTERN_INNER_FORWARD_DECL = re.compile(
+    r'\s*class\s+(\w+\s*::\s*)+\w+\s*;')
+_RE_PATTERN_MIN_MAX_OPERATOR = re.compile(
+    r'(\w+|[+-]?\d+(\.\d*)?)\s*(<|>)\?=?\s*(\w+|[+-]?\d+)(\.\d*)?')
+_RE_PATTERN_CONST_STRING_MEMBER = re.compile(
+    r'^\s*const\s*string\s*&\s*\w+\s*;')
+
+
+@_ReportsCategories('build/deprecated', 'build/endif_comment',
+                    'build/forward_decl', 'build/printf_format',
+                    'build/storage_class', 'runtime/explicit',
+                    'runtime/member_string_references', 'runtime/printf_format')
 def CheckForNonStandardConstructs(filename, clean_lines, linenum,
                                   nesting_state, error):
   r"""Logs an error if we see certain non-ANSI constructs ignored by gcc-2.
@@ -3301,47 +3793,46 @@ def CheckForNonStandardConstructs(filename, clean_lines, linenum,
   # Remove comments from the line, but leave in strings for now.
   line = clean_lines.lines[linenum]
 
-  if Search(r'printf\s*\(.*".*%[-+ ]?\d*q', line):
-    error(filename, linenum, 'runtime/printf_format', 3,
-          '%q in format strings is deprecated.  Use %ll instead.')
+  # The patterns below all need a literal that most lines lack, so test for
+  # that first.
+  if 'printf' in line:
+    if _RE_PATTERN_PRINTF_Q.search(line):
+      error(filename, linenum, 'runtime/printf_format', 3,
+            '%q in format strings is deprecated.  Use %ll instead.')
 
-  if Search(r'printf\s*\(.*".*%\d+\$', line):
-    error(filename, linenum, 'runtime/printf_format', 2,
-          '%N$ formats are unconventional.  Try rewriting to avoid them.')
+    if _RE_PATTERN_PRINTF_POSITIONAL.search(line):
+      error(filename, linenum, 'runtime/printf_format', 2,
+            '%N$ formats are unconventional.  Try rewriting to avoid them.')
 
-  # Remove escaped backslashes before looking for undefined escapes.
-  line = line.replace('\\\\', '')
+  if '\\' in line:
+    # Remove escaped backslashes before looking for undefined escapes.
+    line = line.replace('\\\\', '')
 
-  if Search(r'("|\').*\\(%|\[|\(|{)', line):
-    error(filename, linenum, 'build/printf_format', 3,
-          '%, [, (, and { are undefined character escapes.  Unescape them.')
+    if _RE_PATTERN_UNDEFINED_ESCAPE.search(line):
+      error(filename, linenum, 'build/printf_format', 3,
+            '%, [, (, and { are undefined character escapes.  Unescape them.')
 
   # For the rest, work with both comments and strings removed.
   line = clean_lines.elided[linenum]
 
-  if Search(r'\b(const|volatile|void|char|short|int|long'
-            r'|float|double|signed|unsigned'
-            r'|schar|u?int8|u?int16|u?int32|u?int64)'
-            r'\s+(register|static|extern|typedef)\b',
-            line):
+  if _RE_PATTERN_LATE_STORAGE_CLASS.search(line):
     error(filename, linenum, 'build/storage_class', 5,
           'Storage-class specifier (static, extern, typedef, etc) should be '
           'at the beginning of the declaration.')
 
-  if Match(r'\s*#\s*endif\s*[^/\s]+', line):
+  if _RE_PATTERN_ENDIF_TEXT.match(line):
     error(filename, linenum, 'build/endif_comment', 5,
           'Uncommented text after #endif is non-standard.  Use a comment.')
 
-  if Match(r'\s*class\s+(\w+\s*::\s*)+\w+\s*;', line):
+  if _RE_PATTERN_INNER_FORWARD_DECL.match(line):
     error(filename, linenum, 'build/forward_decl', 5,
           'Inner-style forward declarations are invalid.  Remove this line.')
 
-  if Search(r'(\w+|[+-]?\d+(\.\d*)?)\s*(<|>)\?=?\s*(\w+|[+-]?\d+)(\.\d*)?',
-            line):
+  if '?' in line and _RE_PATTERN_MIN_MAX_OPERATOR.search(line):
     error(filename, linenum, 'build/deprecated', 3,
           '>? and <? (max and min) operators are non-standard and deprecated.')
 
-  if Search(r'^\s*const\s*string\s*&\s*\w+\s*;', line):
+  if _RE_PATTERN_CONST_STRING_MEMBER.match(line):
     # TODO(unknown): Could it be expanded safely to arbitrary references,
     # without triggering too many false positives? The first
     # attempt triggered 5 warnings for mostly benign code in the regtest, hence
@@ -3434,6 +3925,26 @@ def CheckForNonStandardConstructs(filename, clean_lines, linenum,
               'Zero-parameter constructors should not be marked explicit.')
 
 
+# Patterns for CheckSpacingForFunctionCall.  A control flow construct is only
+# looked for if the line has one of the keywords followed by a paren.
+_RE_PATTERN_CONTROL_FLOW_PREFIX = re.compile(r'\b(?:if|for|while|switch)\s*\(')
+_RE_PATTERN_CONTROL_FLOW_ARGS = (
+    re.compile(r'\bif\s*\((.*)\)\s*{'),
+    re.compile(r'\bfor\s*\((.*)\)\s*{'),
+    re.compile(r'\bwhile\s*\((.*)\)\s*[{;]'),
+    re.compile(r'\bswitch\s*\((.*)\)\s*{'),
+)
+_RE_PATTERN_NON_CALL_KEYWORD = re.compile(
+    r'\b(if|for|while|switch|return|new|delete|catch|sizeof)\b')
+_RE_PATTERN_FUNCTION_POINTER = re.compile(r' \([^)]+\)\([^)]*(\)|,$)')
+_RE_PATTERN_ARRAY_POINTER = re.compile(r' \([^)]+\)\[[^\]]+\]')
+_RE_PATTERN_SPACE_AFTER_CALL_PAREN = re.compile(r'\w\s*\(\s(?!\s*\\$)')
+_RE_PATTERN_SPACE_AFTER_PAREN = re.compile(r'\(\s+(?!(\s*\\)|\()')
+_RE_PATTERN_SPACE_BEFORE_CALL_PAREN = re.compile(r'\w\s+\(')
+_RE_PATTERN_SPACE_BEFORE_CLOSE_PAREN = re.compile(r'[^)]\s+\)\s*[^{\s]')
+
+
+@_ReportsCategories('whitespace/parens')
 def CheckSpacingForFunctionCall(filename, clean_lines, linenum, error):
   """Checks for the correctness of various spacing around function calls.
 
@@ -3450,14 +3961,12 @@ def CheckSpacingForFunctionCall(filename, clean_lines, linenum, error):
   # first see if we should be looking inside such an expression for a
   # function call, to which we can apply more strict standards.
   fncall = line    # if there's no control flow construct, look at whole line
-  for pattern in (r'\bif\s*\((.*)\)\s*{',
-                  r'\bfor\s*\((.*)\)\s*{',
-                  r'\bwhile\s*\((.*)\)\s*[{;]',
-                  r'\bswitch\s*\((.*)\)\s*{'):
-    match = Search(pattern, line)
-    if match:
-      fncall = match.group(1)    # look inside the parens for function calls
-      break
+  if _RE_PATTERN_CONTROL_FLOW_PREFIX.search(line):
+    for pattern in _RE_PATTERN_CONTROL_FLOW_ARGS:
+      match = pattern.search(line)
+      if match:
+        fncall = match.group(1)    # look inside the parens for function calls
+        break
 
   # Except in if/for/while/switch, there should never be space
   # immediately inside parens (eg "f( 3, 4 )").  We make an exception
@@ -3473,19 +3982,18 @@ def CheckSpacingForFunctionCall(filename, clean_lines, linenum, error):
   # Note that we assume the contents of [] to be short enough that
   # they'll never need to wrap.
   if (  # Ignore control structures.
-      not Search(r'\b(if|for|while|switch|return|new|delete|catch|sizeof)\b',
-                 fncall) and
+      not _RE_PATTERN_NON_CALL_KEYWORD.search(fncall) and
       # Ignore pointers/references to functions.
-      not Search(r' \([^)]+\)\([^)]*(\)|,$)', fncall) and
+      not _RE_PATTERN_FUNCTION_POINTER.search(fncall) and
       # Ignore pointers/references to arrays.
-      not Search(r' \([^)]+\)\[[^\]]+\]', fncall)):
-    if Search(r'\w\s*\(\s(?!\s*\\$)', fncall):      # a ( used for a fn call
+      not _RE_PATTERN_ARRAY_POINTER.search(fncall)):
+    if _RE_PATTERN_SPACE_AFTER_CALL_PAREN.search(fncall):  # a ( for a fn call
       error(filename, linenum, 'whitespace/parens', 4,
             'Extra space after ( in function call')
-    elif Search(r'\(\s+(?!(\s*\\)|\()', fncall):
+    elif _RE_PATTERN_SPACE_AFTER_PAREN.search(fncall):
       error(filename, linenum, 'whitespace/parens', 2,
             'Extra space after (')
-    if (Search(r'\w\s+\(', fncall) and
+    if (_RE_PATTERN_SPACE_BEFORE_CALL_PAREN.search(fncall) and
         not Search(r'_{0,2}asm_{0,2}\s+_{0,2}volatile_{0,2}\s+\(', fncall) and
         not Search(r'#\s*define|typedef|using\s+\w+\s*=', fncall) and
         not Search(r'\w\s+\((\w+::)*\*\w+\)\(', fncall) and
@@ -3500,7 +4008,7 @@ def CheckSpacingForFunctionCall(filename, clean_lines, linenum, error):
               'Extra space before ( in function call')
     # If the ) is followed only by a newline or a { + newline, assume it's
     # part of a control statement (if/while/etc), and don't complain
-    if Search(r'[^)]\s+\)\s*[^{\s]', fncall):
+    if _RE_PATTERN_SPACE_BEFORE_CLOSE_PAREN.search(fncall):
       # If the closing parenthesis is preceded by only whitespaces,
       # try to give a more descriptive error message.
       if Search(r'^\s+\)', fncall):
@@ -3526,6 +4034,7 @@ def IsBlankLine(line):
   return not line or line.isspace()
 
 
+@_ReportsCategories('runtime/indentation_namespace')
 def CheckForNamespaceIndentation(filename, nesting_state, clean_lines, line,
                                  error):
   is_namespace_indent_item = (
@@ -3540,6 +4049,13 @@ def CheckForNamespaceIndentation(filename, nesting_state, clean_lines, line,
                                     line, error)
 
 
+# Patterns for CheckForFunctionLengths.
+_RE_PATTERN_FUNCTION_START = re.compile(
+    r'(\w(\w|::|\*|\&|\s)*)\(')  # decls * & space::name( ...
+_RE_PATTERN_FUNCTION_END = re.compile(r'^\}\s*$')
+_RE_PATTERN_BLANK_LINE = re.compile(r'^\s*$')
+
+
 def CheckForFunctionLengths(filename, clean_lines, linenum,
                             function_state, error):
   """Reports for long function bodies.
@@ -3568,8 +4084,7 @@ def CheckForFunctionLengths(filename, clean_lines, linenum,
   joined_line = ''
 
   starting_func = False
-  regexp = r'(\w(\w|::|\*|\&|\s)*)\('  # decls * & space::name( ...
-  match_result = Match(regexp, line)
+  match_result = _RE_PATTERN_FUNCTION_START.match(line)
   if match_result:
     # If the name is all caps and underscores, figure it's a macro and
     # ignore it, unless it's TEST or TEST_F.
@@ -3601,10 +4116,10 @@ def CheckForFunctionLengths(filename, clean_lines, linenum,
       # No body for the function (or evidence of a non-function) was found.
       error(filename, linenum, 'readability/fn_size', 5,
             'Lint failed to find start of function body.')
-  elif Match(r'^\}\s*$', line):  # function end
+  elif _RE_PATTERN_FUNCTION_END.match(line):  # function end
     function_state.Check(error, filename, linenum)
     function_state.End()
-  elif not Match(r'^\s*$', line):
+  elif not _RE_PATTERN_BLANK_LINE.match(line):
     function_state.Count()  # Count non-blank/non-comment lines.
 
 
@@ -3665,6 +4180,15 @@ def CheckComment(line, filename, linenum, next_line_start, error):
               'Should have a space between // and comment')
 
 
+# Patterns for CheckSpacing.
+_RE_PATTERN_SPACE_BEFORE_BRACKET = re.compile(r'\w\s+\[')
+_RE_PATTERN_RANGE_FOR_COLON = re.compile(
+    r'for *\(.*[^:]:[^: ]|for *\(.*[^: ]:[^:]')
+
+
+@_ReportsCategories('readability/todo', 'whitespace/blank_line',
+                    'whitespace/braces', 'whitespace/comments',
+                    'whitespace/forcolon', 'whitespace/todo')
 def CheckSpacing(filename, clean_lines, linenum, nesting_state, error):
   """Checks for the correctness of various spacing issues in the code.
 
@@ -3781,18 +4305,38 @@ def CheckSpacing(filename, clean_lines, linenum, nesting_state, error):
 
   # You shouldn't have spaces before your brackets, except maybe after
   # 'delete []', 'return []() {};', or 'auto [abc, ...] = ...;'.
-  if Search(r'\w\s+\[', line) and not Search(r'(?:auto&?|delete|return)\s+\[', line):
+  if (_RE_PATTERN_SPACE_BEFORE_BRACKET.search(line) and
+      not Search(r'(?:auto&?|delete|return)\s+\[', line)):
     error(filename, linenum, 'whitespace/braces', 5,
           'Extra space before [')
 
   # In range-based for, we wanted spaces before and after the colon, but
   # not around "::" tokens that might appear.
-  if (Search(r'for *\(.*[^:]:[^: ]', line) or
-      Search(r'for *\(.*[^: ]:[^:]', line)):
+  if 'for' in line and _RE_PATTERN_RANGE_FOR_COLON.search(line):
     error(filename, linenum, 'whitespace/forcolon', 2,
           'Missing space around colon in range-based for loop')
 
 
+# Patterns for CheckOperatorSpacing.
+_RE_PATTERN_OPERATOR_METHOD = re.compile(r'^(.*\boperator\b)(\S+)(\s*\(.*)$')
+_RE_PATTERN_ASSIGN_WITHOUT_SPACES = re.compile(r'[\w.]=|=[\w.]')
+_RE_PATTERN_CONTROL_FLOW_SPACE = re.compile(r'\b(if|while|for) ')
+# Operators taken from [lex.operators] in C++11 standard.
+_RE_PATTERN_ASSIGN_OPERATORS = re.compile(
+    r'(>=|<=|==|!=|&=|\^=|\|=|\+=|\*=|\/=|\%=)')
+_RE_PATTERN_COMPARISON_WITHOUT_SPACES = re.compile(
+    r'[^<>=!\s](==|!=|<=|>=|\|\|)[^<>=!\s,;\)]')
+_RE_PATTERN_INCLUDE_DIRECTIVE = re.compile(r'#.*include')
+_RE_PATTERN_LESS_WITHOUT_SPACES = re.compile(r'^(.*[^\s<])<[^\s=<,]')
+_RE_PATTERN_GREATER_WITHOUT_SPACES = re.compile(r'^(.*[^-\s>])>[^\s=>,]')
+_RE_PATTERN_SHIFT_LEFT_WITHOUT_SPACES = re.compile(
+    r'(operator|[^\s(<])(?:L|UL|LL|ULL|l|ul|ll|ull)?<<([^\s,=<])')
+_RE_PATTERN_SHIFT_RIGHT_ALPHA = re.compile(r'>>[a-zA-Z_]')
+_RE_PATTERN_SPACED_UNARY_OPERATOR = re.compile(
+    r'(!\s|~\s|[\s]--[\s;]|[\s]\+\+[\s;])')
+
+
+@_ReportsCategories('whitespace/operators')
 def CheckOperatorSpacing(filename, clean_lines, linenum, error):
   """Checks for horizontal spacing around operators.
 
@@ -3810,8 +4354,8 @@ def CheckOperatorSpacing(filename, clean_lines, linenum, error):
   #
   # The replacement is done repeatedly to avoid false positives from
   # operators that call operators.
-  while True:
-    match = Match(r'^(.*\boperator\b)(\S+)(\s*\(.*)$', line)
+  while 'operator' in line:
+    match = _RE_PATTERN_OPERATOR_METHOD.match(line)
     if match:
       line = match.group(1) + ('_' * len(match.group(2))) + match.group(3)
     else:
@@ -3821,12 +4365,10 @@ def CheckOperatorSpacing(filename, clean_lines, linenum, error):
   # Otherwise not.  Note we only check for non-spaces on *both* sides;
   # sometimes people put non-spaces on one side when aligning ='s among
   # many lines (not that this is behavior that I approve of...)
-  if ((Search(r'[\w.]=', line) or
-       Search(r'=[\w.]', line))
-      and not Search(r'\b(if|while|for) ', line)
-      # Operators taken from [lex.operators] in C++11 standard.
-      and not Search(r'(>=|<=|==|!=|&=|\^=|\|=|\+=|\*=|\/=|\%=)', line)
-      and not Search(r'operator=', line)):
+  if ('=' in line and _RE_PATTERN_ASSIGN_WITHOUT_SPACES.search(line)
+      and not _RE_PATTERN_CONTROL_FLOW_SPACE.search(line)
+      and not _RE_PATTERN_ASSIGN_OPERATORS.search(line)
+      and 'operator=' not in line):
     error(filename, linenum, 'whitespace/operators', 4,
           'Missing spaces around =')
 
@@ -3845,16 +4387,16 @@ def CheckOperatorSpacing(filename, clean_lines, linenum, error):
   #
   # Note that && is not included here.  This is because there are too
   # many false positives due to RValue references.
-  match = Search(r'[^<>=!\s](==|!=|<=|>=|\|\|)[^<>=!\s,;\)]', line)
+  match = _RE_PATTERN_COMPARISON_WITHOUT_SPACES.search(line)
   if match:
     error(filename, linenum, 'whitespace/operators', 3,
           'Missing spaces around %s' % match.group(1))
-  elif not Match(r'#.*include', line):
+  elif not _RE_PATTERN_INCLUDE_DIRECTIVE.match(line):
     # Look for < that is not surrounded by spaces.  This is only
     # triggered if both sides are missing spaces, even though
     # technically should should flag if at least one side is missing a
     # space.  This is done to avoid some false positives with shifts.
-    match = Match(r'^(.*[^\s<])<[^\s=<,]', line)
+    match = '<' in line and _RE_PATTERN_LESS_WITHOUT_SPACES.match(line)
     if match:
       (_, _, end_pos) = CloseExpression(
           clean_lines, linenum, len(match.group(1)))
@@ -3865,7 +4407,7 @@ def CheckOperatorSpacing(filename, clean_lines, linenum, error):
     # Look for > that is not surrounded by spaces.  Similar to the
     # above, we only trigger if both sides are missing spaces to avoid
     # false positives with shifts.
-    match = Match(r'^(.*[^-\s>])>[^\s=>,]', line)
+    match = '>' in line and _RE_PATTERN_GREATER_WITHOUT_SPACES.match(line)
     if match:
       (_, _, start_pos) = ReverseCloseExpression(
           clean_lines, linenum, len(match.group(1)))
@@ -3878,7 +4420,7 @@ def CheckOperatorSpacing(filename, clean_lines, linenum, error):
   #
   # We also allow operators following an opening parenthesis, since
   # those tend to be macros that deal with operators.
-  match = Search(r'(operator|[^\s(<])(?:L|UL|LL|ULL|l|ul|ll|ull)?<<([^\s,=<])', line)
+  match = '<<' in line and _RE_PATTERN_SHIFT_LEFT_WITHOUT_SPACES.search(line)
   if (match and not (match.group(1).isdigit() and match.group(2).isdigit()) and
       not (match.group(1) == 'operator' and match.group(2) == ';')):
     error(filename, linenum, 'whitespace/operators', 3,
@@ -3896,18 +4438,34 @@ def CheckOperatorSpacing(filename, clean_lines, linenum, error):
   # follows would be part of an identifier, and there should still be
   # a space separating the template type and the identifier.
   #   type<type<type>> alpha
-  match = Search(r'>>[a-zA-Z_]', line)
-  if match:
+  if _RE_PATTERN_SHIFT_RIGHT_ALPHA.search(line):
     error(filename, linenum, 'whitespace/operators', 3,
           'Missing spaces around >>')
 
   # There shouldn't be space around unary operators
-  match = Search(r'(!\s|~\s|[\s]--[\s;]|[\s]\+\+[\s;])', line)
+  match = _RE_PATTERN_SPACED_UNARY_OPERATOR.search(line)
   if match:
     error(filename, linenum, 'whitespace/operators', 4,
           'Extra space for operator %s' % match.group(1))
 
 
+# Patterns for CheckParenthesisSpacing, CheckCommaSpacing and
+# CheckBracesSpacing.
+_RE_PATTERN_CONTROL_FLOW_NO_SPACE = re.compile(
+    r' (if\(|for\(|while\(|switch\()')
+_RE_PATTERN_CONTROL_FLOW_PAREN_SPACES = re.compile(
+    r'\b(if|for|while|switch)\s*'
+    r'\(([ ]*)(.).*[^ ]+([ ]*)\)\s*{\s*$')
+_RE_PATTERN_OPERATOR_COMMA = re.compile(r'\boperator\s*,\s*\(')
+_RE_PATTERN_COMMA_WITHOUT_SPACE = re.compile(r',[^,\s]')
+_RE_PATTERN_SEMICOLON_WITHOUT_SPACE = re.compile(r';[^\s};\\)/]')
+_RE_PATTERN_BRACE_WITHOUT_SPACE = re.compile(r'^(.*[^ ({>]){')
+_RE_PATTERN_SEMICOLON_AFTER_COLON = re.compile(r':\s*;\s*$')
+_RE_PATTERN_SEMICOLON_ONLY = re.compile(r'^\s*;\s*$')
+_RE_PATTERN_SPACE_BEFORE_SEMICOLON = re.compile(r'\s+;\s*$')
+
+
+@_ReportsCategories('whitespace/parens')
 def CheckParenthesisSpacing(filename, clean_lines, linenum, error):
   """Checks for horizontal spacing around parentheses.
 
@@ -3919,8 +4477,12 @@ def CheckParenthesisSpacing(filename, clean_lines, linenum, error):
   """
   line = clean_lines.elided[linenum]
 
+  # Both checks below are about control flow constructs.
+  if not _RE_PATTERN_CONTROL_FLOW_PREFIX.search(line):
+    return
+
   # No spaces after an if, while, switch, or for
-  match = Search(r' (if\(|for\(|while\(|switch\()', line)
+  match = _RE_PATTERN_CONTROL_FLOW_NO_SPACE.search(line)
   if match:
     error(filename, linenum, 'whitespace/parens', 5,
           'Missing space before ( in %s' % match.group(1))
@@ -3930,9 +4492,7 @@ def CheckParenthesisSpacing(filename, clean_lines, linenum, error):
   # there should either be zero or one spaces inside the parens.
   # We don't want: "if ( foo)" or "if ( foo   )".
   # Exception: "for ( ; foo; bar)" and "for (foo; bar; )" are allowed.
-  match = Search(r'\b(if|for|while|switch)\s*'
-                 r'\(([ ]*)(.).*[^ ]+([ ]*)\)\s*{\s*$',
-                 line)
+  match = _RE_PATTERN_CONTROL_FLOW_PAREN_SPACES.search(line)
   if match:
     if len(match.group(2)) != len(match.group(4)):
       if not (match.group(3) == ';' and
@@ -3946,6 +4506,7 @@ def CheckParenthesisSpacing(filename, clean_lines, linenum, error):
             match.group(1))
 
 
+@_ReportsCategories('whitespace/comma', 'whitespace/semicolon')
 def CheckCommaSpacing(filename, clean_lines, linenum, error):
   """Checks for horizontal spacing near commas and semicolons.
 
@@ -3968,8 +4529,10 @@ def CheckCommaSpacing(filename, clean_lines, linenum, error):
   # verify that lines contain missing whitespaces, second pass on raw
   # lines to confirm that those missing whitespaces are not due to
   # elided comments.
-  if (Search(r',[^,\s]', ReplaceAll(r'\boperator\s*,\s*\(', 'F(', line)) and
-      Search(r',[^,\s]', raw[linenum])):
+  if (',' in line and
+      _RE_PATTERN_COMMA_WITHOUT_SPACE.search(
+          _RE_PATTERN_OPERATOR_COMMA.sub('F(', line)) and
+      _RE_PATTERN_COMMA_WITHOUT_SPACE.search(raw[linenum])):
     error(filename, linenum, 'whitespace/comma', 3,
           'Missing space after ,')
 
@@ -3977,7 +4540,7 @@ def CheckCommaSpacing(filename, clean_lines, linenum, error):
   # except for few corner cases
   # TODO(unknown): clarify if 'if (1) { return 1;}' is requires one more
   # space after ;
-  if Search(r';[^\s};\\)/]', line):
+  if _RE_PATTERN_SEMICOLON_WITHOUT_SPACE.search(line):
     error(filename, linenum, 'whitespace/semicolon', 3,
           'Missing space after ;')
 
@@ -4045,6 +4608,7 @@ def _IsType(clean_lines, nesting_state, expr):
   return False
 
 
+@_ReportsCategories('whitespace/braces', 'whitespace/semicolon')
 def CheckBracesSpacing(filename, clean_lines, linenum, nesting_state, error):
   """Checks for horizontal spacing near commas.
 
@@ -4064,7 +4628,7 @@ def CheckBracesSpacing(filename, clean_lines, linenum, nesting_state, error):
   # And since you should never have braces at the beginning of a line,
   # this is an easy test.  Except that braces used for initialization don't
   # follow the same rule; we often don't want spaces before those.
-  match = Match(r'^(.*[^ ({>]){', line)
+  match = '{' in line and _RE_PATTERN_BRACE_WITHOUT_SPACE.match(line)
 
   if match:
     # Try a bit harder to check for brace initialization.  This
@@ -4113,21 +4677,21 @@ def CheckBracesSpacing(filename, clean_lines, linenum, nesting_state, error):
             'Missing space before {')
 
   # Make sure '} else {' has spaces.
-  if Search(r'}else', line):
+  if '}else' in line:
     error(filename, linenum, 'whitespace/braces', 5,
           'Missing space before else')
 
   # You shouldn't have a space before a semicolon at the end of the line.
   # There's a special case for "for" since the style guide allows space before
   # the semicolon there.
-  if Search(r':\s*;\s*$', line):
+  if _RE_PATTERN_SEMICOLON_AFTER_COLON.search(line):
     error(filename, linenum, 'whitespace/semicolon', 5,
           'Semicolon defining empty statement. Use {} instead.')
-  elif Search(r'^\s*;\s*$', line):
+  elif _RE_PATTERN_SEMICOLON_ONLY.match(line):
     error(filename, linenum, 'whitespace/semicolon', 5,
           'Line contains only semicolon. If this should be an empty statement, '
           'use {} instead.')
-  elif (Search(r'\s+;\s*$', line) and
+  elif (_RE_PATTERN_SPACE_BEFORE_SEMICOLON.search(line) and
         not Search(r'\bfor\b', line)):
     error(filename, linenum, 'whitespace/semicolon', 5,
           'Extra space before last semicolon. If this should be an empty '
@@ -4151,6 +4715,7 @@ def IsDecltype(clean_lines, linenum, column):
     return True
   return False
 
+@_ReportsCategories('whitespace/blank_line')
 def CheckSectionSpacing(filename, clean_lines, class_info, linenum, error):
   """Checks for additional blank line issues related to sections.
 
@@ -4229,6 +4794,24 @@ def GetPreviousNonBlankLine(clean_lines, linenum):
   return ('', -1)
 
 
+# Patterns for CheckBraces, CheckTrailingSemicolon and CheckEmptyBlockBody.
+_RE_PATTERN_LONE_OPEN_BRACE = re.compile(r'\s*{\s*$')
+_RE_PATTERN_LEADING_ELSE = re.compile(r'\s*else\b\s*(?:if\b|\{|$)')
+_RE_PATTERN_ELSE_IF = re.compile(r'else if\s*\(')
+_RE_PATTERN_ONE_SIDED_ELSE_BRACE = re.compile(r'}\s*else[^{]*$|^[^}]*else\s*{')
+_RE_PATTERN_ELSE_BODY_ON_SAME_LINE = re.compile(r'\belse [^\s{]')
+_RE_PATTERN_DO_BODY_ON_SAME_LINE = re.compile(r'\s*do [^\s{]')
+_RE_PATTERN_IF_OR_ELSE = re.compile(r'\b(if\s*(|constexpr)\s*\(|else\b)')
+_RE_PATTERN_PAREN_OPEN_BRACE = re.compile(r'^(.*\)\s*)\{')
+_RE_PATTERN_ELSE_OR_CONST_OPEN_BRACE = re.compile(
+    r'^(.*(?:else|\)\s*const)\s*)\{')
+_RE_PATTERN_LOOP_OR_IF = re.compile(r'\s*(for|while|if)\s*\(')
+_RE_PATTERN_STATEMENT_END = re.compile(r'[;{}]\s*$')
+_RE_PATTERN_LEADING_OPEN_BRACE = re.compile(r'^(\s*)\{')
+
+
+@_ReportsCategories('readability/braces', 'whitespace/braces',
+                    'whitespace/newline')
 def CheckBraces(filename, clean_lines, linenum, error):
   """Looks for misplaced braces (e.g. at the end of line).
 
@@ -4241,7 +4824,7 @@ def CheckBraces(filename, clean_lines, linenum, error):
 
   line = clean_lines.elided[linenum]        # get rid of comments and strings
 
-  if Match(r'\s*{\s*$', line):
+  if _RE_PATTERN_LONE_OPEN_BRACE.match(line):
     # We allow an open brace to start a line in the case where someone is using
     # braces in a block to explicitly create a new scope, which is commonly used
     # to control the lifetime of stack-allocated variables.  Braces are also
@@ -4259,7 +4842,7 @@ def CheckBraces(filename, clean_lines, linenum, error):
             '{ should almost always be at the end of the previous line')
 
   # An else clause should be on the same line as the preceding closing brace.
-  if Match(r'\s*else\b\s*(?:if\b|\{|$)', line):
+  if _RE_PATTERN_LEADING_ELSE.match(line):
     prevline = GetPreviousNonBlankLine(clean_lines, linenum)[0]
     if Match(r'\s*}\s*$', prevline):
       error(filename, linenum, 'whitespace/newline', 4,
@@ -4267,7 +4850,7 @@ def CheckBraces(filename, clean_lines, linenum, error):
 
   # If braces come on one side of an else, they should be on both.
   # However, we have to worry about "else if" that spans multiple lines!
-  if Search(r'else if\s*\(', line):       # could be multi-line if
+  if _RE_PATTERN_ELSE_IF.search(line):       # could be multi-line if
     brace_on_left = bool(Search(r'}\s*else if\s*\(', line))
     # find the ( after the if
     pos = line.find('else if')
@@ -4278,17 +4861,18 @@ def CheckBraces(filename, clean_lines, linenum, error):
       if brace_on_left != brace_on_right:    # must be brace after if
         error(filename, linenum, 'readability/braces', 5,
               'If an else has a brace on one side, it should have it on both')
-  elif Search(r'}\s*else[^{]*$', line) or Match(r'[^}]*else\s*{', line):
+  elif _RE_PATTERN_ONE_SIDED_ELSE_BRACE.search(line):
     error(filename, linenum, 'readability/braces', 5,
           'If an else has a brace on one side, it should have it on both')
 
   # Likewise, an else should never have the else clause on the same line
-  if Search(r'\belse [^\s{]', line) and not Search(r'\belse if\b', line):
+  if ('else' in line and _RE_PATTERN_ELSE_BODY_ON_SAME_LINE.search(line) and
+      not Search(r'\belse if\b', line)):
     error(filename, linenum, 'whitespace/newline', 4,
           'Else clause should never be on same line as else (use 2 lines)')
 
   # In the same way, a do/while should never be on one line
-  if Match(r'\s*do [^\s{]', line):
+  if _RE_PATTERN_DO_BODY_ON_SAME_LINE.match(line):
     error(filename, linenum, 'whitespace/newline', 4,
           'do/while clauses should not be on a single line')
 
@@ -4299,7 +4883,7 @@ def CheckBraces(filename, clean_lines, linenum, error):
   # its line, and the line after that should have an indent level equal to or
   # lower than the if. We also check for ambiguous if/else nesting without
   # braces.
-  if_else_match = Search(r'\b(if\s*(|constexpr)\s*\(|else\b)', line)
+  if_else_match = _RE_PATTERN_IF_OR_ELSE.search(line)
   if if_else_match and not Match(r'\s*#', line):
     if_indent = GetIndentLevel(line)
     endline, endlinenum, endpos = line, linenum, if_else_match.end()
@@ -4404,7 +4988,7 @@ def CheckTrailingSemicolon(filename, clean_lines, linenum, error):
   #    to namespaces.  For now we do not warn for this case.
   #
   # Try matching case 1 first.
-  match = Match(r'^(.*\)\s*)\{', line)
+  match = _RE_PATTERN_PAREN_OPEN_BRACE.match(line)
   if match:
     # Matched closing parenthesis (case 1).  Check the token before the
     # matching opening parenthesis, and don't warn if it looks like a
@@ -4457,7 +5041,7 @@ def CheckTrailingSemicolon(filename, clean_lines, linenum, error):
 
   else:
     # Try matching cases 2-3.
-    match = Match(r'^(.*(?:else|\)\s*const)\s*)\{', line)
+    match = _RE_PATTERN_ELSE_OR_CONST_OPEN_BRACE.match(line)
     if not match:
       # Try matching cases 4-6.  These are always matched on separate lines.
       #
@@ -4468,8 +5052,8 @@ def CheckTrailingSemicolon(filename, clean_lines, linenum, error):
       #     // blank line
       #   }
       prevline = GetPreviousNonBlankLine(clean_lines, linenum)[0]
-      if prevline and Search(r'[;{}]\s*$', prevline):
-        match = Match(r'^(\s*)\{', line)
+      if prevline and _RE_PATTERN_STATEMENT_END.search(prevline):
+        match = _RE_PATTERN_LEADING_OPEN_BRACE.match(line)
 
   # Check matching closing brace
   if match:
@@ -4495,6 +5079,8 @@ def CheckTrailingSemicolon(filename, clean_lines, linenum, error):
             "You don't need a ; after a }")
 
 
+@_ReportsCategories('whitespace/empty_conditional_body',
+                    'whitespace/empty_if_body', 'whitespace/empty_loop_body')
 def CheckEmptyBlockBody(filename, clean_lines, linenum, error):
   """Look for empty loop/conditional body with only a single semicolon.
 
@@ -4512,7 +5098,7 @@ def CheckEmptyBlockBody(filename, clean_lines, linenum, error):
   # We also check "if" blocks here, since an empty conditional block
   # is likely an error.
   line = clean_lines.elided[linenum]
-  matched = Match(r'\s*(for|while|if)\s*\(', line)
+  matched = _RE_PATTERN_LOOP_OR_IF.match(line)
   if matched:
     # Find the end of the conditional expression.
     (end_line, end_linenum, end_pos) = CloseExpression(
@@ -4622,6 +5208,7 @@ def FindCheckMacro(line):
   return (None, -1)
 
 
+@_ReportsCategories('readability/check')
 def CheckCheck(filename, clean_lines, linenum, error):
   """Checks the use of CHECK and EXPECT macros.
 
@@ -4740,6 +5327,7 @@ def CheckCheck(filename, clean_lines, linenum, error):
               check_macro, operator))
 
 
+@_ReportsCategories('readability/alt_tokens')
 def CheckAltTokens(filename, clean_lines, linenum, error):
   """Check alternative keywords being used in boolean expressions.
 
@@ -4752,7 +5340,7 @@ def CheckAltTokens(filename, clean_lines, linenum, error):
   line = clean_lines.elided[linenum]
 
   # Avoid preprocessor lines
-  if Match(r'^\s*#', line):
+  if _RE_PATTERN_PREPROCESSOR.match(line):
     return
 
   # Last ditch effort to avoid multi-line comments.  This will not help
@@ -4804,21 +5392,31 @@ def GetLineWidth(line):
     return len(line)
 
 
-def CheckStyle(filename, clean_lines, linenum, file_extension, nesting_state,
-               error):
-  """Checks rules from the 'C++ style rules' section of cppguide.html.
+# Patterns for CheckStyle.
+_RE_PATTERN_CONTINUED_LINE_END = re.compile(r'[",=><] *$')
+_RE_PATTERN_SCOPE_OR_LABEL = re.compile(
+    r'\s*(?:public|private|protected|signals)(?:\s+(?:slots\s*)?)?:\s*\\?$')
+# Lines that may exceed the line length: URLs, long words in comments, the
+# "$Id:...$" comment and Doxygen commands that copy documentation.
+_RE_PATTERN_LONG_LINE_EXCEPTION = re.compile(
+    r'^\s*//.*http(s?)://\S*$|'
+    r'^\s*//\s*[^\s]*$|'
+    r'^// \$Id:.*#[0-9]+ \$$|'
+    r'^\s*/// [@\\](copydoc|copydetails|copybrief) .*$')
 
-  Most of these rules are hard to test (naming, comment style), but we
-  do what we can.  In particular we check for 2-space indents, line lengths,
-  tab usage, spaces inside code, etc.
+
+@_ReportsCategories('whitespace/end_of_line', 'whitespace/indent',
+                    'whitespace/line_length', 'whitespace/newline',
+                    'whitespace/tab')
+def CheckLineWhitespace(filename, clean_lines, linenum, file_extension,
+                        error):
+  """Checks a line's indentation, length, tabs, and trailing whitespace.
 
   Args:
     filename: The name of the current file.
     clean_lines: A CleansedLines instance containing the file.
     linenum: The number of the line to check.
     file_extension: The extension (without the dot) of the filename.
-    nesting_state: A NestingState instance which maintains information about
-                   the current stack of nested blocks being parsed.
     error: The function to call with any errors found.
   """
 
@@ -4845,8 +5443,6 @@ def CheckStyle(filename, clean_lines, linenum, file_extension, nesting_state,
   # if(match($0, " <<")) complain = 0;
   # if(match(prev, " +for \\(")) complain = 0;
   # if(prevodd && match(prevprev, " +for \\(")) complain = 0;
-  scope_or_label_pattern = r'\s*(?:public|private|protected|signals)(?:\s+(?:slots\s*)?)?:\s*\\?$'
-  classinfo = nesting_state.InnermostClass()
   initial_spaces = 0
   cleansed_line = clean_lines.elided[linenum]
   while initial_spaces < len(line) and line[initial_spaces] == ' ':
@@ -4856,9 +5452,9 @@ def CheckStyle(filename, clean_lines, linenum, file_extension, nesting_state,
   # We also don't check for lines that look like continuation lines
   # (of lines ending in double quotes, commas, equals, or angle brackets)
   # because the rules for how to indent those are non-trivial.
-  if (not Search(r'[",=><] *$', prev) and
-      (initial_spaces == 1 or initial_spaces == 3) and
-      not Match(scope_or_label_pattern, cleansed_line) and
+  if ((initial_spaces == 1 or initial_spaces == 3) and
+      not _RE_PATTERN_CONTINUED_LINE_END.search(prev) and
+      not _RE_PATTERN_SCOPE_OR_LABEL.match(cleansed_line) and
       not (clean_lines.raw_lines[linenum] != line and
            Match(r'^\s*""', line))):
     error(filename, linenum, 'whitespace/indent', 3,
@@ -4889,10 +5485,7 @@ def CheckStyle(filename, clean_lines, linenum, file_extension, nesting_state,
   # Doxygen documentation copying can get pretty long when using an overloaded
   # function declaration
   if (not line.startswith('#include') and not is_header_guard and
-      not Match(r'^\s*//.*http(s?)://\S*$', line) and
-      not Match(r'^\s*//\s*[^\s]*$', line) and
-      not Match(r'^// \$Id:.*#[0-9]+ \$$', line) and
-      not Match(r'^\s*/// [@\\](copydoc|copydetails|copybrief) .*$', line)):
+      not _RE_PATTERN_LONG_LINE_EXCEPTION.match(line)):
     line_width = GetLineWidth(line)
     if line_width > _line_length:
       error(filename, linenum, 'whitespace/line_length', 2,
@@ -4913,20 +5506,52 @@ def CheckStyle(filename, clean_lines, linenum, file_extension, nesting_state,
     error(filename, linenum, 'whitespace/newline', 0,
           'More than one command on the same line')
 
+
+def CheckStyle(filename, clean_lines, linenum, file_extension, nesting_state,
+               error):
+  """Checks rules from the 'C++ style rules' section of cppguide.html.
+
+  Most of these rules are hard to test (naming, comment style), but we
+  do what we can.  In particular we check for 2-space indents, line lengths,
+  tab usage, spaces inside code, etc.
+
+  Args:
+    filename: The name of the current file.
+    clean_lines: A CleansedLines instance containing the file.
+    linenum: The number of the line to check.
+    file_extension: The extension (without the dot) of the filename.
+    nesting_state: A NestingState instance which maintains information about
+                   the current stack of nested blocks being parsed.
+    error: The function to call with any errors found.
+  """
+  skipped = _skipped_checks
+  if CheckLineWhitespace not in skipped:
+    CheckLineWhitespace(filename, clean_lines, linenum, file_extension, error)
+
   # Some more style checks
-  CheckBraces(filename, clean_lines, linenum, error)
+  if CheckBraces not in skipped:
+    CheckBraces(filename, clean_lines, linenum, error)
   CheckTrailingSemicolon(filename, clean_lines, linenum, error)
-  CheckEmptyBlockBody(filename, clean_lines, linenum, error)
-  CheckSpacing(filename, clean_lines, linenum, nesting_state, error)
-  CheckOperatorSpacing(filename, clean_lines, linenum, error)
-  CheckParenthesisSpacing(filename, clean_lines, linenum, error)
-  CheckCommaSpacing(filename, clean_lines, linenum, error)
-  CheckBracesSpacing(filename, clean_lines, linenum, nesting_state, error)
-  CheckSpacingForFunctionCall(filename, clean_lines, linenum, error)
-  CheckCheck(filename, clean_lines, linenum, error)
-  CheckAltTokens(filename, clean_lines, linenum, error)
+  if CheckEmptyBlockBody not in skipped:
+    CheckEmptyBlockBody(filename, clean_lines, linenum, error)
+  if CheckSpacing not in skipped:
+    CheckSpacing(filename, clean_lines, linenum, nesting_state, error)
+  if CheckOperatorSpacing not in skipped:
+    CheckOperatorSpacing(filename, clean_lines, linenum, error)
+  if CheckParenthesisSpacing not in skipped:
+    CheckParenthesisSpacing(filename, clean_lines, linenum, error)
+  if CheckCommaSpacing not in skipped:
+    CheckCommaSpacing(filename, clean_lines, linenum, error)
+  if CheckBracesSpacing not in skipped:
+    CheckBracesSpacing(filename, clean_lines, linenum, nesting_state, error)
+  if CheckSpacingForFunctionCall not in skipped:
+    CheckSpacingForFunctionCall(filename, clean_lines, linenum, error)
+  if CheckCheck not in skipped:
+    CheckCheck(filename, clean_lines, linenum, error)
+  if CheckAltTokens not in skipped:
+    CheckAltTokens(filename, clean_lines, linenum, error)
   classinfo = nesting_state.InnermostClass()
-  if classinfo:
+  if classinfo and CheckSectionSpacing not in skipped:
     CheckSectionSpacing(filename, clean_lines, classinfo, linenum, error)
 
 
@@ -5256,45 +5881,77 @@ _RE_PATTERN_REF_STREAM_PARAM = (
     r'(?:.*stream\s*&\s*' + _RE_PATTERN_IDENT + r')')
 
 
-def CheckLanguage(filename, clean_lines, linenum, file_extension,
-                  include_state, nesting_state, error):
-  """Checks rules from the 'C++ language rules' section of cppguide.html.
+# Patterns for CheckLanguage.
+_RE_PATTERN_C_INT_TYPE = re.compile(r'\b(short|long(?! +double)|long long)\b')
+_RE_PATTERN_IF_AFTER_BRACE = re.compile(r'\}\s*if\s*\(')
+_RE_PATTERN_MEMSET = re.compile(r'memset\s*\(([^,]*),\s*([^,]*),\s*0\s*\)')
+_RE_PATTERN_USING_NAMESPACE = re.compile(r'\busing namespace\b')
+_RE_PATTERN_ARRAY_DECL = re.compile(r'\s*(.+::)?(\w+) [a-z]\w*\[(.+)];')
 
-  Some of these rules are hard to test (function overloading, using
-  uint32 inappropriately), but we do the best we can.
+
+def _CheckIncludeOrSection(filename, clean_lines, linenum, include_state,
+                           error):
+  """Updates include_state with an include line or a preprocessor directive.
 
   Args:
     filename: The name of the current file.
     clean_lines: A CleansedLines instance containing the file.
     linenum: The number of the line to check.
-    file_extension: The extension (without the dot) of the filename.
     include_state: An _IncludeState instance in which the headers are inserted.
-    nesting_state: A NestingState instance which maintains information about
-                   the current stack of nested blocks being parsed.
     error: The function to call with any errors found.
+
+  Returns:
+    True if the line is an #include line.
   """
-  # If the line is empty or consists of entirely a comment, no need to
-  # check it.
   line = clean_lines.elided[linenum]
-  if not line:
-    return
-
   match = _RE_PATTERN_INCLUDE.search(line)
   if match:
     CheckIncludeLine(filename, clean_lines, linenum, include_state, error)
-    return
+    return True
 
   # Reset include state across preprocessor directives.  This is meant
   # to silence warnings for conditional includes.
-  match = Match(r'^\s*#\s*(if|ifdef|ifndef|elif|else|endif)\b', line)
+  match = _RE_PATTERN_CONDITIONAL_DIRECTIVE.match(line)
   if match:
     include_state.ResetSection(match.group(1))
+  return False
 
 
-  # Perform other checks now that we are sure that this is not an include line
-  CheckCasts(filename, clean_lines, linenum, error)
-  CheckGlobalStatic(filename, clean_lines, linenum, error)
-  CheckPrintf(filename, clean_lines, linenum, error)
+def CheckLanguage(filename, clean_lines, linenum, file_extension,
+                  include_state, nesting_state, error):
+  """Checks rules from the 'C++ language rules' section of cppguide.html.
+
+  Some of these rules are hard to test (function overloading, using
+  uint32 inappropriately), but we do the best we can.
+
+  Args:
+    filename: The name of the current file.
+    clean_lines: A CleansedLines instance containing the file.
+    linenum: The number of the line to check.
+    file_extension: The extension (without the dot) of the filename.
+    include_state: An _IncludeState instance in which the headers are inserted.
+    nesting_state: A NestingState instance which maintains information about
+                   the current stack of nested blocks being parsed.
+    error: The function to call with any errors found.
+  """
+  # If the line is empty or consists of entirely a comment, no need to
+  # check it.
+  line = clean_lines.elided[linenum]
+  if not line:
+    return
+
+  if _CheckIncludeOrSection(filename, clean_lines, linenum, include_state,
+                            error):
+    return
+
+  # Perform other checks now that we are sure that this is not an include line
+  skipped = _skipped_checks
+  if CheckCasts not in skipped:
+    CheckCasts(filename, clean_lines, linenum, error)
+  if CheckGlobalStatic not in skipped:
+    CheckGlobalStatic(filename, clean_lines, linenum, error)
+  if CheckPrintf not in skipped:
+    CheckPrintf(filename, clean_lines, linenum, error)
 
   if IsHeaderExtension(file_extension):
     # TODO(unknown): check that 1-arg constructors are explicit.
@@ -5306,12 +5963,12 @@ def CheckLanguage(filename, clean_lines, linenum, file_extension,
 
   # Check if people are using the verboten C basic types.  The only exception
   # we regularly allow is "unsigned short port" for port.
-  if Search(r'\bshort port\b', line):
+  if 'short port' in line and Search(r'\bshort port\b', line):
     if not Search(r'\bunsigned short port\b', line):
       error(filename, linenum, 'runtime/int', 4,
             'Use "unsigned short" for ports, not "short"')
   else:
-    match = Search(r'\b(short|long(?! +double)|long long)\b', line)
+    match = _RE_PATTERN_C_INT_TYPE.search(line)
     if match:
       error(filename, linenum, 'runtime/int', 4,
             'Use int16/int64/etc, rather than the C type %s' % match.group(1))
@@ -5322,13 +5979,13 @@ def CheckLanguage(filename, clean_lines, linenum, file_extension,
   #   int operator&(const X& x) { return 42; }  // unary operator&
   # The trick is it's hard to tell apart from binary operator&:
   #   class Y { int operator&(const Y& x) { return 23; } }; // binary operator&
-  if Search(r'\boperator\s*&\s*\(\s*\)', line):
+  if 'operator' in line and Search(r'\boperator\s*&\s*\(\s*\)', line):
     error(filename, linenum, 'runtime/operator', 4,
           'Unary operator& is dangerous.  Do not use it.')
 
   # Check for suspicious usage of "if" like
   # } if (a == b) {
-  if Search(r'\}\s*if\s*\(', line):
+  if _RE_PATTERN_IF_AFTER_BRACE.search(line):
     error(filename, linenum, 'readability/braces', 4,
           'Did you mean "else if"? If not, start a new line for "if".')
 
@@ -5350,13 +6007,13 @@ def CheckLanguage(filename, clean_lines, linenum, file_extension,
             % (function_name, match.group(1)))
 
   # Check for potential memset bugs like memset(buf, sizeof(buf), 0).
-  match = Search(r'memset\s*\(([^,]*),\s*([^,]*),\s*0\s*\)', line)
+  match = _RE_PATTERN_MEMSET.search(line)
   if match and not Match(r"^''|-?[0-9]+|0x[0-9A-Fa-f]$", match.group(2)):
     error(filename, linenum, 'runtime/memset', 4,
           'Did you mean "memset(%s, 0, %s)"?'
           % (match.group(1), match.group(2)))
 
-  if Search(r'\busing namespace\b', line):
+  if _RE_PATTERN_USING_NAMESPACE.search(line):
     if Search(r'\bliterals\b', line):
       error(filename, linenum, 'build/namespaces_literals', 5,
             'Do not use namespace using-directives.  '
@@ -5367,7 +6024,7 @@ def CheckLanguage(filename, clean_lines, linenum, file_extension,
             'Use using-declarations instead.')
 
   # Detect variable-length arrays.
-  match = Match(r'\s*(.+::)?(\w+) [a-z]\w*\[(.+)];', line)
+  match = '[' in line and _RE_PATTERN_ARRAY_DECL.match(line)
   if (match and match.group(2) != 'return' and match.group(2) != 'delete' and
       match.group(3).find(']') == -1):
     # Split the size using space and arithmetic operators as delimiters.
@@ -5417,6 +6074,16 @@ def CheckLanguage(filename, clean_lines, linenum, file_extension,
           ' for more information.')
 
 
+# Patterns for CheckGlobalStatic.
+_RE_PATTERN_STATEMENT_PUNCTUATION = re.compile(r'[;({]')
+_RE_PATTERN_STRING_DECL = re.compile(
+    r'((?:|static +)(?:|const +))(?::*std::)?string( +const)? +'
+    r'([a-zA-Z0-9_:]+)\b(.*)')
+_RE_PATTERN_SELF_INIT = re.compile(
+    r'\b([A-Za-z0-9_]*_)\(\1\)|\b([A-Za-z0-9_]*_)\(CHECK_NOTNULL\(\2\)\)')
+
+
+@_ReportsCategories('runtime/init', 'runtime/string')
 def CheckGlobalStatic(filename, clean_lines, linenum, error):
   """Check for unsafe global or static objects.
 
@@ -5429,7 +6096,8 @@ def CheckGlobalStatic(filename, clean_lines, linenum, error):
   line = clean_lines.elided[linenum]
 
   # Match two lines at a time to support multiline declarations
-  if linenum + 1 < clean_lines.NumLines() and not Search(r'[;({]', line):
+  if (linenum + 1 < clean_lines.NumLines() and
+      not _RE_PATTERN_STATEMENT_PUNCTUATION.search(line)):
     line += clean_lines.elided[linenum + 1].strip()
 
   # Check for people declaring static/global STL strings at the top level.
@@ -5438,10 +6106,7 @@ def CheckGlobalStatic(filename, clean_lines, linenum, error):
   # also because globals can be destroyed when some threads are still running.
   # TODO(unknown): Generalize this to also find static unique_ptr instances.
   # TODO(unknown): File bugs for clang-tidy to find these.
-  match = Match(
-      r'((?:|static +)(?:|const +))(?::*std::)?string( +const)? +'
-      r'([a-zA-Z0-9_:]+)\b(.*)',
-      line)
+  match = 'string' in line and _RE_PATTERN_STRING_DECL.match(line)
 
   # Remove false positives:
   # - String pointers (as opposed to values).
@@ -5472,12 +6137,18 @@ def CheckGlobalStatic(filename, clean_lines, linenum, error):
       error(filename, linenum, 'runtime/string', 4,
             'Static/global string variables are not permitted.')
 
-  if (Search(r'\b([A-Za-z0-9_]*_)\(\1\)', line) or
-      Search(r'\b([A-Za-z0-9_]*_)\(CHECK_NOTNULL\(\1\)\)', line)):
+  if '_(' in line and _RE_PATTERN_SELF_INIT.search(line):
     error(filename, linenum, 'runtime/init', 4,
           'You seem to be initializing a member variable with itself.')
 
 
+# Patterns for CheckPrintf.
+_RE_PATTERN_SNPRINTF_SIZE = re.compile(r'snprintf\s*\(([^,]*),\s*([0-9]*)\s*,')
+_RE_PATTERN_SPRINTF = re.compile(r'\bsprintf\s*\(')
+_RE_PATTERN_STRCPY_STRCAT = re.compile(r'\b(strcpy|strcat)\s*\(')
+
+
+@_ReportsCategories('runtime/printf')
 def CheckPrintf(filename, clean_lines, linenum, error):
   """Check for printf related issues.
 
@@ -5490,7 +6161,7 @@ def CheckPrintf(filename, clean_lines, linenum, error):
   line = clean_lines.elided[linenum]
 
   # When snprintf is used, the second argument shouldn't be a literal.
-  match = Search(r'snprintf\s*\(([^,]*),\s*([0-9]*)\s*,', line)
+  match = _RE_PATTERN_SNPRINTF_SIZE.search(line)
   if match and match.group(2) != '0':
     # If 2nd arg is zero, snprintf is used to calculate size.
     error(filename, linenum, 'runtime/printf', 3,
@@ -5498,10 +6169,10 @@ def CheckPrintf(filename, clean_lines, linenum, error):
           'to snprintf.' % (match.group(1), match.group(2)))
 
   # Check if some verboten C functions are being used.
-  if Search(r'\bsprintf\s*\(', line):
+  if _RE_PATTERN_SPRINTF.search(line):
     error(filename, linenum, 'runtime/printf', 5,
           'Never use sprintf. Use snprintf instead.')
-  match = Search(r'\b(strcpy|strcat)\s*\(', line)
+  match = _RE_PATTERN_STRCPY_STRCAT.search(line)
   if match:
     error(filename, linenum, 'runtime/printf', 4,
           'Almost always, snprintf is better than %s' % match.group(1))
@@ -5587,14 +6258,31 @@ def IsInitializerList(clean_lines, linenum):
   return False
 
 
+@_ReportsCategories('runtime/references')
 def CheckForStringViewReferences(filename, clean_lines, linenum, error):
   line = clean_lines.elided[linenum]
-  match = Search(r'const absl::string_view(?:\s*&)', line)
+  match = ('string_view' in line and
+           Search(r'const absl::string_view(?:\s*&)', line))
   if match:
     error(filename, linenum, 'runtime/references', 5,
           'Avoid const references to absl::string_view; just pass by value.')
 
 
+# Patterns for CheckCasts.
+_RE_PATTERN_DEPRECATED_CAST = re.compile(
+    r'(\bnew\s+(?:const\s+)?|\S<\s*(?:const\s+)?)?\b'
+    r'(int|float|double|bool|char|int32|uint32|int64|uint64)'
+    r'(\([^)].*)')
+_RE_PATTERN_STATIC_CAST = re.compile(
+    r'\((int|float|double|bool|char|u?int(16|32|64))\)')
+_RE_PATTERN_CONST_CAST = re.compile(r'\((char\s?\*+\s?)\)\s*"')
+_RE_PATTERN_REINTERPRET_CAST = re.compile(r'\((\w+\s?\*+\s?)\)')
+_RE_PATTERN_ADDRESS_OF_CAST = re.compile(
+    r'(?:[^\w]&\(([^)*][^)]*)\)[\w(])|'
+    r'(?:[^\w]&(static|dynamic|down|reinterpret)_cast\b)')
+
+
+@_ReportsCategories('readability/casting', 'runtime/casting')
 def CheckCasts(filename, clean_lines, linenum, error):
   """Various cast related checks.
 
@@ -5610,10 +6298,7 @@ def CheckCasts(filename, clean_lines, linenum, error):
   # I just try to capture the most common basic types, though there are more.
   # Parameterless conversion functions, such as bool(), are allowed as they are
   # probably a member operator declaration or default constructor.
-  match = Search(
-      r'(\bnew\s+(?:const\s+)?|\S<\s*(?:const\s+)?)?\b'
-      r'(int|float|double|bool|char|int32|uint32|int64|uint64)'
-      r'(\([^)].*)', line)
+  match = '(' in line and _RE_PATTERN_DEPRECATED_CAST.search(line)
   expecting_function = ExpectingFunctionArgs(clean_lines, linenum)
   if match and not expecting_function:
     matched_type = match.group(2)
@@ -5657,19 +6342,19 @@ def CheckCasts(filename, clean_lines, linenum, error):
 
   if not expecting_function:
     CheckCStyleCast(filename, clean_lines, linenum, 'static_cast',
-                    r'\((int|float|double|bool|char|u?int(16|32|64))\)', error)
+                    _RE_PATTERN_STATIC_CAST, error)
 
   # This doesn't catch all cases. Consider (const char * const)"hello".
   #
   # (char *) "foo" should always be a const_cast (reinterpret_cast won't
   # compile).
   if CheckCStyleCast(filename, clean_lines, linenum, 'const_cast',
-                     r'\((char\s?\*+\s?)\)\s*"', error):
+                     _RE_PATTERN_CONST_CAST, error):
     pass
   else:
     # Check pointer casts for other than string constants
     CheckCStyleCast(filename, clean_lines, linenum, 'reinterpret_cast',
-                    r'\((\w+\s?\*+\s?)\)', error)
+                    _RE_PATTERN_REINTERPRET_CAST, error)
 
   # In addition, we look for people taking the address of a cast.  This
   # is dangerous -- casts can assign to temporaries, so the pointer doesn't
@@ -5682,9 +6367,7 @@ def CheckCasts(filename, clean_lines, linenum, error):
   #
   # This is not a cast:
   #   reference_type&(int* function_param);
-  match = Search(
-      r'(?:[^\w]&\(([^)*][^)]*)\)[\w(])|'
-      r'(?:[^\w]&(static|dynamic|down|reinterpret)_cast\b)', line)
+  match = '&' in line and _RE_PATTERN_ADDRESS_OF_CAST.search(line)
   if match:
     # Try a better error message when the & is bound to something
     # dereferenced by the casted pointer, as opposed to the casted
@@ -5723,7 +6406,7 @@ def CheckCStyleCast(filename, clean_lines, linenum, cast_type, pattern, error):
     linenum: The number of the line to check.
     cast_type: The string for the C++ cast to recommend.  This is either
       reinterpret_cast, static_cast, or const_cast, depending.
-    pattern: The regular expression used to find C-style casts.
+    pattern: The compiled regular expression used to find C-style casts.
     error: The function to call with any errors found.
 
   Returns:
@@ -5731,7 +6414,7 @@ def CheckCStyleCast(filename, clean_lines, linenum, cast_type, pattern, error):
     False otherwise.
   """
   line = clean_lines.elided[linenum]
-  match = Search(pattern, line)
+  match = pattern.search(line)
   if not match:
     return False
 
@@ -5932,6 +6615,9 @@ def FilesBelongToSameModule(filename_cc, filename_h):
 def UpdateIncludeState(filename, include_dict, io=codecs):
   """Fill up the include_dict with new includes found from the file.
 
+  Unless a different io factory is given, the includes found are remembered in
+  _include_index, and the file is only read again once it changes.
+
   Args:
     filename: the name of the header to read.
     include_dict: a dictionary in which the headers are inserted.
@@ -5940,7 +6626,44 @@ def UpdateIncludeState(filename, include_dict, io=codecs):
   Returns:
     True if a header was successfully added. False otherwise.
   """
-  headerfile = None
+  global _include_index_changed
+  if io is not codecs:
+    includes = _ReadIncludes(filename, io)
+    if includes is None:
+      return False
+  else:
+    abs_filename = os.path.abspath(filename)
+    try:
+      st = os.stat(abs_filename)
+    except OSError:
+      return False
+
+    entry = _include_index.get(abs_filename)
+    if entry and entry[0] == st.st_mtime and entry[1] == st.st_size:
+      includes = entry[2]
+    else:
+      includes = _ReadIncludes(filename, io)
+      if includes is None:
+        return False
+      _include_index[abs_filename] = (st.st_mtime, st.st_size, includes)
+      _include_index_changed = True
+
+  for include, linenum in includes:
+    include_dict.setdefault(include, linenum)
+  return True
+
+
+def _ReadIncludes(filename, io):
+  """Reads the #include lines in a file.
+
+  Args:
+    filename: the name of the file to read.
+    io: The io factory to use to read the file.
+
+  Returns:
+    A list of (include, linenum) pairs, or None if the file can't be read.
+  """
+  includes = []
   try:
     with io.open(filename, 'r', 'utf8', 'replace') as headerfile:
       linenum = 0
@@ -5949,12 +6672,86 @@ def UpdateIncludeState(filename, include_dict, io=codecs):
         clean_line = CleanseComments(line)
         match = _RE_PATTERN_INCLUDE.search(clean_line)
         if match:
-          include = match.group(2)
-          include_dict.setdefault(include, linenum)
-    return True
+          includes.append((match.group(2), linenum))
   except IOError:
-    return False
+    return None
+  return includes
+
+
+def _SetIncludeCacheFile(cache_file):
+  """Loads the include index saved in cache_file, and saves it there later.
 
+  The file is only loaded once per process, however often it's set.
+
+  Args:
+    cache_file: The name of a file written by _SaveIncludeIndex.  It's fine if
+      it doesn't exist yet.
+  """
+  global _include_cache_file
+  _include_cache_file = cache_file
+  if cache_file in _loaded_include_caches:
+    return
+  _loaded_include_caches.add(cache_file)
+  for name, entry in _LoadIncludeIndex(cache_file).items():
+    _include_index.setdefault(name, entry)
+
+
+def _LoadIncludeIndex(cache_file):
+  """Returns the include index saved in cache_file, or {} if there isn't one."""
+  try:
+    with open(cache_file) as cache:
+      headers = json.load(cache)['headers']
+    return dict((name, (mtime, size, [tuple(include) for include in includes]))
+                for name, (mtime, size, includes) in headers.items())
+  except (IOError, ValueError, KeyError, TypeError):
+    return {}
+
+
+def _SaveIncludeIndex():
+  """Saves the include index to the file given by --includecache, if any.
+
+  Nothing is written unless the index has changed.  Entries saved by other runs
+  since this one loaded the file are kept, so that concurrent runs over
+  different files all contribute to the index.  Where the platform allows,
+  concurrent saves are serialized by locking a file alongside the index, so
+  none of them is lost.
+  """
+  global _include_index_changed
+  if not _include_cache_file or not _include_index_changed:
+    return
+
+  lock = None
+  temp_file = None
+  try:
+    if fcntl:
+      lock = open(_include_cache_file + '.lock', 'a')
+      fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+
+    index = _LoadIncludeIndex(_include_cache_file)
+    index.update(_include_index)
+
+    # Write to a uniquely named temporary file and rename it into place, so
+    # that concurrent readers never see a partial index.
+    fd, temp_file = tempfile.mkstemp(
+        dir=os.path.dirname(os.path.abspath(_include_cache_file)),
+        suffix='.tmp')
+    with os.fdopen(fd, 'w') as cache:
+      json.dump({'headers': index}, cache)
+    # Python 2 lacks os.replace, which unlike os.rename overwrites on Windows.
+    getattr(os, 'replace', os.rename)(temp_file, _include_cache_file)
+    temp_file = None
+    _include_index_changed = False
+  except (IOError, OSError) as e:
+    _cpplint_state.PrintError(
+        "Could not save include cache '%s': %s\n" % (_include_cache_file, e))
+  finally:
+    if temp_file:
+      try:
+        os.remove(temp_file)
+      except OSError:
+        pass
+    if lock:
+      lock.close()
 
 
 def CheckForIncludeWhatYouUse(filename, clean_lines, include_state, error,
@@ -5986,45 +6783,66 @@ def CheckForIncludeWhatYouUse(filename, clean_lines, include_state, error,
     """
     required[entity] = (linenum, headers)
 
-  for linenum in xrange(clean_lines.NumLines()):
-    line = clean_lines.elided[linenum]
-    if not line or line[0] == '#':
-      continue
-
-    # String is special -- it is a non-templatized type in STL.
-    matched = _RE_PATTERN_STRING.search(line)
-    if matched:
-      # Don't warn about strings in non-STL namespaces:
-      # (We check only the first match per line; good enough.)
-      prefix = line[:matched.start()]
-      if prefix.endswith('std::') or not prefix.endswith('::'):
-        Require('string', linenum, '<string>')
-
-    # Ostream is special too -- also non-templatized
-    matched = _RE_PATTERN_OSTREAM.search(line)
-    if matched:
-      if _IsSourceFilename(filename):
-        Require('ostream', linenum, '<ostream>', '<iostream>')
-      else:
-        Require('ostream', linenum, '<iosfwd>', '<ostream>', '<iostream>')
-
-    for pattern, template, header in _re_pattern_headers_maybe_templates:
-      if pattern.search(line):
-        Require(template, linenum, header)
-
-    # The following function is just a speed up, no semantics are changed.
-    if not '<' in line:  # Reduces the cpu time usage by skipping lines.
-      continue
+  def FindRequired(linenums):
+    """Calls Require for the entities used on the given lines."""
+    for linenum in linenums:
+      line = clean_lines.elided[linenum]
+      if not line or line[0] == '#':
+        continue
 
-    for pattern, template, header in _re_pattern_templates:
-      matched = pattern.search(line)
+      # String is special -- it is a non-templatized type in STL.
+      matched = _RE_PATTERN_STRING.search(line)
       if matched:
-        # Don't warn about IWYU in non-STL namespaces:
+        # Don't warn about strings in non-STL namespaces:
         # (We check only the first match per line; good enough.)
         prefix = line[:matched.start()]
         if prefix.endswith('std::') or not prefix.endswith('::'):
+          Require('string', linenum, '<string>')
+
+      # Ostream is special too -- also non-templatized
+      matched = _RE_PATTERN_OSTREAM.search(line)
+      if matched:
+        if _IsSourceFilename(filename):
+          Require('ostream', linenum, '<ostream>', '<iostream>')
+        else:
+          Require('ostream', linenum, '<iosfwd>', '<ostream>', '<iostream>')
+
+      for pattern, template, header in _re_pattern_headers_maybe_templates:
+        if pattern.search(line):
           Require(template, linenum, header)
 
+      # The following function is just a speed up, no semantics are changed.
+      if not '<' in line:  # Reduces the cpu time usage by skipping lines.
+        continue
+
+      for pattern, template, header in _re_pattern_templates:
+        matched = pattern.search(line)
+        if matched:
+          # Don't warn about IWYU in non-STL namespaces:
+          # (We check only the first match per line; good enough.)
+          prefix = line[:matched.start()]
+          if prefix.endswith('std::') or not prefix.endswith('::'):
+            Require(template, linenum, header)
+
+  if _selected_lines is None:
+    FindRequired(xrange(clean_lines.NumLines()))
+  else:
+    # Each entity is reported at its last use, and errors are only reported
+    # on the selected lines.  So only entities used on those lines matter, and
+    # they only need to be looked for on lines that mention them by name.
+    selected = [linenum for linenum in sorted(_selected_lines)
+                if linenum < clean_lines.NumLines()]
+    FindRequired(selected)
+    names = set(entity[:-2] if entity.endswith('<>') else entity
+                for entity in required)
+    required.clear()
+    if names:
+      linenums = set(selected)
+      for linenum, line in enumerate(clean_lines.elided):
+        if any(name in line for name in names):
+          linenums.add(linenum)
+      FindRequired(sorted(linenums))
+
   # The policy is that if you #include something in foo.h you don't need to
   # include it again in foo.cc. Here, we will look at possible includes.
   # Let's flatten the include_state include_list and copy it into a dictionary.
@@ -6097,6 +6915,7 @@ def CheckForIncludeWhatYouUse(filename, clean_lines, include_state, error,
 _RE_PATTERN_EXPLICIT_MAKEPAIR = re.compile(r'\bmake_pair\s*<')
 
 
+@_ReportsCategories('build/explicit_make_pair')
 def CheckMakePairUsesDeduction(filename, clean_lines, linenum, error):
   """Check that make_pair's template arguments are deduced.
 
@@ -6118,6 +6937,7 @@ def CheckMakePairUsesDeduction(filename, clean_lines, linenum, error):
           ' OR use pair directly OR if appropriate, construct a pair directly')
 
 
+@_ReportsCategories('readability/inheritance')
 def CheckRedundantVirtual(filename, clean_lines, linenum, error):
   """Check if line contains a redundant "virtual" function-specifier.
 
@@ -6129,6 +6949,7 @@ def CheckRedundantVirtual(filename, clean_lines, linenum, error):
   """
   # Look for "virtual" on current line.
   line = clean_lines.elided[linenum]
+  if 'virtual' not in line: return
   virtual = Match(r'^(.*)(\bvirtual\b)(.*)$', line)
   if not virtual: return
 
@@ -6182,6 +7003,7 @@ def CheckRedundantVirtual(filename, clean_lines, linenum, error):
       break
 
 
+@_ReportsCategories('readability/inheritance')
 def CheckRedundantOverrideOrFinal(filename, clean_lines, linenum, error):
   """Check if line contains a redundant "override" or "final" virt-specifier.
 
@@ -6297,29 +7119,124 @@ def ProcessLine(filename, file_extension, clean_lines, line,
                            arguments: filename, clean_lines, line, error
   """
   raw_lines = clean_lines.raw_lines
+  skipped = _skipped_checks
   ParseNolintSuppressions(filename, raw_lines[line], line, error)
   nesting_state.Update(filename, clean_lines, line, error)
-  CheckForNamespaceIndentation(filename, nesting_state, clean_lines, line,
-                               error)
+  if CheckForNamespaceIndentation not in skipped:
+    CheckForNamespaceIndentation(filename, nesting_state, clean_lines, line,
+                                 error)
   if nesting_state.InAsmBlock(): return
   CheckForFunctionLengths(filename, clean_lines, line, function_state, error)
-  CheckForMultilineCommentsAndStrings(filename, clean_lines, line, error)
+  if CheckForMultilineCommentsAndStrings not in skipped:
+    CheckForMultilineCommentsAndStrings(filename, clean_lines, line, error)
   CheckStyle(filename, clean_lines, line, file_extension, nesting_state, error)
   CheckLanguage(filename, clean_lines, line, file_extension, include_state,
                 nesting_state, error)
-  CheckForStringViewReferences(filename, clean_lines, line, error)
-  CheckForNonStandardConstructs(filename, clean_lines, line,
-                                nesting_state, error)
-  CheckVlogArguments(filename, clean_lines, line, error)
-  CheckPosixThreading(filename, clean_lines, line, error)
-  CheckInvalidIncrement(filename, clean_lines, line, error)
-  CheckMakePairUsesDeduction(filename, clean_lines, line, error)
-  CheckRedundantVirtual(filename, clean_lines, line, error)
-  CheckRedundantOverrideOrFinal(filename, clean_lines, line, error)
+  if CheckForStringViewReferences not in skipped:
+    CheckForStringViewReferences(filename, clean_lines, line, error)
+  if CheckForNonStandardConstructs not in skipped:
+    CheckForNonStandardConstructs(filename, clean_lines, line,
+                                  nesting_state, error)
+  if CheckVlogArguments not in skipped:
+    CheckVlogArguments(filename, clean_lines, line, error)
+  if CheckPosixThreading not in skipped:
+    CheckPosixThreading(filename, clean_lines, line, error)
+  if CheckInvalidIncrement not in skipped:
+    CheckInvalidIncrement(filename, clean_lines, line, error)
+  if CheckMakePairUsesDeduction not in skipped:
+    CheckMakePairUsesDeduction(filename, clean_lines, line, error)
+  if CheckRedundantVirtual not in skipped:
+    CheckRedundantVirtual(filename, clean_lines, line, error)
+  if CheckRedundantOverrideOrFinal not in skipped:
+    CheckRedundantOverrideOrFinal(filename, clean_lines, line, error)
+  if extra_check_functions:
+    for check_fn in extra_check_functions:
+      check_fn(filename, clean_lines, line, error)
+
+def _TrackLineState(filename, clean_lines, line, include_state,
+                    function_state, nesting_state, error,
+                    extra_check_functions=None):
+  """Runs the parts of ProcessLine that later lines depend on.
+
+  This is used instead of ProcessLine for lines outside the ranges given by
+  --lines.  It keeps the NOLINT suppressions, the nesting state, the function
+  state and the include state up to date, but skips the checks that only look
+  at the line itself.
+
+  Args:
+    filename: Filename of the file that is being processed.
+    clean_lines: An array of strings, each representing a line of the file,
+                 with comments stripped.
+    line: Number of line being processed.
+    include_state: An _IncludeState instance in which the headers are inserted.
+    function_state: A _FunctionState instance which counts function lines, etc.
+    nesting_state: A NestingState instance which maintains information about
+                   the current stack of nested blocks being parsed.
+    error: A callable to which errors are reported, which takes 4 arguments:
+           filename, line number, error level, and message
+    extra_check_functions: An array of additional check functions that will be
+                           run on each source line. Each function takes 4
+                           arguments: filename, clean_lines, line, error
+  """
+  raw_lines = clean_lines.raw_lines
+  ParseNolintSuppressions(filename, raw_lines[line], line, error)
+  nesting_state.Update(filename, clean_lines, line, error)
+  if nesting_state.InAsmBlock(): return
+  CheckForFunctionLengths(filename, clean_lines, line, function_state, error)
+  if clean_lines.elided[line]:
+    _CheckIncludeOrSection(filename, clean_lines, line, include_state, error)
+  # These may keep state of their own, so they always see every line.
   if extra_check_functions:
     for check_fn in extra_check_functions:
       check_fn(filename, clean_lines, line, error)
 
+
+def _LinesToCheck(clean_lines, selected_lines):
+  """Finds the lines on which to run the per-line checks.
+
+  Errors are usually reported on the line being checked, but some checks
+  (like those for empty loop bodies and redundant semicolons) start at the
+  line that opens a block or a parenthesized expression and report errors
+  where it closes.  So besides the selected lines this includes the lines that
+  open any brackets closed on them, and the line before each of those.
+
+  Args:
+    clean_lines: A CleansedLines instance containing the file.
+    selected_lines: The set of line numbers on which errors are reported.
+
+  Returns:
+    A set of line numbers.
+  """
+  result = set(selected_lines)
+  open_parens = []
+  open_braces = []
+  for linenum, line in enumerate(clean_lines.elided):
+    if '(' not in line and ')' not in line and '{' not in line and (
+        '}' not in line):
+      continue
+    for char in line:
+      if char == '(':
+        open_parens.append(linenum)
+      elif char == '{':
+        open_braces.append(linenum)
+      elif char == ')' or char == '}':
+        stack = open_parens if char == ')' else open_braces
+        if not stack:
+          continue
+        start = stack.pop()
+        if linenum in selected_lines and start != linenum:
+          result.add(start)
+          result.add(start - 1)
+  return result
+
+
+# Patterns for FlagCxx11Features and FlagCxx14Features.
+_RE_PATTERN_CXX_INCLUDE = re.compile(r'\s*#\s*include\s+[<"]([^<"]+)[">]')
+_RE_PATTERN_PREPROCESSOR = re.compile(r'\s*#')
+_RE_PATTERN_DEFINE = re.compile(r'\s*#\s*define\b')
+
+
+@_ReportsCategories('build/c++11', 'build/c++tr1')
 def FlagCxx11Features(filename, clean_lines, linenum, error):
   """Flag those c++11 features that we only allow in certain places.
 
@@ -6331,7 +7248,7 @@ def FlagCxx11Features(filename, clean_lines, linenum, error):
   """
   line = clean_lines.elided[linenum]
 
-  include = Match(r'\s*#\s*include\s+[<"]([^<"]+)[">]', line)
+  include = _RE_PATTERN_CXX_INCLUDE.match(line)
 
   # Flag unapproved C++ TR1 headers.
   if include and include.group(1).startswith('tr1/'):
@@ -6355,7 +7272,10 @@ def FlagCxx11Features(filename, clean_lines, linenum, error):
 
   # The only place where we need to worry about C++11 keywords and library
   # features in preprocessor directives is in macro definitions.
-  if Match(r'\s*#', line) and not Match(r'\s*#\s*define\b', line): return
+  if (_RE_PATTERN_PREPROCESSOR.match(line) and
+      not _RE_PATTERN_DEFINE.match(line)): return
+
+  if 'std::' not in line: return
 
   # These are classes and free functions.  The classes are always
   # mentioned as std::*, but we only catch the free functions if
@@ -6372,6 +7292,7 @@ def FlagCxx11Features(filename, clean_lines, linenum, error):
              'they may let you use it.') % top_name)
 
 
+@_ReportsCategories('build/c++14')
 def FlagCxx14Features(filename, clean_lines, linenum, error):
   """Flag those C++14 features that we restrict.
 
@@ -6383,13 +7304,15 @@ def FlagCxx14Features(filename, clean_lines, linenum, error):
   """
   line = clean_lines.elided[linenum]
 
-  include = Match(r'\s*#\s*include\s+[<"]([^<"]+)[">]', line)
+  include = _RE_PATTERN_CXX_INCLUDE.match(line)
 
   # Flag unapproved C++14 headers.
   if include and include.group(1) in ('scoped_allocator', 'shared_mutex'):
     error(filename, linenum, 'build/c++14', 5,
           ('<%s> is an unapproved C++14 header.') % include.group(1))
 
+  if 'std::' not in line: return
+
   # These are classes and free functions with abseil equivalents.
   for top_name in (
       # memory
@@ -6419,13 +7342,27 @@ def ProcessFileData(filename, file_extension, lines, error,
   lines = (['// marker so line numbers and indices both start at 1'] + lines +
            ['// marker so line numbers end in a known way'])
 
+  global _selected_lines
+  global _skipped_checks
+  ranges = _line_ranges.get(filename) if _line_ranges else None
+  if ranges is None:
+    _selected_lines = None
+  else:
+    _selected_lines = set()
+    for first, last in ranges:
+      _selected_lines.update(xrange(first, last + 1))
+
+  # Filters are fixed for the file, so the checks to skip are too.
+  _skipped_checks = skipped = _SkippedChecks()
+
   include_state = _IncludeState()
   function_state = _FunctionState()
   nesting_state = NestingState()
 
   ResetNolintSuppressions()
 
-  CheckForCopyright(filename, lines, error)
+  if CheckForCopyright not in skipped:
+    CheckForCopyright(filename, lines, error)
   ProcessGlobalSuppresions(lines)
   RemoveMultiLineComments(filename, lines, error)
   clean_lines = CleansedLines(lines)
@@ -6433,25 +7370,109 @@ def ProcessFileData(filename, file_extension, lines, error,
   if IsHeaderExtension(file_extension):
     CheckForHeaderGuard(filename, clean_lines, error)
 
+  lines_to_check = None
+  if _selected_lines is not None:
+    lines_to_check = _LinesToCheck(clean_lines, _selected_lines)
+
   for line in xrange(clean_lines.NumLines()):
+    if lines_to_check is not None and line not in lines_to_check:
+      _TrackLineState(filename, clean_lines, line, include_state,
+                      function_state, nesting_state, error,
+                      extra_check_functions)
+      continue
     ProcessLine(filename, file_extension, clean_lines, line,
                 include_state, function_state, nesting_state, error,
                 extra_check_functions)
-    FlagCxx11Features(filename, clean_lines, line, error)
-    FlagCxx14Features(filename, clean_lines, line, error)
+    if FlagCxx11Features not in skipped:
+      FlagCxx11Features(filename, clean_lines, line, error)
+    if FlagCxx14Features not in skipped:
+      FlagCxx14Features(filename, clean_lines, line, error)
   nesting_state.CheckCompletedBlocks(filename, error)
 
   CheckForIncludeWhatYouUse(filename, clean_lines, include_state, error)
 
   # Check that the .cc file has included its header if it exists.
-  if _IsSourceExtension(file_extension):
+  if (_IsSourceExtension(file_extension) and
+      CheckHeaderFileIncluded not in skipped):
     CheckHeaderFileIncluded(filename, include_state, error)
 
   # We check here rather than inside ProcessLine so that we see raw
   # lines rather than "cleaned" lines.
-  CheckForBadCharacters(filename, lines, error)
+  if CheckForBadCharacters not in skipped:
+    CheckForBadCharacters(filename, lines, error)
+
+  if CheckForNewlineAtEOF not in skipped:
+    CheckForNewlineAtEOF(filename, lines, error)
+
+def _FindConfigFiles(dirname):
+  """Finds the CPPLINT.cfg files that apply to files in a directory.
+
+  The result is cached in _config_chains, so each directory is only probed
+  once however many files are linted.
+
+  Args:
+    dirname: An absolute directory name.
+
+  Returns:
+    A tuple of (cfg_file, base_name) pairs, nearest directory first.  base_name
+    is the path component below the CPPLINT.cfg file's directory that leads to
+    dirname, or None for a CPPLINT.cfg file in dirname itself.
+  """
+  chain = _config_chains.get(dirname)
+  if chain is None:
+    chain = []
+    cfg_file = os.path.join(dirname, "CPPLINT.cfg")
+    if os.path.isfile(cfg_file):
+      chain.append((cfg_file, None))
+
+    parent, base_name = os.path.split(dirname)
+    if base_name:
+      for parent_cfg_file, parent_base_name in _FindConfigFiles(parent):
+        chain.append((parent_cfg_file, parent_base_name or base_name))
+
+    chain = _config_chains[dirname] = tuple(chain)
+  return chain
+
+
+def _ReadConfigFile(cfg_file):
+  """Reads the settings in a CPPLINT.cfg file.
+
+  Parsed files are cached in _config_files until their modification time
+  changes.
+
+  Args:
+    cfg_file: The name of the CPPLINT.cfg file.
+
+  Returns:
+    A list of (name, value) pairs in the order they appear in the file, or None
+    if the file exists but can't be read.  A file that has been removed since
+    _FindConfigFiles found it has no settings, so the result is then empty.
+  """
+  try:
+    mtime = os.stat(cfg_file).st_mtime
+  except OSError:
+    return []
+
+  cached = _config_files.get(cfg_file)
+  if cached is not None and cached[0] == mtime:
+    return cached[1]
+
+  settings = []
+  try:
+    with open(cfg_file) as file_handle:
+      for line in file_handle:
+        line, _, _ = line.partition('#')  # Remove comments.
+        if not line.strip():
+          continue
+
+        name, _, val = line.partition('=')
+        settings.append((name.strip(), val.strip()))
+  except IOError:
+    settings = None
+
+  _config_files[cfg_file] = (mtime, settings)
+  return settings
 
-  CheckForNewlineAtEOF(filename, lines, error)
 
 def ProcessConfigOverrides(filename):
   """ Loads the configuration files and processes the config overrides.
@@ -6463,76 +7484,66 @@ def ProcessConfigOverrides(filename):
     False if the current |filename| should not be processed further.
   """
 
-  abs_filename = os.path.abspath(filename)
-  cfg_filters = []
-  keep_looking = True
-  while keep_looking:
-    abs_path, base_name = os.path.split(abs_filename)
-    if not base_name:
-      break  # Reached the root directory.
-
-    cfg_file = os.path.join(abs_path, "CPPLINT.cfg")
-    abs_filename = abs_path
-    if not os.path.isfile(cfg_file):
-      continue
-
-    try:
-      with open(cfg_file) as file_handle:
-        for line in file_handle:
-          line, _, _ = line.partition('#')  # Remove comments.
-          if not line.strip():
-            continue
-
-          name, _, val = line.partition('=')
-          name = name.strip()
-          val = val.strip()
-          if name == 'set noparent':
-            keep_looking = False
-          elif name == 'filter':
-            cfg_filters.append(val)
-          elif name == 'exclude_files':
-            # When matching exclude_files pattern, use the base_name of
-            # the current file name or the directory name we are processing.
-            # For example, if we are checking for lint errors in /foo/bar/baz.cc
-            # and we found the .cfg file at /foo/CPPLINT.cfg, then the config
-            # file's "exclude_files" filter is meant to be checked against "bar"
-            # and not "baz" nor "bar/baz.cc".
-            if base_name:
-              pattern = re.compile(val)
-              if pattern.match(base_name):
-                if _cpplint_state.quiet:
-                  # Suppress "Ignoring file" warning when using --quiet.
-                  return False
-                _cpplint_state.PrintInfo('Ignoring "%s": file excluded by "%s". '
-                                 'File path component "%s" matches '
-                                 'pattern "%s"\n' %
-                                 (filename, cfg_file, base_name, val))
-                return False
-          elif name == 'linelength':
-            global _line_length
-            try:
-              _line_length = int(val)
-            except ValueError:
-              _cpplint_state.PrintError('Line length must be numeric.')
-          elif name == 'extensions':
-            ProcessExtensionsOption(val)
-          elif name == 'root':
-            global _root
-            # root directories are specified relative to CPPLINT.cfg dir.
-            _root = os.path.join(os.path.dirname(cfg_file), val)
-          elif name == 'headers':
-            ProcessHppHeadersOption(val)
-          elif name == 'includeorder':
-            ProcessIncludeOrderOption(val)
-          else:
-            _cpplint_state.PrintError(
-                'Invalid configuration option (%s) in file %s\n' %
-                (name, cfg_file))
+  abs_path, file_base_name = os.path.split(os.path.abspath(filename))
+  if not file_base_name:
+    return True
 
-    except IOError:
+  cfg_filters = []
+  for cfg_file, base_name in _FindConfigFiles(abs_path):
+    settings = _ReadConfigFile(cfg_file)
+    if settings is None:
       _cpplint_state.PrintError(
           "Skipping config file '%s': Can't open for reading\n" % cfg_file)
-      keep_looking = False
+      break
+
+    base_name = base_name or file_base_name
+    keep_looking = True
+    for name, val in settings:
+      if name == 'set noparent':
+        keep_looking = False
+      elif name == 'filter':
+        cfg_filters.append(val)
+      elif name == 'exclude_files':
+        # When matching exclude_files pattern, use the base_name of
+        # the current file name or the directory name we are processing.
+        # For example, if we are checking for lint errors in /foo/bar/baz.cc
+        # and we found the .cfg file at /foo/CPPLINT.cfg, then the config
+        # file's "exclude_files" filter is meant to be checked against "bar"
+        # and not "baz" nor "bar/baz.cc".
+        if base_name:
+          pattern = re.compile(val)
+          if pattern.match(base_name):
+            if _cpplint_state.quiet:
+              # Suppress "Ignoring file" warning when using --quiet.
+              return False
+            _cpplint_state.PrintInfo('Ignoring "%s": file excluded by "%s". '
+                             'File path component "%s" matches '
+                             'pattern "%s"\n' %
+                             (filename, cfg_file, base_name, val))
+            return False
+      elif name == 'linelength':
+        global _line_length
+        try:
+          _line_length = int(val)
+        except ValueError:
+          _cpplint_state.PrintError('Line length must be numeric.')
+      elif name == 'extensions':
+        ProcessExtensionsOption(val)
+      elif name == 'root':
+        global _root
+        # root directories are specified relative to CPPLINT.cfg dir.
+        _root = os.path.join(os.path.dirname(cfg_file), val)
+      elif name == 'headers':
+        ProcessHppHeadersOption(val)
+      elif name == 'includeorder':
+        ProcessIncludeOrderOption(val)
+      else:
+        _cpplint_state.PrintError(
+            'Invalid configuration option (%s) in file %s\n' %
+            (name, cfg_file))
+
+    if not keep_looking:
+      break
 
   # Apply all the accumulated filters in reverse order (top-level directory
   # config options having the least priority).
@@ -6542,7 +7553,40 @@ def ProcessConfigOverrides(filename):
   return True
 
 
-def ProcessFile(filename, vlevel, extra_check_functions=None):
+# Files at least this large (in bytes) are memory-mapped rather than read.
+_MMAP_THRESHOLD = 64 * 1024
+
+
+def _ReadSourceFile(filename):
+  """Reads a source file and decodes it as UTF-8.
+
+  Large files are memory-mapped, so they can be scanned for carriage returns
+  and decoded without first being copied into a bytes object.
+
+  Args:
+    filename: The name of the file to read.
+
+  Returns:
+    A tuple (contents, has_cr), where has_cr says whether the file contains
+    any '\r' characters.
+
+  Raises:
+    IOError: The file could not be read.
+  """
+  with open(filename, 'rb') as target_file:
+    size = os.fstat(target_file.fileno()).st_size
+    if size < _MMAP_THRESHOLD:
+      data = target_file.read()
+      return codecs.decode(data, 'utf8', 'replace'), b'\r' in data
+
+    data = mmap.mmap(target_file.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+      return codecs.decode(data, 'utf8', 'replace'), data.find(b'\r') >= 0
+    finally:
+      data.close()
+
+
+def ProcessFile(filename, vlevel, extra_check_functions=None, data=None):
   """Does google-lint on a single file.
 
   Args:
@@ -6554,6 +7598,9 @@ def ProcessFile(filename, vlevel, extra_check_functions=None):
     extra_check_functions: An array of additional check functions that will be
                            run on each source line. Each function takes 4
                            arguments: filename, clean_lines, line, error
+
+    data: The contents of the file as bytes, if they should be linted instead
+          of what is on disk (like a version of the file staged in git).
   """
 
   _SetVerboseLevel(vlevel)
@@ -6564,8 +7611,6 @@ def ProcessFile(filename, vlevel, extra_check_functions=None):
     _RestoreFilters()
     return
 
-  lf_lines = []
-  crlf_lines = []
   try:
     # Support the UNIX convention of using "-" for stdin.  Note that
     # we are not opening the file with universal newline support
@@ -6574,23 +7619,31 @@ def ProcessFile(filename, vlevel, extra_check_functions=None):
     # has CRLF endings.
     # If after the split a trailing '\r' is present, it is removed
     # below.
-    if filename == '-':
-      lines = codecs.StreamReaderWriter(sys.stdin,
-                                        codecs.getreader('utf8'),
-                                        codecs.getwriter('utf8'),
-                                        'replace').read().split('\n')
+    if data is None and filename == '-':
+      data = getattr(sys.stdin, 'buffer', sys.stdin).read()
+    if data is not None:
+      contents = codecs.decode(data, 'utf8', 'replace')
+      has_cr = b'\r' in data
+      del data
     else:
-      with codecs.open(filename, 'r', 'utf8', 'replace') as target_file:
-        lines = target_file.read().split('\n')
+      contents, has_cr = _ReadSourceFile(filename)
+    lines = contents.split('\n')
+    del contents
 
-    # Remove trailing '\r'.
     # The -1 accounts for the extra trailing blank line we get from split()
-    for linenum in range(len(lines) - 1):
-      if lines[linenum].endswith('\r'):
-        lines[linenum] = lines[linenum].rstrip('\r')
-        crlf_lines.append(linenum + 1)
-      else:
-        lf_lines.append(linenum + 1)
+    crlf_lines = []
+    if has_cr:
+      has_lf = False
+      # Remove trailing '\r'.
+      for linenum in xrange(len(lines) - 1):
+        if lines[linenum].endswith('\r'):
+          lines[linenum] = lines[linenum].rstrip('\r')
+          crlf_lines.append(linenum + 1)
+        else:
+          has_lf = True
+    else:
+      # The common case: every line ends in a plain '\n'.
+      has_lf = len(lines) > 1
 
   except IOError:
     _cpplint_state.PrintError(
@@ -6620,7 +7673,7 @@ def ProcessFile(filename, vlevel, extra_check_functions=None):
     # We can't depend on os.linesep to determine what the desired
     # end-of-line sequence should be, since that will return the
     # server-side end-of-line sequence.
-    if lf_lines and crlf_lines:
+    if has_lf and crlf_lines:
       # Warn on every line with CR.  An alternative approach might be to
       # check whether the file is mostly CRLF or just LF, and warn on the
       # minority, we bias toward LF here since most tools prefer LF.
@@ -6635,6 +7688,116 @@ def ProcessFile(filename, vlevel, extra_check_functions=None):
   _RestoreFilters()
 
 
+# Functions timed when --profile is given: everything ProcessLine runs for
+# each line, the checks those delegate to, and the whole-file passes.
+_PROFILED_FUNCTIONS = [
+    'CheckAltTokens',
+    'CheckBraces',
+    'CheckBracesSpacing',
+    'CheckCasts',
+    'CheckCheck',
+    'CheckCommaSpacing',
+    'CheckEmptyBlockBody',
+    'CheckForBadCharacters',
+    'CheckForCopyright',
+    'CheckForFunctionLengths',
+    'CheckForHeaderGuard',
+    'CheckForIncludeWhatYouUse',
+    'CheckForMultilineCommentsAndStrings',
+    'CheckForNamespaceIndentation',
+    'CheckForNewlineAtEOF',
+    'CheckForNonStandardConstructs',
+    'CheckForStringViewReferences',
+    'CheckGlobalStatic',
+    'CheckHeaderFileIncluded',
+    'CheckIncludeLine',
+    'CheckInvalidIncrement',
+    'CheckLanguage',
+    'CheckLineWhitespace',
+    'CheckMakePairUsesDeduction',
+    'CheckOperatorSpacing',
+    'CheckParenthesisSpacing',
+    'CheckPosixThreading',
+    'CheckPrintf',
+    'CheckRedundantOverrideOrFinal',
+    'CheckRedundantVirtual',
+    'CheckSpacing',
+    'CheckSpacingForFunctionCall',
+    'CheckStyle',
+    'CheckTrailingSemicolon',
+    'CheckVlogArguments',
+    'CleansedLines',
+    'FlagCxx11Features',
+    'FlagCxx14Features',
+    'ParseNolintSuppressions',
+    'ProcessConfigOverrides',
+    'ProcessGlobalSuppresions',
+    'RemoveMultiLineComments',
+]
+
+
+class _Profiler(object):
+  """Records the wall time spent on each file and in each check function.
+
+  Install() replaces the module's functions with timed wrappers, so there is no
+  cost when profiling is off.
+  """
+
+  def __init__(self, report_path):
+    self.report_path = report_path
+    self.files = {}   # filename -> seconds
+    self.checks = {}  # function name -> [calls, seconds]
+
+  def Install(self):
+    """Wraps the profiled functions in this module with timers."""
+    module = globals()
+    for name in _PROFILED_FUNCTIONS:
+      module[name] = self._Wrap(name, module[name])
+    NestingState.Update = self._Wrap('NestingState.Update', NestingState.Update)
+
+    process_file = module['ProcessFile']
+    files = self.files
+
+    def TimedProcessFile(filename, *args, **kwargs):
+      start = time.perf_counter()
+      try:
+        return process_file(filename, *args, **kwargs)
+      finally:
+        files[filename] = files.get(filename, 0.0) + time.perf_counter() - start
+
+    module['ProcessFile'] = TimedProcessFile
+
+  def _Wrap(self, name, function):
+    timing = self.checks.setdefault(name, [0, 0.0])
+
+    def Timed(*args, **kwargs):
+      start = time.perf_counter()
+      try:
+        return function(*args, **kwargs)
+      finally:
+        timing[0] += 1
+        timing[1] += time.perf_counter() - start
+
+    return Timed
+
+  def Report(self):
+    """Returns the timings as a JSON-serializable dict, slowest first."""
+    files = sorted(iteritems(self.files), key=lambda item: -item[1])
+    checks = sorted(iteritems(self.checks), key=lambda item: -item[1][1])
+    return {
+        'total_seconds': sum(self.files.values()),
+        'files': [{'file': name, 'seconds': seconds}
+                  for name, seconds in files],
+        'checks': [{'name': name, 'calls': calls, 'seconds': seconds}
+                   for name, (calls, seconds) in checks if calls],
+    }
+
+  def WriteReport(self):
+    with open(self.report_path, 'w') as report_file:
+      json.dump(self.Report(), report_file, indent=2)
+      report_file.write('\n')
+
+
 def PrintUsage(message):
   """Prints a brief usage string and exits, optionally with an error message.
 
@@ -6691,6 +7854,10 @@ def ParseArguments(args):
                                                  'recursive',
                                                  'headers=',
                                                  'includeorder=',
+                                                 'profile=',
+                                                 'includecache=',
+                                                 'jobs=',
+                                                 'lines=',
                                                  'quiet'])
   except getopt.GetoptError:
     PrintUsage('Invalid arguments.')
@@ -6708,9 +7875,10 @@ def ParseArguments(args):
     if opt == '--version':
       PrintVersion()
     elif opt == '--output':
-      if val not in ('emacs', 'vs7', 'eclipse', 'junit', 'sed', 'gsed'):
+      if val not in ('emacs', 'vs7', 'eclipse', 'junit', 'sarif', 'sed',
+                     'gsed'):
         PrintUsage('The only allowed output formats are emacs, vs7, eclipse '
-                   'sed, gsed and junit.')
+                   'sed, gsed, junit and sarif.')
       output_format = val
     elif opt == '--quiet':
       quiet = True
@@ -6749,10 +7917,33 @@ def ParseArguments(args):
       recursive = True
     elif opt == '--includeorder':
       ProcessIncludeOrderOption(val)
+    elif opt == '--profile':
+      global _profiler
+      _profiler = _Profiler(val)
+      _profiler.Install()
+    elif opt == '--includecache':
+      _SetIncludeCacheFile(val)
+    elif opt == '--jobs':
+      global _jobs
+      try:
+        _jobs = int(val)
+      except ValueError:
+        _jobs = 0
+      if _jobs < 1:
+        PrintUsage('Jobs must be a positive number.')
+    elif opt == '--lines':
+      global _line_ranges
+      if not _line_ranges:
+        _line_ranges = {}
+      filename, ranges = _ParseLineRanges(val)
+      _line_ranges[filename] = sorted(_line_ranges.get(filename, []) + ranges)
 
   if not filenames:
     PrintUsage('No files were specified.')
 
+  if _jobs > 1 and _profiler:
+    PrintUsage('--jobs cannot be combined with --profile.')
+
   if recursive:
     filenames = _ExpandDirectories(filenames)
 
@@ -6768,6 +7959,32 @@ def ParseArguments(args):
   filenames.sort()
   return filenames
 
+def _ParseLineRanges(val):
+  """Parses the value of a --lines flag.
+
+  Args:
+    val: A string like 'foo.cc:1-5,9'.
+
+  Returns:
+    A tuple (filename, ranges) where ranges is a list of (first, last) pairs.
+  """
+  filename, sep, spec = val.rpartition(':')
+  if not sep or not filename:
+    PrintUsage('Line ranges must be given as file:ranges.')
+  ranges = []
+  for part in spec.split(','):
+    first, _, last = part.partition('-')
+    try:
+      first = int(first)
+      last = int(last) if last else first
+    except ValueError:
+      PrintUsage('Line ranges must be numbers like 10 or 10-20.')
+    if first < 1 or last < first:
+      PrintUsage('Invalid line range: %s' % part)
+    ranges.append((first, last))
+  return filename, ranges
+
+
 def _ExpandDirectories(filenames):
   """Searches a list of filenames and replaces directories in the list with
   all files descending from those directories. Files with extensions not in
@@ -6827,6 +8044,177 @@ def _IsParentOrSame(parent, child):
   child_suffix = child_suffix.lstrip(os.sep)
   return child == os.path.join(prefix, child_suffix)
 
+# Module globals that command-line options set.  --jobs copies these into each
+# worker process.
+_OPTION_GLOBALS = (
+    '_excludes',
+    '_hpp_headers',
+    '_include_cache_file',
+    '_include_order',
+    '_line_length',
+    '_line_ranges',
+    '_repository',
+    '_root',
+    '_valid_extensions',
+)
+
+# Module globals that CPPLINT.cfg files can set.  These carry over from one
+# file to the next, so with --jobs each file is linted with the values it would
+# see if the files were linted one at a time.
+_CONFIG_GLOBALS = (
+    '_hpp_headers',
+    '_include_order',
+    '_line_length',
+    '_root',
+    '_valid_extensions',
+)
+
+
+class _RecordingSink(ErrorSink):
+  """An ErrorSink that records output so that it can be replayed later."""
+
+  def __init__(self):
+    self.output = []
+
+  def PrintInfo(self, message):
+    self.output.append((False, message))
+
+  def PrintError(self, message):
+    self.output.append((True, message))
+
+
+class _DiscardingSink(ErrorSink):
+  """An ErrorSink that drops all output."""
+
+  def PrintInfo(self, message):
+    pass
+
+  def PrintError(self, message):
+    pass
+
+
+def _ConfigForEachFile(filenames):
+  """Finds the values of _CONFIG_GLOBALS that each file will be linted with.
+
+  This applies each file's CPPLINT.cfg files in turn, as ProcessFile would,
+  without linting anything.
+
+  Args:
+    filenames: The files to lint, in order.
+
+  Returns:
+    A list with a dict of _CONFIG_GLOBALS values for each file.
+  """
+  module_globals = globals()
+  saved_config = dict((name, module_globals[name]) for name in _CONFIG_GLOBALS)
+  previous_report = _cpplint_state.SetReport(None)
+  previous_sink = _cpplint_state.SetErrorSink(_DiscardingSink())
+
+  configs = []
+  try:
+    for filename in filenames:
+      configs.append(
+          dict((name, module_globals[name]) for name in _CONFIG_GLOBALS))
+      _BackupFilters()
+      ProcessConfigOverrides(filename)
+      _RestoreFilters()
+  finally:
+    _cpplint_state.SetErrorSink(previous_sink)
+    _cpplint_state.SetReport(previous_report)
+    module_globals.update(saved_config)
+
+  return configs
+
+
+def _InitWorker(state, options):
+  """Sets up a --jobs worker process with the parent's options."""
+  global _cpplint_state
+  _cpplint_state = state
+  globals().update(options)
+  if _include_cache_file:
+    _SetIncludeCacheFile(_include_cache_file)
+
+
+def _ProcessFileInWorker(task):
+  """Lints one file in a --jobs worker process.
+
+  Args:
+    task: A tuple of the filename and the _CONFIG_GLOBALS values to use.
+
+  Returns:
+    A tuple of the recorded output, the error count, the errors by category,
+    the recorded report entries, and the new _include_index entries.
+  """
+  filename, config = task
+  globals().update(config)
+
+  state = _cpplint_state
+  state.ResetErrorCounts()
+  report = _RecordingReport() if state.output_format in _REPORTS else None
+  state.SetReport(report)
+  sink = _RecordingSink()
+  state.SetErrorSink(sink)
+  indexed = set(_include_index)
+
+  ProcessFile(filename, state.verbose_level)
+
+  new_includes = dict((name, entry) for name, entry in _include_index.items()
+                      if name not in indexed)
+  return (sink.output, state.error_count, state.errors_by_category,
+          report.records if report else [], new_includes)
+
+
+def _ProcessFilesInParallel(filenames, jobs):
+  """Lints files in worker processes, merging their results in order.
+
+  Output is replayed file by file in the order of filenames, so it's identical
+  to what linting the files one at a time produces.
+
+  Args:
+    filenames: The files to lint.
+    jobs: The number of worker processes to use.
+  """
+  global _include_index_changed
+  state = _cpplint_state
+  options = dict((name, globals()[name]) for name in _OPTION_GLOBALS)
+  tasks = list(zip(filenames, _ConfigForEachFile(filenames)))
+
+  # Reports hold open files, so they aren't sent to the workers. Each worker
+  # records what it would report instead, and that is replayed here.
+  report = state.SetReport(None)
+  try:
+    pool = multiprocessing.Pool(min(jobs, len(filenames)),
+                                initializer=_InitWorker,
+                                initargs=(state, options))
+  finally:
+    state.SetReport(report)
+
+  try:
+    for result in pool.imap(_ProcessFileInWorker, tasks):
+      (output, error_count, errors_by_category, report_records,
+       new_includes) = result
+
+      for is_error, message in output:
+        if is_error:
+          state.sink.PrintError(message)
+        else:
+          state.sink.PrintInfo(message)
+
+      state.error_count += error_count
+      for category, count in iteritems(errors_by_category):
+        state.errors_by_category[category] = (
+            state.errors_by_category.get(category, 0) + count)
+      for method, args in report_records:
+        getattr(state.report, method)(*args)
+
+      for name, entry in iteritems(new_includes):
+        _include_index.setdefault(name, entry)
+        _include_index_changed = True
+  finally:
+    pool.terminate()
+    pool.join()
+
+
 def main():
   filenames = ParseArguments(sys.argv[1:])
   backup_err = sys.stderr
@@ -6836,14 +8224,21 @@ def main():
     sys.stderr = codecs.StreamReader(sys.stderr, 'replace')
 
     _cpplint_state.ResetErrorCounts()
-    for filename in filenames:
-      ProcessFile(filename, _cpplint_state.verbose_level)
+    if _jobs > 1 and len(filenames) > 1 and '-' not in filenames:
+      _ProcessFilesInParallel(filenames, _jobs)
+    else:
+      for filename in filenames:
+        ProcessFile(filename, _cpplint_state.verbose_level)
     # If --quiet is passed, suppress printing error count unless there are errors.
     if not _cpplint_state.quiet or _cpplint_state.error_count > 0:
       _cpplint_state.PrintErrorCounts()
 
-    if _cpplint_state.output_format == 'junit':
-      sys.stderr.write(_cpplint_state.FormatJUnitXML())
+    _cpplint_state.FinishReport()
+
+    if _profiler:
+      _profiler.WriteReport()
+
+    _SaveIncludeIndex()
 
   finally:
     sys.stderr = backup_err
@@ -12,42 +12,79 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from __future__ import division
-
-import math
-import multiprocessing.pool
+import concurrent.futures
+import heapq
+import multiprocessing
+import os
 import sys
 import threading
 
-# Python 3 renamed Queue to queue
-try:
-  import queue
-except ImportError:
-  import Queue as queue
-
 
 _TASKS = multiprocessing.cpu_count()
 
+# The ways in which a Pool can run its tasks.
+BACKENDS = ('threads', 'processes')
+
 
 _output_lock = threading.Lock()
 
 
-def shard(items):
-  """Breaks down the given items into roughly equal sized lists.
+def shard(items, cost=None):
+  """Breaks down the given items into lists of roughly equal cost.
+
+  The number of lists will be at most the number of available processor cores.
+
+  Args:
+    items: A list of items, by default filenames.
+    cost: A function that estimates the cost of processing an item. Defaults to
+      the item's size in bytes, treating it as a filename.
 
-  The number of lists will be equal to the number of available processor cores.
+  Returns:
+    A list of non-empty lists of items.
+  """
+  return partition(items, _TASKS, cost or file_size)
+
+
+def partition(items, num_bins, cost):
+  """Partitions items into at most num_bins lists with balanced total cost.
+
+  This uses the longest-processing-time-first heuristic: items are taken in
+  order of decreasing cost and each is assigned to the bin with the least
+  total cost so far. The most expensive bin is then within 4/3 of optimal,
+  whereas splitting by count lets one large item dominate the run.
+
+  Within each bin, items keep their relative order from the input.
+
+  Args:
+    items: A list of items.
+    num_bins: The maximum number of lists to return.
+    cost: A function that returns the cost of an item as a number.
+
+  Returns:
+    A list of non-empty lists of items.
   """
   if not items:
     return []
 
-  n = int(math.ceil(len(items) / _TASKS))
-  return _chunks(items, n)
+  costs = [cost(item) for item in items]
+  order = sorted(range(len(items)), key=lambda i: costs[i], reverse=True)
+
+  bins = [(0, b, []) for b in range(min(num_bins, len(items)))]
+  for i in order:
+    total, b, indexes = heapq.heappop(bins)
+    indexes.append(i)
+    heapq.heappush(bins, (total + costs[i], b, indexes))
 
+  bins.sort(key=lambda entry: entry[1])
+  return [[items[i] for i in sorted(indexes)] for _, _, indexes in bins]
 
-def _chunks(items, n):
-  """Yield successive n-sized chunks from items."""
-  for i in range(0, len(items), n):
-    yield items[i:i + n]
+
+def file_size(filename):
+  """Returns the size of the named file in bytes, or 0 if it doesn't exist."""
+  try:
+    return os.path.getsize(filename)
+  except OSError:
+    return 0
 
 
 class Result(object):
@@ -64,54 +101,137 @@ class Result(object):
 
 
 class Pool(object):
+  """Runs checker tasks concurrently, reporting their results.
 
-  def __init__(self):
-    # Checkers submit tasks to be run and these are dropped in the _pending
-    # queue. Workers process that queue and results are put in the _results
-    # queue. _results is drained by the thread that calls join().
-    self._pending = queue.Queue()
-    self._results = queue.Queue()
-
-    def worker():
-      while True:
-        task, args = self._pending.get()
-        result = task(*args)
-        if result is not None:
-          self._results.put(result)
-        self._pending.task_done()
-
-    for i in range(_TASKS):
-      t = threading.Thread(target=worker)
-      t.daemon = True
-      t.start()
+  Tasks can run on threads, which suits checkers that spend their time waiting
+  on subprocesses, or in worker processes, which suits checkers that do their
+  work in Python and would otherwise be serialized by the GIL. Tasks run in
+  worker processes must be picklable, i.e. module-level functions.
+  """
+
+  def __init__(self, backend='threads', initializer=None, initargs=(),
+               fail_fast=None):
+    """Creates a pool.
+
+    Args:
+      backend: One of BACKENDS: 'threads' or 'processes'.
+      initializer: An optional callable run at the start of each worker.
+      initargs: Arguments to pass to the initializer.
+      fail_fast: If set, the number of errors after which tasks that haven't
+        started yet are cancelled.
+    """
+    if backend == 'threads':
+      executor = concurrent.futures.ThreadPoolExecutor
+    elif backend == 'processes':
+      executor = concurrent.futures.ProcessPoolExecutor
+    else:
+      raise ValueError('Unknown pool backend %r; expected one of %s' %
+                       (backend, ', '.join(BACKENDS)))
+
+    self.backend = backend
+    self._new_executor = lambda: executor(
+        _TASKS, initializer=initializer, initargs=initargs)
+    self._executor = self._new_executor()
+    self._fail_fast = fail_fast
+
+    # Futures for submitted tasks, in submission order. Results are written as
+    # each completes; join() waits for the rest and surfaces any exceptions.
+    self._futures = []
+    self._errors = 0
+
+    # Set once the fail-fast limit is reached, after which new tasks are
+    # ignored. cancelled is only set if that actually kept work from running.
+    self._stopping = False
+    self.cancelled = False
 
   def submit(self, task, *args):
     """Submits a task for execution by the pool.
 
+    Tasks submitted after the pool has reached its fail-fast limit are
+    ignored.
+
     Args:
       task: A callable routine that will perform the work.
       *args: A list of arguments to pass that routine.
     """
-    self._pending.put((task, args))
+    with _output_lock:
+      if self._stopping:
+        self.cancelled = True
+        return
+
+    future = self._executor.submit(task, *args)
+    self._futures.append(future)
+    future.add_done_callback(self._report)
+
+  def _report(self, future):
+    """Writes the result of a completed task to stdout.
+
+    Each result is written in one piece so that the output for any given file
+    stays together, even though tasks finish in an arbitrary order.
+    """
+    if future.cancelled() or future.exception() is not None:
+      return
+
+    result = future.result()
+    if result is None:
+      return
+
+    with _output_lock:
+      sys.stdout.write(result.output)
+      sys.stdout.flush()
+
+      self._errors += result.errors
+      stop = (self._fail_fast is not None and not self._stopping
+              and self._errors >= self._fail_fast)
+      if stop:
+        self._stopping = True
+
+    if stop:
+      dropped = [pending.cancel() for pending in list(self._futures)]
+      if any(dropped):
+        with _output_lock:
+          self.cancelled = True
 
   def join(self):
     """Waits for the completion of all submitted tasks.
 
+    If a task raised an exception, it is re-raised here.
+
     Returns:
       The number of errors encountered.
     """
-    self._pending.join()
+    futures = self._futures
+    concurrent.futures.wait(futures)
+    self._futures = []
 
-    num_errors = 0
-    while not self._results.empty():
-      result = self._results.get()
-      num_errors += result.errors
-      sys.stdout.write(result.output)
-      self._results.task_done()
+    for future in futures:
+      if not future.cancelled() and future.exception() is not None:
+        raise future.exception()
 
-    self._results.join()
+    with _output_lock:
+      num_errors = self._errors
+      self._errors = 0
     return num_errors
 
+  def reset(self):
+    """Lets the pool accept tasks again after reaching its fail-fast limit.
+
+    Call this between batches of work, e.g. when re-linting in watch mode, so
+    that a fail-fast stop in one batch doesn't drop the next.
+    """
+    with _output_lock:
+      self._stopping = False
+      self.cancelled = False
+
+  def restart(self):
+    """Replaces the pool's workers with fresh ones.
+
+    Call this between batches of work when state that the workers have built
+    up, like configuration read by an in-process linter, has gone stale.
+    """
+    self._executor.shutdown()
+    self._executor = self._new_executor()
+
   def exit(self):
     """Waits for the completion of the submitted tasks and exits.
 
@@ -119,4 +239,9 @@ class Pool(object):
     errors, or 1 if there were.
     """
     errors = self.join()
+    self.shutdown()
     sys.exit(errors > 0)
+
+  def shutdown(self):
+    """Releases the pool's workers."""
+    self._executor.shutdown()
@@ -12,12 +12,25 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import atexit
+import contextlib
+import json
 import logging
+import os
+import subprocess
+import sys
+import threading
+import time
 
 from lib import terminal
 
 _commands = logging.getLogger('commands')
 
+# The file to which trace events are appended, or None if not tracing to a
+# file. This is set by the --trace-file flag.
+_trace_file = None
+_trace_lock = threading.Lock()
+
 
 def log(command_args):
   """Logs that a command has run.
@@ -39,10 +52,137 @@ def log(command_args):
     _commands.debug('%s', text)
 
 
+class Span(object):
+  """The record of a single run of a command."""
+
+  def __init__(self, command_args):
+    self.command_args = command_args
+    self.start = time.time()
+    self.duration = None
+    self.returncode = None
+    self.output_size = None
+
+  def set_result(self, returncode, output_size=None):
+    """Records how the command finished.
+
+    Args:
+      returncode: The command's exit code.
+      output_size: The size of the command's output, if known.
+    """
+    self.returncode = returncode
+    self.output_size = output_size
+
+
+@contextlib.contextmanager
+def span(command_args):
+  """Logs a command and times it while the body of the with statement runs.
+
+  The body should run the command and record how it finished by calling
+  set_result on the Span. A subprocess.CalledProcessError escaping the body is
+  recorded automatically.
+
+  Args:
+    command_args: A list of the command and its arguments.
+
+  Yields:
+    A Span describing the command.
+  """
+  log(command_args)
+
+  result = Span(command_args)
+  try:
+    yield result
+  except subprocess.CalledProcessError as e:
+    result.set_result(e.returncode, len(e.output) if e.output else None)
+    raise
+  finally:
+    result.duration = time.time() - result.start
+    _finish(result)
+
+
+def _finish(span):
+  """Reports a span that has finished."""
+  if _commands.isEnabledFor(logging.DEBUG):
+    _commands.debug('%s: exit %s, %s bytes of output, %.3fs',
+                    _span_name(span.command_args), span.returncode,
+                    span.output_size, span.duration)
+
+  if _trace_file is not None:
+    event = {
+        'name': _span_name(span.command_args),
+        'cat': 'command',
+        'ph': 'X',
+        'ts': int(span.start * 1e6),
+        'dur': int(span.duration * 1e6),
+        'pid': os.getpid(),
+        'tid': threading.current_thread().ident,
+        'args': {
+            'command': ' '.join(span.command_args),
+            'exit_code': span.returncode,
+            'output_bytes': span.output_size,
+        },
+    }
+    _write_trace(json.dumps(event) + ',\n')
+
+
+def _span_name(command_args):
+  """Returns a short name for a command, like 'git diff' or 'cpplint.py'."""
+  args = list(command_args)
+  if len(args) > 1 and args[0] == sys.executable:
+    # Skip the interpreter and its own options, like -Wignore.
+    args = args[1:]
+    while len(args) > 1 and args[0].startswith('-'):
+      args = args[1:]
+
+  name = os.path.basename(args[0])
+  if name == 'git' and len(args) > 1:
+    name += ' ' + args[1]
+  return name
+
+
+def _write_trace(text):
+  # Each event is appended with a single write, so that events from the
+  # processes in a pool don't interleave.
+  with _trace_lock:
+    with open(_trace_file, 'a') as fd:
+      fd.write(text)
+
+
+def _start_trace_file():
+  """Starts a new trace file, to be finished when this process exits.
+
+  The file is a Chrome trace in the JSON array format, which can be opened in
+  chrome://tracing or https://ui.perfetto.dev. Events are appended by every
+  process that traces commands, and the array is closed at exit.
+  """
+  with _trace_lock:
+    with open(_trace_file, 'w') as fd:
+      fd.write('[\n')
+  atexit.register(_finish_trace_file, _trace_file)
+
+
+def _finish_trace_file(trace_file):
+  if _trace_file != trace_file:
+    return
+
+  # Close the array with an event that names the process that started the
+  # trace.
+  event = {
+      'name': 'process_name',
+      'ph': 'M',
+      'pid': os.getpid(),
+      'args': {'name': os.path.basename(sys.argv[0])},
+  }
+  _write_trace(json.dumps(event) + '\n]\n')
+
+
 def add_arguments(parser):
   """Adds standard arguments to the given ArgumentParser."""
   parser.add_argument('--trace', action='store_true',
                       help='show commands')
+  parser.add_argument('--trace-file', metavar='FILE',
+                      help='write a Chrome trace of the commands run, and how '
+                           'long each took, to FILE')
   parser.add_argument('--verbose', '-v', action='count', default=0,
                       help='run verbosely')
 
@@ -54,6 +194,8 @@ def enable_tracing():
 
 def setup(args):
   """Prepares for tracing/verbosity based on the given parsed arguments."""
+  global _trace_file
+
   level = logging.WARN
 
   if args.trace:
@@ -66,6 +208,9 @@ def setup(args):
 
   logging.basicConfig(format='%(message)s', level=level)
 
+  if getattr(args, 'trace_file', None):
+    _trace_file = os.path.abspath(args.trace_file)
+
 
 def parse_args(parser):
   """Shortcut that adds arguments, parses, and runs setup.
@@ -76,4 +221,6 @@ def parse_args(parser):
   add_arguments(parser)
   args = parser.parse_args()
   setup(args)
+  if _trace_file is not None:
+    _start_trace_file()
   return args
@@ -0,0 +1,99 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Runs cpplint within the current process.
+
+cpplint is imported once per process and its ProcessFile function is called
+directly, avoiding the cost of starting a fresh interpreter (and recompiling
+cpplint's regular expressions) for every batch of files.
+
+cpplint keeps its configuration in module globals, so only one thread per
+process can lint at a time. Use a process pool to lint on multiple cores.
+"""
+
+import threading
+
+import cpplint
+
+from lib import checker
+
+
+_lock = threading.Lock()
+
+# The initial values of the module globals that cpplint's command-line options
+# modify. These are restored before each run so that options from one run don't
+# leak into the next.
+_defaults = {name: getattr(cpplint, name) for name in cpplint._OPTION_GLOBALS}
+
+
+class CollectingSink(cpplint.ErrorSink):
+  """An ErrorSink that collects all output into a list of lines."""
+
+  def __init__(self):
+    self.lines = []
+
+  def PrintInfo(self, message):
+    self.lines.append(message)
+
+  def PrintError(self, message):
+    self.lines.append(message)
+
+  def output(self):
+    return ''.join(self.lines)
+
+
+def lint(options, files, contents=None):
+  """Lints the given files with cpplint.
+
+  Args:
+    options: A list of cpplint command-line options.
+    files: A list of files to lint.
+    contents: An optional dict of filename to the contents (as bytes) to lint
+      in place of the file on disk.
+
+  Returns:
+    A checker.Result describing the errors found.
+  """
+  with _lock:
+    _configure(options)
+
+    state = cpplint._cpplint_state
+    sink = CollectingSink()
+    state.SetErrorSink(sink)
+
+    for filename in files:
+      data = contents.get(filename) if contents else None
+      cpplint.ProcessFile(filename, state.verbose_level, data=data)
+
+    # Unlike cpplint's main(), this leaves out the "Total errors found" summary,
+    # which would only count this batch of files.
+    cpplint._SaveIncludeIndex()
+    return checker.Result(state.error_count, sink.output())
+
+
+def reset():
+  """Forgets the CPPLINT.cfg files read so far, since they may have changed."""
+  with _lock:
+    cpplint._config_chains.clear()
+    cpplint._config_files.clear()
+
+
+def _configure(options):
+  """Resets cpplint's global state and then applies the given options."""
+  for name, value in _defaults.items():
+    setattr(cpplint, name, value)
+  cpplint._cpplint_state = cpplint._CppLintState()
+
+  # ParseArguments insists on at least one filename.
+  cpplint.ParseArguments(['--quiet'] + options + ['-'])
@@ -0,0 +1,94 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Runs flake8 within the current process.
+
+flake8's style guide, which holds its options, configuration, and plugins, is
+set up once per process and reused, avoiding the cost of starting a fresh
+interpreter and loading flake8 for every batch of files.
+
+Only one thread per process can lint at a time. Use a process pool to lint on
+multiple cores.
+"""
+
+import io
+import threading
+
+import flake8
+from flake8.api import legacy
+from flake8.formatting import default
+import pycodestyle
+import pyflakes
+
+from lib import checker
+
+
+_lock = threading.Lock()
+_style_guide = None
+
+# Collects the output of the formatter, instead of it going to stdout.
+_output = io.StringIO()
+
+
+class _CollectingFormatter(default.Default):
+  """flake8's default formatter, writing to _output."""
+
+  def after_init(self):
+    super(_CollectingFormatter, self).after_init()
+    self.output_fd = _output
+
+
+def identity():
+  """Returns a string identifying the versions of flake8 and its checkers."""
+  return 'flake8 %s, pycodestyle %s, pyflakes %s' % (
+      flake8.__version__, pycodestyle.__version__, pyflakes.__version__)
+
+
+def lint(files):
+  """Lints the given files with flake8.
+
+  Args:
+    files: A list of files to lint.
+
+  Returns:
+    A checker.Result describing the errors found.
+  """
+  with _lock:
+    style_guide = _get_style_guide()
+    _output.seek(0)
+    _output.truncate()
+
+    # Checking one file at a time keeps flake8 from starting a multiprocessing
+    # pool of its own, which isn't allowed within the daemonic workers of a
+    # process pool.
+    errors = 0
+    for filename in files:
+      errors += style_guide.check_files([filename]).total_errors
+
+    return checker.Result(errors, _output.getvalue())
+
+
+def reset():
+  """Discards the style guide so that flake8's configuration is read again."""
+  global _style_guide
+  with _lock:
+    _style_guide = None
+
+
+def _get_style_guide():
+  global _style_guide
+  if _style_guide is None:
+    _style_guide = legacy.get_style_guide()
+    _style_guide.init_report(_CollectingFormatter)
+  return _style_guide
@@ -13,7 +13,9 @@
 # limitations under the License.
 
 import os
+import re
 import subprocess
+import threading
 
 from lib import command_trace
 from lib import source
@@ -52,16 +54,23 @@ def find_changed_or_files(all, rev_or_files, patterns):
 
 def is_revision(word):
   """Returns true if the given word is a revision name according to git."""
+  return default_session().is_revision(word)
+
+
+def _is_revision(word):
   command = ['git', 'rev-parse', word, '--']
-  with open(os.devnull, 'w') as dev_null:
-    command_trace.log(command)
+  with open(os.devnull, 'w') as dev_null, command_trace.span(command) as span:
     rc = subprocess.call(command, stdout=dev_null, stderr=dev_null)
+    span.set_result(rc)
     return rc == 0
 
 
 def find_changed(revision, patterns):
   """Finds files changed since a revision."""
+  return default_session().find_changed(revision, patterns)
 
+
+def _find_changed(revision, patterns):
   # Always include -- indicate that revision is known to be a revision, even
   # if no patterns follow.
   command = ['git', 'diff', '-z', '--name-only', '--diff-filter=ACMR',
@@ -71,8 +80,71 @@ def find_changed(revision, patterns):
   return _null_split_output(command)
 
 
+def find_staged(patterns):
+  """Finds files with changes staged in git's index."""
+  return find_changed('--cached', patterns)
+
+
+def find_staged_lines(patterns):
+  """Finds the lines of files that have changes staged in git's index.
+
+  See find_changed_lines() for the format of the result.
+  """
+  return find_changed_lines('--cached', patterns)
+
+
+def read_staged(filename):
+  """Returns the contents of the file staged in git's index, or None."""
+  return default_session().read_object(':' + filename)
+
+
+def find_changed_lines(revision, patterns):
+  """Finds the lines of files that have changed since a revision.
+
+  Returns:
+    A dict of filename to a sorted list of (first, last) line ranges, covering
+    the lines that were added or modified. Where lines were only deleted, the
+    lines on either side of the deletion count as changed.
+  """
+  return default_session().find_changed_lines(revision, patterns)
+
+
+def _find_changed_lines(revision, patterns):
+  command = ['git', 'diff', '-U0', '--no-color', '--no-ext-diff',
+             '--no-prefix', '--diff-filter=ACMR', revision, '--']
+  command.extend(patterns)
+  command.extend(standard_exclusions())
+  with command_trace.span(command) as span:
+    output = subprocess.check_output(command, text=True, errors='replace')
+    span.set_result(0, len(output))
+
+  result = {}
+  ranges = None
+  for line in output.splitlines():
+    if line.startswith('+++ '):
+      ranges = result.setdefault(line[4:], [])
+      continue
+
+    match = _HUNK_HEADER.match(line)
+    if match and ranges is not None:
+      start = int(match.group(1))
+      count = int(match.group(2)) if match.group(2) is not None else 1
+      if count:
+        ranges.append((start, start + count - 1))
+      else:
+        ranges.append((max(start, 1), start + 1))
+  return result
+
+
+_HUNK_HEADER = re.compile(r'@@ -\d+(?:,\d+)? \+(\d+)(?:,(\d+))? @@')
+
+
 def find_files(patterns=None):
   """Finds files matching the given patterns using git ls-files."""
+  return default_session().find_files(patterns)
+
+
+def _find_files(patterns):
   command = ['git', 'ls-files', '-z', '--']
   if patterns:
     command.extend(patterns)
@@ -81,30 +153,68 @@ def find_files(patterns=None):
 
 
 def find_lines_matching(pattern, sources=None):
+  command = _grep_command(pattern, sources)
+
+  result = []
+  try:
+    for line in _stream_output(command):
+      result.append(line)
+  except KeyboardInterrupt:
+    pass
+
+  return ''.join(result)
+
+
+def iter_lines_matching(pattern, sources=None, max_count=None):
+  """Finds the lines that match a pattern, as git grep finds them.
+
+  Lines are yielded as git produces them, so the output never has to be held
+  in memory all at once. git is stopped as soon as the caller stops iterating
+  or max_count lines have been found.
+
+  Args:
+    pattern: The pattern to search for, in git grep syntax.
+    sources: An optional list of files or git pathspecs to search.
+    max_count: The maximum number of lines to find, or None for no limit.
+
+  Yields:
+    (path, lineno, text) tuples, where lineno is an int and text is the
+    matching line without its trailing newline.
+  """
+  if max_count is not None and max_count <= 0:
+    return
+
+  # -z separates the path and line number with null bytes, so paths that
+  # contain colons can be split off reliably.
+  command = _grep_command(pattern, sources, ['-z'])
+  output = _stream_output(command)
+  try:
+    count = 0
+    for line in output:
+      path, lineno, text = line.split('\0', 2)
+      if text.endswith('\n'):
+        text = text[:-1]
+      yield path, int(lineno), text
+
+      count += 1
+      if count == max_count:
+        break
+  finally:
+    output.close()
+
+
+def _grep_command(pattern, sources, options=()):
   command = [
       'git', 'grep',
       '-n',  # show line numbers
       '-I',  # exclude binary files
-      pattern,
-      '--'
   ]
+  command.extend(options)
+  command.extend([pattern, '--'])
   if sources:
     command.extend(sources)
   command.extend(standard_exclusions())
-
-  command_trace.log(command)
-
-  bufsize = 4096
-  proc = subprocess.Popen(command, bufsize=bufsize, stdout=subprocess.PIPE)
-  result = []
-  try:
-    while proc.poll() is None:
-      result.append(proc.stdout.read(bufsize))
-  except KeyboardInterrupt:
-    proc.terminate()
-    proc.wait()
-
-  return b''.join(result).decode('utf8', errors='replace')
+  return command
 
 
 def make_patterns(dirs):
@@ -133,12 +243,158 @@ def is_within_repo():
 
 def get_repo_root():
   """Returns the absolute path to the root of the current git repo."""
+  return default_session().get_repo_root()
+
+
+def _get_repo_root():
   command = ['git', 'rev-parse', '--show-toplevel']
   return subprocess.check_output(command, text=True, errors='replace').rstrip()
 
 
+def _stream_output(command):
+  """Runs the given command and yields the lines of its output as they arrive.
+
+  If the caller stops early, the command is terminated.
+  """
+  with command_trace.span(command) as span:
+    proc = subprocess.Popen(command, stdout=subprocess.PIPE)
+    size = 0
+    try:
+      for line in proc.stdout:
+        size += len(line)
+        yield line.decode('utf8', errors='replace')
+    finally:
+      proc.stdout.close()
+      if proc.poll() is None:
+        proc.terminate()
+      span.set_result(proc.wait(), size)
+
+
 def _null_split_output(command):
   """Runs the given command and splits its output on the null byte."""
-  command_trace.log(command)
-  result = subprocess.check_output(command, text=True, errors='replace')
+  with command_trace.span(command) as span:
+    result = subprocess.check_output(command, text=True, errors='replace')
+    span.set_result(0, len(result))
   return [name for name in result.rstrip().split('\0') if name]
+
+
+class GitSession(object):
+  """Runs git queries on behalf of a single invocation of a tool.
+
+  The results of resolving revisions and listing files are remembered, so
+  asking the same question twice only runs git once. Objects are read through
+  a single long-running `git cat-file --batch` process rather than by starting
+  git for each one.
+
+  A session doesn't notice changes made after it has answered a query. Tools
+  that keep running while the tree changes should call clear() when it does.
+  """
+
+  def __init__(self):
+    self._lock = threading.Lock()
+    self._results = {}
+
+    self._cat_file = None
+    self._cat_file_lock = threading.Lock()
+    self._cat_file_pid = None
+
+  def is_revision(self, word):
+    """Returns true if the given word is a revision name according to git."""
+    return self._memoize(('is_revision', word), _is_revision, word)
+
+  def find_changed(self, revision, patterns):
+    """Finds files changed since a revision."""
+    return list(self._memoize(('find_changed', revision, tuple(patterns)),
+                              _find_changed, revision, patterns))
+
+  def find_changed_lines(self, revision, patterns):
+    """Finds the lines of files that have changed since a revision.
+
+    See find_changed_lines() for the format of the result.
+    """
+    result = self._memoize(('find_changed_lines', revision, tuple(patterns)),
+                           _find_changed_lines, revision, patterns)
+    return {filename: list(ranges) for filename, ranges in result.items()}
+
+  def find_files(self, patterns=None):
+    """Finds files matching the given patterns using git ls-files."""
+    key = ('find_files', tuple(patterns) if patterns else ())
+    return list(self._memoize(key, _find_files, patterns))
+
+  def get_repo_root(self):
+    """Returns the absolute path to the root of the current git repo."""
+    return self._memoize(('get_repo_root',), _get_repo_root)
+
+  def read_object(self, name):
+    """Reads the contents of an object, like 'HEAD:README.md' or ':path'.
+
+    Returns:
+      The object's contents as bytes, or None if there is no such object.
+    """
+    with self._cat_file_lock:
+      proc = self._start_cat_file()
+      proc.stdin.write(name.encode('utf8') + b'\n')
+      proc.stdin.flush()
+
+      header = proc.stdout.readline().split()
+      if len(header) != 3:
+        # The object is missing or ambiguous.
+        return None
+
+      size = int(header[2])
+      contents = proc.stdout.read(size)
+      proc.stdout.read(1)  # The newline that follows the contents.
+      return contents
+
+  def clear(self):
+    """Forgets the results of all previous queries."""
+    with self._lock:
+      self._results.clear()
+
+  def close(self):
+    """Stops the git processes that this session has started."""
+    with self._cat_file_lock:
+      proc = self._cat_file
+      self._cat_file = None
+      if proc is not None and self._cat_file_pid == os.getpid():
+        proc.stdin.close()
+        proc.wait()
+        proc.stdout.close()
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *args):
+    self.close()
+
+  def _memoize(self, key, func, *args):
+    with self._lock:
+      if key in self._results:
+        return self._results[key]
+
+    result = func(*args)
+    with self._lock:
+      self._results[key] = result
+    return result
+
+  def _start_cat_file(self):
+    # A process pool may have forked this process after cat-file was started;
+    # the child needs a process of its own.
+    if self._cat_file is None or self._cat_file_pid != os.getpid():
+      command = ['git', 'cat-file', '--batch']
+      command_trace.log(command)
+      self._cat_file = subprocess.Popen(
+          command, stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+      self._cat_file_pid = os.getpid()
+    return self._cat_file
+
+
+_default_session = None
+
+
+def default_session():
+  """Returns the GitSession shared by the module-level functions."""
+  global _default_session
+  if _default_session is None:
+    _default_session = GitSession()
+  return _default_session
@@ -0,0 +1,244 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""An on-disk cache of lint results, keyed by file contents.
+
+Each entry records the output a linter produced for a single file. The key
+covers everything that can influence that output: the linter and its options,
+the CPPLINT.cfg files that apply to the file, the file's name, and the file's
+contents. An unchanged file can therefore have its results replayed without
+running the linter again.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+
+from lib import checker
+
+
+_logger = logging.getLogger('lint.cache')
+
+# The cache is trimmed back to this size (in bytes) at the end of each run,
+# evicting the least recently used entries first.
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+def default_directory():
+  """Returns the directory in which the cache is stored by default."""
+  base = os.environ.get('XDG_CACHE_HOME')
+  if not base:
+    base = os.path.join(os.path.expanduser('~'), '.cache')
+  return os.path.join(base, 'firebase-ios-sdk', 'lint')
+
+
+class Cache(object):
+  """A content-addressed store of per-file lint results."""
+
+  def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES):
+    self.directory = directory
+    self.max_bytes = max_bytes
+
+    self._lock = threading.Lock()
+    self._config_digests = {}
+
+  def key(self, linter, filename, contents=None):
+    """Computes the cache key for linting the given file.
+
+    Args:
+      linter: A list of strings that identify the linter and the options with
+        which it runs.
+      filename: The name of the file to lint.
+      contents: The contents to lint as bytes, if not those of the file on
+        disk.
+
+    Returns:
+      The key as a hex string, or None if the file can't be read.
+    """
+    if contents is None:
+      try:
+        with open(filename, 'rb') as fd:
+          contents = fd.read()
+      except IOError:
+        return None
+
+    h = hashlib.sha256()
+    for part in linter:
+      _update(h, part.encode('utf8'))
+    _update(h, self._config_digest(os.path.dirname(os.path.abspath(filename))))
+    _update(h, filename.encode('utf8'))
+    _update(h, contents)
+    return h.hexdigest()
+
+  def get(self, key):
+    """Returns the Result stored under the given key, or None."""
+    path = self._path(key)
+    try:
+      with open(path, 'r') as fd:
+        entry = json.load(fd)
+    except (IOError, ValueError):
+      return None
+
+    # Bump the modification time so that trim() evicts least recently used
+    # entries first.
+    try:
+      os.utime(path, None)
+    except OSError:
+      pass
+
+    return checker.Result(entry['errors'], entry['output'])
+
+  def put(self, key, result):
+    """Stores the given Result under the given key."""
+    path = self._path(key)
+    parent = os.path.dirname(path)
+    try:
+      if not os.path.isdir(parent):
+        os.makedirs(parent, exist_ok=True)
+
+      # Write to a temporary file and rename it into place so that concurrent
+      # writers and readers never observe a partial entry.
+      fd, tmp = tempfile.mkstemp(dir=parent, suffix='.tmp')
+      with os.fdopen(fd, 'w') as out:
+        json.dump({'errors': result.errors, 'output': result.output}, out)
+      os.replace(tmp, path)
+    except (IOError, OSError) as e:
+      _logger.debug('Could not write cache entry %s: %s', path, e)
+
+  def trim(self):
+    """Evicts the least recently used entries until the cache fits.
+
+    Only entries count. Files kept alongside them at the top of the directory,
+    like cpplint's include index, are left alone.
+    """
+    entries = []
+    total = 0
+    for dirpath, _, filenames in os.walk(self.directory):
+      if dirpath == self.directory:
+        continue
+      for name in filenames:
+        path = os.path.join(dirpath, name)
+        try:
+          st = os.stat(path)
+        except OSError:
+          continue
+        entries.append((st.st_mtime, st.st_size, path))
+        total += st.st_size
+
+    if total <= self.max_bytes:
+      return
+
+    entries.sort()
+    for _, size, path in entries:
+      if total <= self.max_bytes:
+        break
+      try:
+        os.remove(path)
+      except OSError:
+        pass
+      total -= size
+
+  def clear(self):
+    """Removes all entries from the cache."""
+    shutil.rmtree(self.directory, ignore_errors=True)
+
+  def invalidate_configs(self):
+    """Forgets the digests of CPPLINT.cfg files, which may have changed."""
+    with self._lock:
+      self._config_digests.clear()
+
+  def _path(self, key):
+    return os.path.join(self.directory, key[:2], key[2:] + '.json')
+
+  def _config_digest(self, dirname):
+    """Returns a digest of all CPPLINT.cfg files that apply in dirname."""
+    with self._lock:
+      result = self._config_digests.get(dirname)
+    if result is not None:
+      return result
+
+    h = hashlib.sha256()
+    parent = os.path.dirname(dirname)
+    if parent != dirname:
+      _update(h, self._config_digest(parent))
+
+    cfg_file = os.path.join(dirname, 'CPPLINT.cfg')
+    if os.path.isfile(cfg_file):
+      try:
+        with open(cfg_file, 'rb') as fd:
+          _update(h, fd.read())
+      except IOError:
+        pass
+
+    result = h.digest()
+    with self._lock:
+      self._config_digests[dirname] = result
+    return result
+
+
+def split_output(files, result):
+  """Breaks down the output of a linter run into per-file results.
+
+  Lines of output are attributed to a file if they start with the file's name
+  followed by a colon (the convention followed by both cpplint and flake8), or
+  if they're cpplint's "Done processing" notice for the file.
+
+  Args:
+    files: The list of files that were linted.
+    result: The Result of linting all of them.
+
+  Returns:
+    A tuple of a dict of filename to Result for every file in files, and a list
+    of the lines of output that couldn't be attributed to any file.
+  """
+  lines_by_file = {filename: [] for filename in files}
+  errors_by_file = {filename: 0 for filename in files}
+  unattributed = []
+
+  for line in result.output.splitlines(True):
+    if line.startswith(_DONE_PROCESSING):
+      filename = line[len(_DONE_PROCESSING):].rstrip('\n')
+      if filename in lines_by_file:
+        lines_by_file[filename].append(line)
+      else:
+        unattributed.append(line)
+      continue
+
+    filename = line.split(':', 1)[0]
+    if filename in lines_by_file:
+      lines_by_file[filename].append(line)
+      errors_by_file[filename] += 1
+    else:
+      unattributed.append(line)
+
+  results = {
+      filename: checker.Result(errors_by_file[filename],
+                               ''.join(lines_by_file[filename]))
+      for filename in files
+  }
+  return results, unattributed
+
+
+_DONE_PROCESSING = 'Done processing '
+
+
+def _update(h, data):
+  """Adds length-prefixed data to the hash so that parts can't run together."""
+  h.update(str(len(data)).encode('ascii'))
+  h.update(b':')
+  h.update(data)
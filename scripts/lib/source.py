@@ -12,12 +12,15 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import bisect
 import fnmatch
 import logging
 import os
 import re
+import subprocess
 import textwrap
 
+from lib import checker
 from lib import command_trace
 
 
@@ -153,7 +156,10 @@ def categorize_files(files):
 
 
 def shard(group, num_shards):
-  """Breaks the group apart into num_shards shards.
+  """Breaks the group apart into num_shards shards of roughly equal cost.
+
+  Files are weighed by their size, so that a single large file doesn't end up
+  in a shard alongside many others.
 
   Args:
     group: a breakdown, perhaps returned from categorize_files.
@@ -166,11 +172,16 @@ def shard(group, num_shards):
   for i in range(num_shards):
     shards.append(LanguageBreakdown())
 
-  pos = 0
+  items = []
   for kind, files in group.kinds.items():
     for filename in files:
+      items.append((kind, filename))
+
+  bins = checker.partition(
+      items, num_shards, lambda item: checker.file_size(item[1]))
+  for pos, contents in enumerate(bins):
+    for kind, filename in contents:
       shards[pos].kinds[kind].append(filename)
-      pos = (pos + 1) % num_shards
 
   return shards
 
@@ -219,9 +230,54 @@ def _related_files(root):
   if not parent:
     # dirname returns empty for filenames that are already a basename.
     parent = '.'
+  prefix = os.path.basename(root)
+
+  names = _file_index().get(os.path.normpath(parent))
+  if names is None:
+    # The directory isn't known to git, or isn't below the current directory.
+    return fnmatch.filter(_list_files(parent), prefix + '*')
+
+  result = []
+  for pos in range(bisect.bisect_left(names, prefix), len(names)):
+    if not names[pos].startswith(prefix):
+      break
+    result.append(names[pos])
+  return result
+
 
-  pattern = os.path.basename(root) + '*'
-  return fnmatch.filter(_list_files(parent), pattern)
+def _file_index():
+  """Returns an index of the files git knows about below the current directory.
+
+  The index is built with a single call to git ls-files, and includes untracked
+  files that aren't ignored.
+
+  Returns:
+    A dict of directory name to the sorted list of the names of the files in
+    that directory. The dict is empty if git can't list the files.
+  """
+  if _file_index.value is None:
+    command = ['git', 'ls-files', '-z', '--cached', '--others',
+               '--exclude-standard']
+    try:
+      with command_trace.span(command) as span:
+        output = subprocess.check_output(
+            command, stderr=subprocess.DEVNULL, text=True, errors='replace')
+        span.set_result(0, len(output))
+    except (OSError, subprocess.CalledProcessError):
+      output = ''
+
+    index = {}
+    for path in output.split('\0'):
+      if path:
+        parent, name = os.path.split(path)
+        index.setdefault(parent or '.', []).append(name)
+    for names in index.values():
+      names.sort()
+    _file_index.value = index
+  return _file_index.value
+
+
+_file_index.value = None
 
 
 def _list_files(parent):
@@ -237,6 +293,21 @@ def _list_files(parent):
 _list_files.cache = {}
 
 
+def invalidate(files):
+  """Forgets cached directory listings that the given files may have changed.
+
+  Long-running callers should call this when files are created so that later
+  classification of headers sees the new related files.
+  """
+  for filename in files:
+    parent = os.path.dirname(filename) or '.'
+    _list_files.cache.pop(parent, None)
+
+    # Fall back to listing the directory, which sees the new files.
+    if _file_index.value is not None:
+      _file_index.value.pop(os.path.normpath(parent), None)
+
+
 def _in_directories(filename, dirs):
   """Tests whether `filename` is anywhere in any of the given dirs."""
   for dirname in dirs:
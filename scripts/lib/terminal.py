@@ -12,7 +12,9 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import subprocess
+import os
+import shutil
+import sys
 import threading
 
 
@@ -31,8 +33,23 @@ def columns():
 
 
 def _find_terminal_columns():
-  try:
-    result = subprocess.check_output(['tput', 'cols'])
-    return int(result.rstrip())
-  except subprocess.CalledProcessError:
-    return 80
+  """Finds the width of the terminal without starting a subprocess.
+
+  The COLUMNS environment variable takes precedence. Otherwise the width comes
+  from whichever of stdout, stderr, and stdin is attached to a terminal, so
+  that piping output elsewhere doesn't lose the width.
+  """
+  # This checks COLUMNS and then stdout.
+  width = shutil.get_terminal_size(fallback=(0, 0)).columns
+  if width > 0:
+    return width
+
+  for stream in (sys.stderr, sys.stdin):
+    try:
+      width = os.get_terminal_size(stream.fileno()).columns
+    except (AttributeError, ValueError, OSError):
+      continue
+    if width > 0:
+      return width
+
+  return 80
@@ -0,0 +1,236 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Watches directory trees for files that change.
+
+On Linux this uses inotify (through ctypes, so there are no extra
+dependencies). Elsewhere it falls back to polling modification times.
+"""
+
+import ctypes
+import ctypes.util
+import errno
+import logging
+import os
+import select
+import struct
+import sys
+import time
+
+
+_logger = logging.getLogger('lint.watch')
+
+# After the first change is seen, keep collecting changes for this long (in
+# seconds) so that an editor saving several files produces a single batch.
+_SETTLE_TIME = 0.05
+
+# How often (in seconds) the polling watcher rescans the tree.
+_POLL_INTERVAL = 0.25
+
+
+def create(dirs, extensions, names=(), files=()):
+  """Returns a watcher for the given directories.
+
+  Args:
+    dirs: A list of directories to watch recursively.
+    extensions: A collection of file extensions (like '.cc') to report.
+    names: A collection of file names (like 'CPPLINT.cfg') to report within
+      dirs, whatever their extension.
+    files: A list of individual files to watch, which needn't be in dirs.
+  """
+  if sys.platform.startswith('linux'):
+    try:
+      return InotifyWatcher(dirs, extensions, names, files)
+    except OSError as e:
+      _logger.info('inotify unavailable (%s); polling for changes', e)
+  return PollingWatcher(dirs, extensions, names, files)
+
+
+class _Filter(object):
+  """Decides which files a watcher reports."""
+
+  def __init__(self, extensions, names, files):
+    self._extensions = frozenset(extensions)
+    self._names = frozenset(names)
+    self._files = {os.path.normpath(f): f for f in files}
+
+  def matches(self, name):
+    """Returns whether a file with the given name in a watched tree counts."""
+    return (os.path.splitext(name)[1] in self._extensions
+            or name in self._names)
+
+  def find_file(self, path):
+    """Returns the individual file that path names, as given, or None."""
+    return self._files.get(os.path.normpath(path))
+
+  def files(self):
+    return list(self._files.values())
+
+
+class PollingWatcher(object):
+  """Detects changes by periodically comparing modification times."""
+
+  def __init__(self, dirs, extensions, names=(), files=()):
+    self._dirs = dirs
+    self._filter = _Filter(extensions, names, files)
+    self._stats = self._scan()
+
+  def wait(self):
+    """Blocks until files change.
+
+    Returns:
+      A sorted list of the files that were created or modified.
+    """
+    changed = set()
+    while True:
+      time.sleep(_SETTLE_TIME if changed else _POLL_INTERVAL)
+
+      stats = self._scan()
+      now_changed = {path for path, stat in stats.items()
+                     if self._stats.get(path) != stat}
+      self._stats = stats
+
+      if changed and not now_changed:
+        return sorted(changed)
+      changed.update(now_changed)
+
+  def _scan(self):
+    paths = self._filter.files()
+    for dirname in self._dirs:
+      for root, _, files in os.walk(dirname):
+        for name in files:
+          if self._filter.matches(name):
+            paths.append(os.path.join(root, name))
+
+    result = {}
+    for path in paths:
+      try:
+        st = os.stat(path)
+      except OSError:
+        continue
+      result[path] = (st.st_mtime_ns, st.st_size)
+    return result
+
+
+# Constants from <sys/inotify.h>.
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_ISDIR = 0x40000000
+_IN_NONBLOCK = 0x00000800
+_IN_CLOEXEC = 0x00080000
+
+_EVENT_HEADER = struct.Struct('iIII')
+
+
+class InotifyWatcher(object):
+  """Detects changes with Linux's inotify API."""
+
+  def __init__(self, dirs, extensions, names=(), files=()):
+    self._filter = _Filter(extensions, names, files)
+
+    libc_name = ctypes.util.find_library('c') or 'libc.so.6'
+    self._libc = ctypes.CDLL(libc_name, use_errno=True)
+    if not hasattr(self._libc, 'inotify_init1'):
+      raise OSError(errno.ENOSYS, 'inotify_init1 not found in ' + libc_name)
+
+    self._fd = self._libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+    if self._fd < 0:
+      err = ctypes.get_errno()
+      raise OSError(err, os.strerror(err))
+
+    # Maps each watch descriptor to its directory and whether the directory is
+    # part of a watched tree, rather than only holding individual files.
+    self._dirs_by_wd = {}
+    for path in self._filter.files():
+      self._add_watch(os.path.dirname(path) or os.curdir, recursive=False)
+    for dirname in dirs:
+      for root, _, _ in os.walk(dirname):
+        self._add_watch(root)
+
+  def wait(self):
+    """Blocks until files change.
+
+    Returns:
+      A sorted list of the files that were created or modified.
+    """
+    changed = set()
+    while True:
+      timeout = _SETTLE_TIME if changed else None
+      readable, _, _ = select.select([self._fd], [], [], timeout)
+      if not readable:
+        return sorted(changed)
+      changed.update(self._read_events())
+
+  def _add_watch(self, dirname, recursive=True):
+    mask = _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE
+    wd = self._libc.inotify_add_watch(
+        self._fd, os.fsencode(dirname), ctypes.c_uint32(mask))
+    if wd < 0:
+      err = ctypes.get_errno()
+      _logger.info('Could not watch %s: %s', dirname, os.strerror(err))
+      return
+
+    # inotify hands out one descriptor per directory, however often it's
+    # added, so a directory watched both ways is watched recursively.
+    if wd in self._dirs_by_wd:
+      recursive = recursive or self._dirs_by_wd[wd][1]
+    self._dirs_by_wd[wd] = (dirname, recursive)
+
+  def _read_events(self):
+    try:
+      data = os.read(self._fd, 64 * 1024)
+    except BlockingIOError:
+      return
+
+    pos = 0
+    while pos < len(data):
+      wd, mask, _, length = _EVENT_HEADER.unpack_from(data, pos)
+      pos += _EVENT_HEADER.size
+      name = data[pos:pos + length].rstrip(b'\0')
+      pos += length
+
+      entry = self._dirs_by_wd.get(wd)
+      if entry is None or not name:
+        continue
+
+      dirname, recursive = entry
+      path = os.path.join(dirname, os.fsdecode(name))
+
+      # Files that are merely created have no contents yet; wait for the
+      # writer to close them.
+      written = mask & (_IN_CLOSE_WRITE | _IN_MOVED_TO)
+
+      single_file = self._filter.find_file(path)
+      if single_file is not None:
+        if written:
+          yield single_file
+        continue
+
+      if not recursive:
+        continue
+
+      if mask & _IN_ISDIR:
+        # Watch new directories, and report any files that were written into
+        # them before the watch was in place.
+        if mask & (_IN_CREATE | _IN_MOVED_TO):
+          for root, _, files in os.walk(path):
+            self._add_watch(root)
+            for f in files:
+              if self._filter.matches(f):
+                yield os.path.join(root, f)
+        continue
+
+      if written and self._filter.matches(os.path.basename(path)):
+        yield path
@@ -280,9 +280,11 @@ def collect_log_output(activity_log, result):
 def find_xcode_major_version():
   """Determines the major version number of Xcode."""
   cmd = ['xcodebuild', '-version']
-  command_trace.log(cmd)
+  with command_trace.span(cmd) as span:
+    output = subprocess.check_output(cmd)
+    span.set_result(0, len(output))
 
-  result = str(subprocess.check_output(cmd))
+  result = str(output)
   version = result.split('\n', 1)[0]
   version = re.sub(r'Xcode ', '', version)
   version = re.sub(r'\..*', '', version)
@@ -294,9 +296,10 @@ def xcresulttool(*args):
   cmd = ['xcrun', 'xcresulttool']
   cmd.extend(args)
 
-  command_trace.log(cmd)
-
-  return subprocess.check_output(cmd)
+  with command_trace.span(cmd) as span:
+    output = subprocess.check_output(cmd)
+    span.set_result(0, len(output))
+  return output
 
 
 def xcresulttool_json(*args):